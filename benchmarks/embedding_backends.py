@@ -0,0 +1,234 @@
+"""
+Embedding backend benchmark.
+
+Loads the embedding model with each backend and compares them against the first one
+(the fp32 SentenceTransformer path by default) on the same synthetic memory corpus:
+single-text latency, batched throughput, vector agreement and nearest-neighbour
+recall. Recall is measured twice: with the corpus re-embedded by the backend, and
+with the backend's queries against the baseline's corpus vectors, which is what an
+existing Qdrant collection holds.
+
+    uv run --extra onnx python -m benchmarks.embedding_backends
+    uv run --extra onnx python -m benchmarks.embedding_backends --backends torch onnx:onnx/model_qint8_avx512_vnni.onnx
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ai_companion.modules.memory.long_term.embedding_sidecar import (
+    DEFAULT_ONNX_FILE,
+    EMBEDDING_MODEL,
+    load_embedding_model,
+)
+from benchmarks.load_test import git_commit, summarize
+
+logger = logging.getLogger("benchmarks.embedding_backends")
+
+SUBJECTS = ["User", "The user", "Their sister", "Their manager", "Their best friend", "Their son", "Their partner"]
+FACTS = [
+    "works as a {job} in {city}",
+    "lives in {city} with a {pet} named {name}",
+    "is allergic to {food}",
+    "prefers {food} for dinner on {day}",
+    "has a {pet} called {name}",
+    "moved to {city} last {season}",
+    "plays {sport} every {day}",
+    "is learning {language} for a trip to {city}",
+    "has a doctor's appointment on {day}",
+    "wants to run a marathon in {city} next {season}",
+    "studied {subject} at university",
+    "is worried about a {subject} exam on {day}",
+]
+VALUES = {
+    "job": ["nurse", "software engineer", "teacher", "accountant", "chef", "electrician", "lawyer", "designer"],
+    "city": ["Sao Paulo", "Lisbon", "Porto Alegre", "Recife", "Madrid", "Curitiba", "Boston", "Rio de Janeiro"],
+    "pet": ["dog", "cat", "parrot", "rabbit", "turtle"],
+    "name": ["Rex", "Luna", "Bob", "Mel", "Thor", "Nina", "Pipoca"],
+    "food": ["peanuts", "shrimp", "lactose", "gluten", "sushi", "feijoada", "pasta"],
+    "day": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
+    "season": ["spring", "summer", "autumn", "winter"],
+    "sport": ["football", "tennis", "volleyball", "chess", "padel", "basketball"],
+    "language": ["English", "Spanish", "French", "Italian", "German", "Japanese"],
+    "subject": ["physics", "history", "law", "medicine", "economics", "statistics"],
+}
+
+
+def synthetic_texts(count: int, rng: random.Random) -> List[str]:
+    """Memory-like sentences, like the ones the extraction pipeline stores."""
+    texts = []
+    for _ in range(count):
+        template = rng.choice(FACTS)
+        values = {key: rng.choice(options) for key, options in VALUES.items()}
+        texts.append(f"{rng.choice(SUBJECTS)} {template.format(**values)}")
+    return texts
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k nearest corpus vectors by cosine similarity, as Qdrant ranks them."""
+    scores = normalize(queries) @ normalize(corpus).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_at_k(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Mean share of the reference neighbours that the candidate also returns."""
+    k = reference.shape[1]
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(reference, candidate)]))
+
+
+def parse_backend(spec: str) -> Dict[str, str]:
+    """`torch`, `onnx` or `onnx:<file in the model repository>`."""
+    backend, _, onnx_file = spec.partition(":")
+    if backend not in ("torch", "onnx"):
+        raise argparse.ArgumentTypeError(f"Unknown embedding backend {spec!r}")
+    return {"name": spec, "backend": backend, "onnx_file": onnx_file or DEFAULT_ONNX_FILE}
+
+
+def measure(spec: Dict[str, str], args: argparse.Namespace, corpus: List[str], queries: List[str]) -> dict:
+    start = time.perf_counter()
+    model = load_embedding_model(args.model, spec["backend"], spec["onnx_file"])
+    load_seconds = time.perf_counter() - start
+    model.encode(corpus[: args.batch_size], batch_size=args.batch_size)  # warm-up
+
+    single = []
+    for text in queries[: args.single_runs]:
+        start = time.perf_counter()
+        model.encode([text])
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    corpus_vectors = model.encode(corpus, batch_size=args.batch_size)
+    batch_seconds = time.perf_counter() - start
+    query_vectors = model.encode(queries, batch_size=args.batch_size)
+
+    return {
+        "load_seconds": round(load_seconds, 3),
+        "single_latency_seconds": summarize(single),
+        "throughput_texts_per_second": round(len(corpus) / batch_seconds, 1),
+        "corpus": np.asarray(corpus_vectors, dtype=np.float32),
+        "queries": np.asarray(query_vectors, dtype=np.float32),
+    }
+
+
+def compare(baseline: dict, result: dict, k: int) -> dict:
+    agreement = np.sum(normalize(baseline["corpus"]) * normalize(result["corpus"]), axis=1)
+    reference = top_k(baseline["queries"], baseline["corpus"], k)
+    return {
+        "cosine_to_baseline": {
+            "mean": round(float(agreement.mean()), 5),
+            "p1": round(float(np.percentile(agreement, 1)), 5),
+            "min": round(float(agreement.min()), 5),
+        },
+        f"recall_at_{k}_reindexed": round(recall_at_k(reference, top_k(result["queries"], result["corpus"], k)), 4),
+        f"recall_at_{k}_existing_collection": round(
+            recall_at_k(reference, top_k(result["queries"], baseline["corpus"], k)), 4
+        ),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    corpus = synthetic_texts(args.texts, rng)
+    queries = synthetic_texts(args.queries, rng)
+
+    results, backends = {}, {}
+    for spec in args.backends:
+        logger.warning(f"Measuring {spec['name']}")
+        results[spec["name"]] = measure(spec, args, corpus, queries)
+
+    baseline_name = args.backends[0]["name"]
+    baseline = results[baseline_name]
+    for spec in args.backends:
+        result = results[spec["name"]]
+        report = {key: value for key, value in result.items() if key not in ("corpus", "queries")}
+        report.update(compare(baseline, result, args.k))
+        report["compatible"] = report["cosine_to_baseline"]["min"] >= args.min_cosine
+        backends[spec["name"]] = report
+
+    return {
+        "git_commit": git_commit(),
+        "config": {
+            "model": args.model,
+            "baseline": baseline_name,
+            "texts": args.texts,
+            "queries": args.queries,
+            "batch_size": args.batch_size,
+            "k": args.k,
+            "min_cosine": args.min_cosine,
+            "seed": args.seed,
+        },
+        "backends": backends,
+    }
+
+
+def print_summary(report: dict) -> None:
+    k = report["config"]["k"]
+    print(
+        f"{'backend':<44}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'texts/s':>10}"
+        f"{'cos min':>9}{f'R@{k} new':>10}{f'R@{k} old':>10}"
+    )
+    for name, stats in report["backends"].items():
+        latency = stats["single_latency_seconds"]
+        print(
+            f"{name:<44}{stats['load_seconds']:>8.2f}{latency['p50'] * 1000:>9.2f}{latency['p95'] * 1000:>9.2f}"
+            f"{stats['throughput_texts_per_second']:>10.1f}{stats['cosine_to_baseline']['min']:>9.4f}"
+            f"{stats[f'recall_at_{k}_reindexed']:>10.4f}{stats[f'recall_at_{k}_existing_collection']:>10.4f}"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        type=parse_backend,
+        default=[parse_backend("torch"), parse_backend("onnx")],
+        help="Backends to compare, the first one being the baseline: torch, onnx or onnx:<file>",
+    )
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=5000, help="Corpus size (stored memories)")
+    parser.add_argument("--queries", type=int, default=500, help="Queries for recall and single-text latency")
+    parser.add_argument("--single-runs", type=int, default=200, help="Single-text encodes timed per backend")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10, help="Neighbours compared for recall")
+    parser.add_argument(
+        "--min-cosine", type=float, default=0.98, help="Lowest cosine to the baseline vector considered compatible"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/embedding_backends_<timestamp>.json)")
+    args = parser.parse_args(argv)
+    if args.output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        args.output = os.path.join("benchmarks", "results", f"embedding_backends_{stamp}.json")
+    args.output = os.path.abspath(args.output)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args(argv)
+    report = run(args)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"Report written to {args.output}", file=sys.stderr)
+    # Non-zero exit when a backend drifts too far to share collections with the baseline
+    if not all(stats["compatible"] for stats in report["backends"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
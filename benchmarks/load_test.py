@@ -0,0 +1,349 @@
+"""
+End-to-end load test of the WhatsApp webhook with offline provider stubs.
+
+Replays synthetic webhook payloads against `whatsapp_handler` through the FastAPI app
+at a fixed arrival rate, waits for every queued message to be answered, and writes a
+JSON report with throughput, latency percentiles and per-node/per-dependency breakdowns.
+
+    uv run python -m benchmarks.load_test --messages 500 --users 50 --rate 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import payloads, stubs
+
+logger = logging.getLogger("benchmarks.load_test")
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    summary = {f"p{p}": round(percentile(values, p), 4) for p in PERCENTILES}
+    summary["mean"] = round(sum(values) / len(values), 4) if values else 0.0
+    summary["max"] = round(values[-1], 4) if values else 0.0
+    summary["count"] = len(values)
+    return summary
+
+
+def bucket_quantile(buckets: tuple, counts: List[int], q: float) -> float:
+    """Estimate a quantile from histogram buckets by linear interpolation, as Prometheus does."""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    target = q * total
+    cumulative, lower = 0, 0.0
+    for bound, count in zip((*buckets, float("inf")), counts):
+        if cumulative + count >= target:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * ((target - cumulative) / count if count else 0.0)
+        cumulative += count
+        lower = bound
+    return lower
+
+
+def histogram_breakdown(histogram, errors, group_by: List[str]) -> Dict[str, dict]:
+    """Aggregate a labelled histogram over every label except `group_by`."""
+    index = [histogram.labelnames.index(name) for name in group_by]
+    grouped: Dict[str, dict] = {}
+    for values, (counts, total) in histogram.samples().items():
+        key = ":".join(values[i] for i in index)
+        entry = grouped.setdefault(key, {"counts": [0] * len(counts), "sum": 0.0, "errors": 0.0})
+        entry["counts"] = [a + b for a, b in zip(entry["counts"], counts)]
+        entry["sum"] += total
+    if errors is not None:
+        error_index = [errors.labelnames.index(name) for name in group_by]
+        for values, count in errors.samples().items():
+            key = ":".join(values[i] for i in error_index)
+            grouped.setdefault(key, {"counts": [0] * (len(histogram.buckets) + 1), "sum": 0.0, "errors": 0.0})
+            grouped[key]["errors"] += count
+
+    report = {}
+    for key, entry in sorted(grouped.items()):
+        count = sum(entry["counts"])
+        report[key] = {
+            "count": count,
+            "errors": int(entry["errors"]),
+            "mean": round(entry["sum"] / count, 4) if count else 0.0,
+            **{f"p{p}": round(bucket_quantile(histogram.buckets, entry["counts"], p / 100), 4) for p in PERCENTILES},
+        }
+    return report
+
+
+class CompletionTracker:
+    """Records when each accepted message has been fully handled by the work queue."""
+
+    def __init__(self):
+        self.submitted_at: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.failed = 0
+        self.last_completion = 0.0
+        self._pending = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def expect(self, message_id: str, submitted_at: float) -> None:
+        self.submitted_at[message_id] = submitted_at
+        self._pending += 1
+        self._drained.clear()
+
+    def discard(self, message_id: str) -> None:
+        """Stop waiting for a message the webhook did not accept."""
+        if self.submitted_at.pop(message_id, None) is not None:
+            self._settle()
+
+    def wrap(self, handler):
+        async def tracked(session_id: str, message: Dict) -> None:
+            failed = False
+            try:
+                await handler(session_id, message)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self._done(message["id"], failed)
+
+        return tracked
+
+    def _done(self, message_id: str, failed: bool) -> None:
+        now = time.perf_counter()
+        submitted_at = self.submitted_at.pop(message_id, None)
+        if submitted_at is None:
+            return
+        if failed:
+            self.failed += 1
+        else:
+            self.latencies.append(now - submitted_at)
+        self.last_completion = now
+        self._settle()
+
+    def _settle(self) -> None:
+        self._pending -= 1
+        if self._pending == 0:
+            self._drained.set()
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+async def replay(
+    app, messages: List[Dict], rate: float, concurrency: int, tracker: CompletionTracker
+) -> tuple[Dict[str, int], List[float]]:
+    """Post the webhook payloads at `rate` per second (0 for as fast as possible)."""
+    counts = {"sent": 0, "accepted": 0, "rejected": 0, "errors": 0}
+    ack_latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench.local") as client:
+
+        async def post(message: Dict) -> None:
+            # Registered before posting: a stubbed turn can finish before the response returns
+            submitted_at = time.perf_counter()
+            tracker.expect(message["id"], submitted_at)
+            try:
+                response = await client.post("/whatsapp_response", json=payloads.build_payload(message))
+            except Exception as e:
+                logger.warning(f"Webhook request failed: {e}")
+                counts["errors"] += 1
+                tracker.discard(message["id"])
+                return
+
+            ack_latencies.append(time.perf_counter() - submitted_at)
+            if response.status_code == 200:
+                counts["accepted"] += 1
+                return
+            counts["rejected" if response.status_code == 503 else "errors"] += 1
+            tracker.discard(message["id"])
+
+        async def send(message: Dict) -> None:
+            try:
+                await post(message)
+            finally:
+                semaphore.release()
+
+        start = time.perf_counter()
+        tasks = []
+        for i, message in enumerate(messages):
+            if rate > 0:
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await semaphore.acquire()
+            counts["sent"] += 1
+            tasks.append(asyncio.create_task(send(message)))
+        await asyncio.gather(*tasks)
+
+    return counts, ack_latencies
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    commit = git_commit()
+
+    # Provider stubs and local state must be in place before the app modules are imported
+    stubs.install(stubs.StubConfig.load(args.profile, seed=args.seed), args.workdir)
+    os.environ["WHATSAPP_WORKER_CONCURRENCY"] = str(args.workers)
+    os.environ["WHATSAPP_QUEUE_MAX_SIZE"] = str(args.queue_size)
+
+    from ai_companion.core.instrumentation import (
+        dependency_errors,
+        dependency_latency,
+        node_errors,
+        node_latency,
+        turn_latency,
+    )
+    from ai_companion.graph.nodes import user_manager
+    from ai_companion.interfaces.whatsapp.webhook_endpoint import app
+    from ai_companion.interfaces.whatsapp.whatsapp_response import message_queue
+    from ai_companion.modules.llm import get_llm_registry
+    from ai_companion.modules.user_management import UserGroup
+    from ai_companion.settings import settings
+
+    # Pre-verify the senders so every message is a full turn rather than the verification flow
+    for phone in payloads.senders(args.users):
+        if user_manager.get_user(phone) is None:
+            user_manager.create_user(phone, settings.ADMIN_PHONE_NUMBER)
+        user_manager.verify_user(phone, UserGroup(args.group))
+
+    # Generated images are written relative to the working directory
+    os.chdir(args.workdir)
+
+    mix = payloads.MessageMix(audio=args.audio_ratio, image=args.image_ratio, media_request=args.media_request_ratio)
+    messages = list(payloads.generate_messages(args.messages, args.users, mix, seed=args.seed))
+    tracker = CompletionTracker()
+    message_queue.handler = tracker.wrap(message_queue.handler)
+
+    async with app.router.lifespan_context(app):
+        start = time.perf_counter()
+        counts, ack_latencies = await replay(app, messages, args.rate, args.concurrency, tracker)
+        drained = await tracker.wait(args.drain_timeout)
+        if not drained:
+            logger.warning(f"{len(tracker.submitted_at)} messages still pending after {args.drain_timeout}s")
+        elapsed = (tracker.last_completion or time.perf_counter()) - start
+
+    completed = len(tracker.latencies)
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "config": {
+            "messages": args.messages,
+            "users": args.users,
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "queue_size": args.queue_size,
+            "group": args.group,
+            "mix": vars(mix),
+            "seed": args.seed,
+            "settings": {
+                "MEMORY_EXTRACTION_MODE": settings.MEMORY_EXTRACTION_MODE,
+                "SUMMARY_MODE": settings.SUMMARY_MODE,
+                "SPECULATIVE_CONVERSATION": settings.SPECULATIVE_CONVERSATION,
+                "LLM_MAX_CONCURRENCY": settings.LLM_MAX_CONCURRENCY,
+            },
+            "stubs": stubs.StubConfig.load(args.profile, seed=args.seed).to_dict(),
+        },
+        "requests": counts,
+        "webhook_ack_seconds": summarize(ack_latencies),
+        "turns": {
+            "completed": completed,
+            "failed": tracker.failed,
+            "pending": len(tracker.submitted_at),
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(completed / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_seconds": summarize(tracker.latencies),
+            "by_workflow": histogram_breakdown(turn_latency, None, ["workflow"]),
+        },
+        "nodes": histogram_breakdown(node_latency, node_errors, ["node"]),
+        "dependencies": histogram_breakdown(dependency_latency, dependency_errors, ["dependency", "operation"]),
+        "llm": get_llm_registry().stats(),
+    }
+
+
+def print_summary(report: dict) -> None:
+    turns = report["turns"]
+    latency = turns["latency_seconds"]
+    print(
+        f"{turns['completed']} turns in {turns['elapsed_seconds']}s "
+        f"({turns['throughput_per_second']}/s), {turns['failed']} failed, {turns['pending']} pending"
+    )
+    print(f"turn latency p50={latency['p50']}s p95={latency['p95']}s p99={latency['p99']}s max={latency['max']}s")
+    print(f"webhook ack p99={report['webhook_ack_seconds']['p99']}s, requests {report['requests']}")
+    print(f"{'node':<36}{'count':>8}{'mean':>10}{'p95':>10}{'errors':>8}")
+    for name, stats in sorted(report["nodes"].items(), key=lambda item: -item[1]["mean"]):
+        print(f"{name:<36}{stats['count']:>8}{stats['mean']:>10.4f}{stats['p95']:>10.4f}{stats['errors']:>8}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=200, help="Total webhook messages to send")
+    parser.add_argument("--users", type=int, default=20, help="Distinct senders (conversation threads)")
+    parser.add_argument("--rate", type=float, default=10.0, help="Arrival rate in messages/s; 0 sends as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum webhook requests in flight")
+    parser.add_argument("--workers", type=int, default=8, help="WHATSAPP_WORKER_CONCURRENCY for the run")
+    parser.add_argument("--queue-size", type=int, default=1000, help="WHATSAPP_QUEUE_MAX_SIZE for the run")
+    parser.add_argument("--group", default="ffl", help="User group the senders are verified into")
+    parser.add_argument("--audio-ratio", type=float, default=0.1, help="Share of inbound voice notes")
+    parser.add_argument("--image-ratio", type=float, default=0.05, help="Share of inbound images")
+    parser.add_argument("--media-request-ratio", type=float, default=0.05, help="Share of photo/audio requests")
+    parser.add_argument("--profile", help="JSON file overriding stub latency and error profiles")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--drain-timeout", type=float, default=300.0, help="Seconds to wait for queued turns")
+    parser.add_argument("--workdir", help="Directory for the run's databases (default: a temporary directory)")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/load_test_<timestamp>.json)")
+    args = parser.parse_args(argv)
+    args.workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="ava-bench-"))
+    if args.output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        args.output = os.path.join("benchmarks", "results", f"load_test_{stamp}.json")
+    args.output = os.path.abspath(args.output)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    # Configured before the app modules set up INFO logging, so the run stays quiet
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"Report written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
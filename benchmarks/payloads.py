@@ -0,0 +1,72 @@
+"""
+Synthetic WhatsApp Cloud API webhook payloads.
+"""
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterator, List
+
+TEXT_MESSAGES = [
+    "Oi Ava, tudo bem?",
+    "Bom dia! Como foi sua noite?",
+    "Hoje o trabalho foi puxado, muitas reuniões seguidas.",
+    "Você lembra do que eu te contei sobre a viagem?",
+    "Qual é a melhor forma de estudar para uma prova de anatomia?",
+    "Estou pensando em começar a correr de manhã, o que acha?",
+    "Me conta um pouco sobre o seu dia.",
+    "What do you think about learning to fly small planes?",
+    "I just got back from the gym, feeling great.",
+    "Can you help me plan my weekend?",
+    "Meu cachorro fugiu hoje de manhã, mas já achei ele.",
+    "Que horas você costuma dormir?",
+]
+
+MEDIA_REQUESTS = [
+    "Me manda uma foto de onde você está agora",
+    "Manda um áudio falando oi",
+    "Send me a picture of your desk",
+    "Can you send me a voice message?",
+]
+
+IMAGE_CAPTIONS = ["Olha essa foto", "O que você acha disso?", "", "Minha vista agora"]
+
+
+@dataclass
+class MessageMix:
+    """Share of each kind of inbound message; text takes the remainder."""
+
+    audio: float = 0.1
+    image: float = 0.05
+    media_request: float = 0.05
+
+
+def sender(index: int) -> str:
+    return f"55119{index:08d}"
+
+
+def build_payload(message: Dict) -> Dict:
+    """Wrap a message object in the webhook envelope Meta posts to /whatsapp_response."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "bench", "changes": [{"field": "messages", "value": {"messages": [message]}}]}],
+    }
+
+
+def generate_messages(count: int, users: int, mix: MessageMix, seed: int = 7) -> Iterator[Dict]:
+    """Yield `count` inbound messages spread round-robin over `users` senders."""
+    rng = random.Random(seed)
+    for i in range(count):
+        message = {"from": sender(i % users), "id": f"wamid.bench.{i}", "timestamp": str(1_700_000_000 + i)}
+        roll = rng.random()
+        if roll < mix.audio:
+            message.update(type="audio", audio={"id": f"audio.{i}", "mime_type": "audio/ogg"})
+        elif roll < mix.audio + mix.image:
+            message.update(type="image", image={"id": f"image.{i}", "caption": rng.choice(IMAGE_CAPTIONS)})
+        elif roll < mix.audio + mix.image + mix.media_request:
+            message.update(type="text", text={"body": rng.choice(MEDIA_REQUESTS)})
+        else:
+            message.update(type="text", text={"body": rng.choice(TEXT_MESSAGES)})
+        yield message
+
+
+def senders(users: int) -> List[str]:
+    return [sender(i) for i in range(users)]
@@ -0,0 +1,354 @@
+"""
+Offline stand-ins for every external provider.
+Groq (chat, Whisper, vision), ElevenLabs, Together, the sentence-transformers model and
+the WhatsApp Graph API are replaced by local stubs with configurable latency and error
+rates, and Qdrant runs in-process. Stubs replace the provider clients, not the app's own
+code, so the app's request paths and instrumentation run unchanged.
+"""
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+# Values given to structured-output fields, by field name, before falling back to the field type
+STRUCTURED_DEFAULTS = {
+    "response_type": "conversation",
+    "is_important": False,
+    "formatted_memory": None,
+}
+
+STUB_REPLY = "Oi! Que bom falar com você. Conta mais, estou curiosa para saber como foi o seu dia."
+
+# 1x1 transparent PNG returned by the image generation stub
+STUB_PNG = base64.b64encode(
+    bytes.fromhex(
+        "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+        "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+    )
+).decode()
+
+
+class StubProviderError(RuntimeError):
+    """Raised by a stub to simulate a provider failure."""
+
+
+@dataclass
+class StubProfile:
+    """Latency and error distribution of one stubbed provider.
+
+    Latencies are log-normal around `latency` seconds; `spread` is the sigma of the
+    underlying normal, so 0 gives a fixed latency.
+    """
+
+    latency: float = 0.1
+    spread: float = 0.3
+    error_rate: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.spread <= 0:
+            return self.latency
+        return self.latency * math.exp(rng.gauss(0.0, self.spread))
+
+    def fails(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+DEFAULT_PROFILES: Dict[str, StubProfile] = {
+    "groq_chat": StubProfile(latency=0.6, spread=0.4),
+    "groq_small": StubProfile(latency=0.25, spread=0.3),
+    "groq_whisper": StubProfile(latency=0.5, spread=0.3),
+    "groq_vision": StubProfile(latency=1.2, spread=0.3),
+    "elevenlabs": StubProfile(latency=0.9, spread=0.3),
+    "together": StubProfile(latency=2.5, spread=0.3),
+    "embedding": StubProfile(latency=0.008, spread=0.2),
+    "whatsapp": StubProfile(latency=0.12, spread=0.3),
+}
+
+
+@dataclass
+class StubConfig:
+    profiles: Dict[str, StubProfile] = field(default_factory=lambda: dict(DEFAULT_PROFILES))
+    seed: int = 7
+
+    @classmethod
+    def load(cls, path: Optional[str], seed: int = 7) -> "StubConfig":
+        """Default profiles, overridden by a JSON file of {provider: {latency, spread, error_rate}}."""
+        config = cls(seed=seed)
+        if path:
+            with open(path) as f:
+                overrides = json.load(f)
+            for name, values in overrides.items():
+                if name not in config.profiles:
+                    raise ValueError(f"Unknown stub provider {name!r}, expected one of {sorted(config.profiles)}")
+                config.profiles[name] = StubProfile(**{**asdict(config.profiles[name]), **values})
+        return config
+
+    def to_dict(self) -> dict:
+        return {name: asdict(profile) for name, profile in self.profiles.items()}
+
+
+class StubRuntime:
+    """Shared random source and profiles of the installed stubs."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+
+    def profile(self, name: str) -> StubProfile:
+        return self.config.profiles[name]
+
+    def wait_sync(self, name: str) -> None:
+        profile = self.profile(name)
+        time.sleep(profile.sample(self.rng))
+        if profile.fails(self.rng):
+            raise StubProviderError(f"{name} stub failure")
+
+    async def wait(self, name: str) -> None:
+        profile = self.profile(name)
+        await asyncio.sleep(profile.sample(self.rng))
+        if profile.fails(self.rng):
+            raise StubProviderError(f"{name} stub failure")
+
+
+_runtime: Optional[StubRuntime] = None
+
+
+def _stub_runtime() -> StubRuntime:
+    if _runtime is None:
+        raise RuntimeError("Stubs are not installed")
+    return _runtime
+
+
+def _structured_value(schema: type[BaseModel]) -> BaseModel:
+    values = {}
+    for name, info in schema.model_fields.items():
+        if name in STRUCTURED_DEFAULTS:
+            values[name] = STRUCTURED_DEFAULTS[name]
+        elif info.annotation is bool:
+            values[name] = False
+        else:
+            values[name] = f"stub {name.replace('_', ' ')}"
+    return schema.model_construct(**values)
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model answering with a canned reply after a sampled latency."""
+
+    model_name: str = "stub"
+    profile_name: str = "groq_chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        _stub_runtime().wait_sync(self.profile_name)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=STUB_REPLY))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await _stub_runtime().wait(self.profile_name)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=STUB_REPLY))])
+
+    def with_structured_output(self, schema, **kwargs):
+        async def _ainvoke(_input):
+            await _stub_runtime().wait(self.profile_name)
+            return _structured_value(schema)
+
+        def _invoke(_input):
+            _stub_runtime().wait_sync(self.profile_name)
+            return _structured_value(schema)
+
+        return RunnableLambda(_invoke, afunc=_ainvoke)
+
+
+def chat_model_factory(small_model_name: str):
+    """Replacement for ChatGroq's constructor, as called by the LLM registry."""
+
+    def build(model_name: str, **kwargs: Any) -> StubChatModel:
+        profile = "groq_small" if model_name == small_model_name else "groq_chat"
+        return StubChatModel(model_name=model_name, profile_name=profile)
+
+    return build
+
+
+class StubGroq:
+    """Groq SDK client covering the Whisper and vision calls."""
+
+    def __init__(self, **kwargs: Any):
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    def _transcribe(self, **kwargs: Any) -> str:
+        _stub_runtime().wait_sync("groq_whisper")
+        return "Oi, tudo bem? Estou mandando um áudio para contar como foi meu dia."
+
+    def _complete(self, **kwargs: Any):
+        _stub_runtime().wait_sync("groq_vision")
+        message = SimpleNamespace(content="A photo of a sunny beach with people playing volleyball.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class StubElevenLabs:
+    def __init__(self, **kwargs: Any):
+        pass
+
+    def generate(self, **kwargs: Any):
+        _stub_runtime().wait_sync("elevenlabs")
+        return iter([b"ID3", b"\x00" * 2048])
+
+
+class StubTogether:
+    def __init__(self, **kwargs: Any):
+        self.images = SimpleNamespace(generate=self._generate)
+
+    def _generate(self, **kwargs: Any):
+        _stub_runtime().wait_sync("together")
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=STUB_PNG)])
+
+
+class StubSentenceTransformer:
+    """Deterministic hashed bag-of-words embeddings of the all-MiniLM-L6-v2 size."""
+
+    DIMENSIONS = 384
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        pass
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.DIMENSIONS, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.DIMENSIONS] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, **kwargs: Any):
+        _stub_runtime().wait_sync("embedding")
+        if isinstance(sentences, str):
+            return self._embed(sentences)
+        return np.stack([self._embed(s) for s in sentences])
+
+
+def in_memory_qdrant(*args: Any, **kwargs: Any):
+    """In-process Qdrant with an empty knowledge base collection, shared by every client."""
+    return _shared_qdrant()
+
+
+@functools.lru_cache
+def _shared_qdrant():
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, VectorParams
+
+    client = QdrantClient(location=":memory:")
+    client.create_collection(
+        collection_name="knowledge_base",
+        vectors_config=VectorParams(size=StubSentenceTransformer.DIMENSIONS, distance=Distance.COSINE),
+    )
+    return client
+
+
+class InMemoryAsyncQdrant:
+    """AsyncQdrantClient over the same in-process storage as `in_memory_qdrant`.
+
+    Local-mode async clients keep their own storage, so the app's sync and async
+    clients would not see each other's points; this one awaits the shared sync client.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        self._client = in_memory_qdrant()
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        async def call(*args: Any, **kwargs: Any):
+            return method(*args, **kwargs)
+
+        return call
+
+
+def graph_api_transport() -> httpx.AsyncBaseTransport:
+    """Mock transport answering the WhatsApp Graph API calls made by WhatsAppClient."""
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await _stub_runtime().wait("whatsapp")
+        path = request.url.path
+        if request.method == "POST" and path.endswith("/messages"):
+            return httpx.Response(200, json={"messages": [{"id": f"wamid.stub.{time.monotonic_ns()}"}]})
+        if request.method == "POST" and path.endswith("/media"):
+            return httpx.Response(200, json={"id": f"media.stub.{time.monotonic_ns()}"})
+        if path.startswith("/download/"):
+            return httpx.Response(200, content=b"\x00" * 4096)
+        return httpx.Response(200, json={"url": f"https://stub.local/download{path}"})
+
+    return httpx.MockTransport(handle)
+
+
+STUB_ENV = {
+    "GROQ_API_KEY": "stub",
+    "ELEVENLABS_API_KEY": "stub",
+    "ELEVENLABS_VOICE_ID": "stub",
+    "TOGETHER_API_KEY": "stub",
+    "QDRANT_URL": "http://stub.local",
+    "QDRANT_API_KEY": "stub",
+    "WHATSAPP_TOKEN": "stub",
+    "WHATSAPP_PHONE_NUMBER_ID": "0",
+}
+
+
+def install(config: StubConfig, workdir: str) -> None:
+    """Point the app at local state in `workdir` and patch every provider client.
+
+    Must run before the app's graph modules are imported, since they create the
+    vector store and user database at import time.
+    """
+    global _runtime
+    _runtime = StubRuntime(config)
+
+    os.makedirs(workdir, exist_ok=True)
+    for name, value in STUB_ENV.items():
+        os.environ[name] = value
+    os.environ["SHORT_TERM_MEMORY_DB_PATH"] = os.path.join(workdir, "memory.db")
+    os.environ["USER_DB_PATH"] = os.path.join(workdir, "users.db")
+    os.environ["BLOB_STORE_PATH"] = os.path.join(workdir, "blobs")
+
+    from ai_companion.interfaces.whatsapp import whatsapp_client
+    from ai_companion.modules.image import image_to_text, text_to_image
+    from ai_companion.modules.llm import registry
+    from ai_companion.modules.memory.long_term import embedding_sidecar, vector_store
+    from ai_companion.modules.speech import speech_to_text, text_to_speech
+    from ai_companion.settings import settings
+
+    registry.ChatGroq = chat_model_factory(settings.SMALL_TEXT_MODEL_NAME)
+    speech_to_text.Groq = StubGroq
+    image_to_text.Groq = StubGroq
+    text_to_speech.ElevenLabs = StubElevenLabs
+    text_to_image.Together = StubTogether
+    embedding_sidecar.load_embedding_model = StubSentenceTransformer
+    vector_store.QdrantClient = in_memory_qdrant
+    vector_store.AsyncQdrantClient = InMemoryAsyncQdrant
+
+    transport = graph_api_transport()
+    original_client = whatsapp_client.WhatsAppClient.client
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=whatsapp_client.GRAPH_API_URL, transport=transport)
+        return self._client
+
+    whatsapp_client.WhatsAppClient.client = property(client, doc=original_client.__doc__)
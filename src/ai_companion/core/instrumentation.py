@@ -0,0 +1,148 @@
+"""
+Latency instrumentation for graph nodes and external dependencies.
+Timings taken during a turn are buffered and labelled with the turn's user group and
+workflow once its output state is known; timings outside a turn are labelled "none".
+"""
+import asyncio
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from ai_companion.core.metrics import metrics
+
+TURN_LABELS = ["user_group", "workflow"]
+
+node_latency = metrics.histogram("graph_node_seconds", "Graph node duration", ["node", *TURN_LABELS])
+node_errors = metrics.counter("graph_node_errors_total", "Graph node failures", ["node", *TURN_LABELS])
+dependency_latency = metrics.histogram(
+    "dependency_request_seconds",
+    "External dependency call duration",
+    ["dependency", "operation", *TURN_LABELS],
+)
+dependency_errors = metrics.counter(
+    "dependency_errors_total",
+    "Failed external dependency calls",
+    ["dependency", "operation", *TURN_LABELS],
+)
+turn_latency = metrics.histogram("graph_turn_seconds", "End-to-end graph turn duration", ["status", *TURN_LABELS])
+
+# (kind, labels, duration, failed) recorded while the turn's labels are still unknown
+Observation = Tuple[str, dict, float, bool]
+
+
+@dataclass
+class TurnTimings:
+    """Observations buffered during one turn."""
+
+    user_group: str = "none"
+    workflow: str = "none"
+    observations: List[Observation] = field(default_factory=list)
+    closed: bool = False
+
+    def label(self, state: Optional[dict]) -> None:
+        """Take the user group and workflow from the turn's output state."""
+        state = state or {}
+        self.user_group = state.get("user_group") or "unknown"
+        # A workflow is only chosen when the router ran; otherwise the state holds the previous turn's
+        routed = any(kind == "node" and labels["node"] == "router_node" for kind, labels, *_ in self.observations)
+        self.workflow = (state.get("workflow") or "unknown") if routed else "none"
+
+
+_current_turn: ContextVar[Optional[TurnTimings]] = ContextVar("current_turn", default=None)
+
+
+def _record(kind: str, labels: dict, duration: float, failed: bool) -> None:
+    turn = _current_turn.get()
+    # Background tasks spawned during a turn inherit it but may outlive it
+    if turn is not None and not turn.closed:
+        turn.observations.append((kind, labels, duration, failed))
+    else:
+        _observe(kind, labels, duration, failed, user_group="none", workflow="none")
+
+
+def _observe(kind: str, labels: dict, duration: float, failed: bool, **turn_labels) -> None:
+    histogram, errors = (node_latency, node_errors) if kind == "node" else (dependency_latency, dependency_errors)
+    histogram.observe(duration, **labels, **turn_labels)
+    if failed:
+        errors.inc(**labels, **turn_labels)
+
+
+@contextmanager
+def track_turn() -> Iterator[TurnTimings]:
+    """Buffer the node and dependency timings of a turn and publish them when it ends.
+
+    Call `label()` on the yielded object with the output state before the block exits.
+    """
+    turn = TurnTimings()
+    token = _current_turn.set(turn)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield turn
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _current_turn.reset(token)
+        turn.closed = True
+        turn_labels = {"user_group": turn.user_group, "workflow": turn.workflow}
+        turn_latency.observe(time.perf_counter() - start, status=status, **turn_labels)
+        for kind, labels, duration, failed in turn.observations:
+            _observe(kind, labels, duration, failed, **turn_labels)
+
+
+@contextmanager
+def timed_dependency(dependency: str, operation: str) -> Iterator[None]:
+    """Time a call to an external dependency (groq, elevenlabs, together, qdrant, sqlite, ...)."""
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except asyncio.CancelledError:
+        raise
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _record("dependency", {"dependency": dependency, "operation": operation}, time.perf_counter() - start, failed)
+
+
+def timed_node(func: Callable) -> Callable:
+    """Time a graph node under its function name. Keeps the signature so LangGraph still passes config."""
+    labels = {"node": func.__name__}
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failed = False
+            try:
+                return await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                _record("node", labels, time.perf_counter() - start, failed)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            _record("node", labels, time.perf_counter() - start, failed)
+
+    return wrapper
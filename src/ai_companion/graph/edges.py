@@ -1,15 +1,33 @@
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END
 from typing_extensions import Literal
 
 from ai_companion.graph.state import AICompanionState
 from ai_companion.settings import settings
 
+# Independent nodes that prepare the response. They run as parallel branches and
+# join in context_join_node before select_workflow picks the response node.
+# speculative_conversation_node only does work when speculative mode is on.
+CONTEXT_NODES = [
+    "memory_extraction_node",
+    "router_node",
+    "context_injection_node",
+    "memory_injection_node",
+    "knowledge_retrieval_node",
+    "speculative_conversation_node",
+]
+
 
 def should_summarize_conversation(
     state: AICompanionState,
+    config: RunnableConfig,
 ) -> Literal["summarize_conversation_node", "__end__"]:
     messages = state["messages"]
 
+    # Deferred turns are summarized in the background once the reply is delivered
+    if config.get("configurable", {}).get("deferred_summary"):
+        return END
+
     if len(messages) > settings.TOTAL_MESSAGES_SUMMARY_TRIGGER:
         return "summarize_conversation_node"
 
@@ -33,7 +51,7 @@ def select_workflow(
 
 def should_verify_user(
     state: AICompanionState,
-) -> Literal["group_verification_node", "admin_command_node"]:
+) -> Literal["group_verification_node", "admin_command_node"] | list[str]:
     """Check if user needs verification or if admin command should be processed."""
     user_verified = state.get("user_verified", False)
     awaiting_verification = state.get("awaiting_verification", False)
@@ -51,12 +69,12 @@ def should_verify_user(
         return "group_verification_node"
     
     # Otherwise, continue to normal flow
-    return "memory_extraction_node"
+    return CONTEXT_NODES
 
 
 def after_verification(
     state: AICompanionState,
-) -> Literal["memory_extraction_node", "__end__"]:
+) -> Literal["__end__"] | list[str]:
     """After verification, either continue to normal flow or end if just sent verification question."""
     awaiting_verification = state.get("awaiting_verification", False)
     
@@ -65,12 +83,12 @@ def after_verification(
         return END
     
     # Otherwise continue to normal flow
-    return "memory_extraction_node"
+    return CONTEXT_NODES
 
 
 def after_admin_command(
     state: AICompanionState,
-) -> Literal["memory_extraction_node", "__end__"]:
+) -> Literal["__end__"] | list[str]:
     """After admin command, check if we should continue or end."""
     # If the last message is from AI (command response), end here
     if state["messages"] and hasattr(state["messages"][-1], "type"):
@@ -85,4 +103,4 @@ def after_admin_command(
             return END
     
     # Otherwise continue to normal conversation flow
-    return "memory_extraction_node"
+    return CONTEXT_NODES
@@ -3,6 +3,7 @@ from functools import lru_cache
 from langgraph.graph import END, START, StateGraph
 
 from ai_companion.graph.edges import (
+    CONTEXT_NODES,
     select_workflow,
     should_summarize_conversation,
     should_verify_user,
@@ -12,12 +13,14 @@ from ai_companion.graph.edges import (
 from ai_companion.graph.nodes import (
     audio_node,
     context_injection_node,
+    context_join_node,
     conversation_node,
     image_node,
     knowledge_retrieval_node,
     memory_extraction_node,
     memory_injection_node,
     router_node,
+    speculative_conversation_node,
     summarize_conversation_node,
     user_identification_node,
     group_verification_node,
@@ -38,58 +41,57 @@ def create_workflow_graph():
     graph_builder.add_node("router_node", router_node)
     graph_builder.add_node("context_injection_node", context_injection_node)
     graph_builder.add_node("memory_injection_node", memory_injection_node)
+    graph_builder.add_node("knowledge_retrieval_node", knowledge_retrieval_node)
+    graph_builder.add_node("speculative_conversation_node", speculative_conversation_node)
+    graph_builder.add_node("context_join_node", context_join_node)
     graph_builder.add_node("conversation_node", conversation_node)
     graph_builder.add_node("image_node", image_node)
     graph_builder.add_node("audio_node", audio_node)
     graph_builder.add_node("summarize_conversation_node", summarize_conversation_node)
-    graph_builder.add_node("knowledge_retrieval_node", knowledge_retrieval_node)
-    graph_builder.add_edge("memory_injection_node", "knowledge_retrieval_node")
-    graph_builder.add_edge("knowledge_retrieval_node", "conversation_node")
 
     # Define the flow
     # First identify user
     graph_builder.add_edge(START, "user_identification_node")
-    
-    # Check if user needs verification or admin command processing
+
+    # Check if user needs verification or admin command processing.
+    # Verified users fan out to all context nodes at once.
+    context_paths = {node: node for node in CONTEXT_NODES}
     graph_builder.add_conditional_edges(
         "user_identification_node",
         should_verify_user,
         {
             "group_verification_node": "group_verification_node",
             "admin_command_node": "admin_command_node",
-            "memory_extraction_node": "memory_extraction_node",
+            **context_paths,
         }
     )
-    
+
     # After verification, either continue or end
     graph_builder.add_conditional_edges(
         "group_verification_node",
         after_verification,
         {
-            "memory_extraction_node": "memory_extraction_node",
+            **context_paths,
             "__end__": END,
         }
     )
-    
+
     # After admin command, either continue or end
     graph_builder.add_conditional_edges(
         "admin_command_node",
         after_admin_command,
         {
-            "memory_extraction_node": "memory_extraction_node",
+            **context_paths,
             "__end__": END,
         }
     )
 
-    # Then determine response type
-    graph_builder.add_edge("memory_extraction_node", "router_node")
-
-    # Then inject both context and memories
-    graph_builder.add_edge("router_node", "context_injection_node")
-    graph_builder.add_edge("context_injection_node", "memory_injection_node")
+    # Memory extraction, routing, activity context, memories and knowledge are
+    # independent, so they run in parallel and join before the response node
+    graph_builder.add_edge(CONTEXT_NODES, "context_join_node")
 
     # Then proceed to appropriate response node
-    graph_builder.add_conditional_edges("memory_injection_node", select_workflow)
+    graph_builder.add_conditional_edges("context_join_node", select_workflow)
 
     # Check for summarization after any response
     graph_builder.add_conditional_edges("conversation_node", should_summarize_conversation)
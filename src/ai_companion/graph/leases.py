@@ -0,0 +1,255 @@
+"""
+Per-thread execution leases.
+A turn holds the lease of its thread while it runs the graph, so messages from the
+same user are serialized across worker processes and instances, while different
+threads still run in parallel. Leases expire unless their holder keeps renewing
+them, so a crashed worker cannot block a thread for longer than the TTL.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Protocol, Tuple
+
+import aiosqlite
+
+from ai_companion.core.metrics import metrics
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+lease_wait = metrics.histogram("thread_lease_wait_seconds", "Time spent acquiring a thread lease", ["backend"])
+lease_contended = metrics.counter(
+    "thread_lease_contended_total", "Lease acquisitions that found the thread held by another process", ["backend"]
+)
+lease_timeouts = metrics.counter("thread_lease_timeouts_total", "Lease acquisitions that gave up", ["backend"])
+lease_lost = metrics.counter("thread_lease_lost_total", "Leases that expired or were taken over while held", ["backend"])
+leases_held = metrics.gauge("thread_leases_held", "Thread leases currently held by this process", ["backend"])
+
+
+class LeaseTimeoutError(TimeoutError):
+    """Raised when a thread lease could not be acquired in time."""
+
+
+class LeaseBackend(Protocol):
+    """Storage shared by every process that may run turns of the same threads."""
+
+    name: str
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Take the lease if it is free, expired or already ours; True on success."""
+        ...
+
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        """Extend a lease we hold; False if it was lost."""
+        ...
+
+    async def release(self, key: str, owner: str) -> None:
+        """Give up a lease we hold."""
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+class LocalLeaseBackend:
+    """In-process leases, for a single worker process."""
+
+    name = "local"
+
+    def __init__(self):
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.monotonic()
+        current = self._leases.get(key)
+        if current is not None and current[0] != owner and current[1] > now:
+            return False
+        self._leases[key] = (owner, now + ttl)
+        return True
+
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        current = self._leases.get(key)
+        if current is None or current[0] != owner:
+            return False
+        self._leases[key] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release(self, key: str, owner: str) -> None:
+        current = self._leases.get(key)
+        if current is not None and current[0] == owner:
+            del self._leases[key]
+
+    async def close(self) -> None:
+        self._leases.clear()
+
+
+class SqliteLeaseBackend:
+    """Leases in a SQLite table on the data directory shared by the workers.
+
+    Acquisition is a single conditional upsert, so it is atomic across processes.
+    Expiry uses wall-clock time, which all processes on the host share.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        async with self._lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = await aiosqlite.connect(self.db_path, isolation_level=None)
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA busy_timeout=5000")
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS thread_leases (
+                        key TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                    """
+                )
+                self._conn = conn
+            return self._conn
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        conn = await self._connection()
+        now = time.time()
+        cursor = await conn.execute(
+            """
+            INSERT INTO thread_leases (key, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE thread_leases.expires_at < ? OR thread_leases.owner = excluded.owner
+            """,
+            (key, owner, now + ttl, now),
+        )
+        return cursor.rowcount > 0
+
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        conn = await self._connection()
+        cursor = await conn.execute(
+            "UPDATE thread_leases SET expires_at = ? WHERE key = ? AND owner = ?",
+            (time.time() + ttl, key, owner),
+        )
+        return cursor.rowcount > 0
+
+    async def release(self, key: str, owner: str) -> None:
+        conn = await self._connection()
+        await conn.execute("DELETE FROM thread_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._conn is not None:
+                await self._conn.close()
+            self._conn = None
+
+
+class ThreadLeaseManager:
+    """Hands out per-thread leases on top of a LeaseBackend.
+
+    Waiters in the same process queue on a local lock first, so only one of them
+    polls the backend. While held, a lease is renewed every `ttl / 3` seconds.
+    """
+
+    def __init__(
+        self,
+        backend: LeaseBackend,
+        ttl: float = 120.0,
+        acquire_timeout: float = 300.0,
+        poll_interval: float = 0.05,
+        max_poll_interval: float = 1.0,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.acquire_timeout = acquire_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._process_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._local: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _local_lock(self, key: str) -> asyncio.Lock:
+        lock = self._local.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._local[key] = lock
+        return lock
+
+    @asynccontextmanager
+    async def lease(self, thread_id: str | int) -> AsyncIterator[None]:
+        """Hold the lease of a thread; raises LeaseTimeoutError after `acquire_timeout`."""
+        key = str(thread_id)
+        owner = f"{self._process_id}:{uuid.uuid4().hex}"
+        backend = self.backend.name
+        start = time.perf_counter()
+
+        local_lock = self._local_lock(key)
+        try:
+            await asyncio.wait_for(local_lock.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            lease_timeouts.inc(backend=backend)
+            raise LeaseTimeoutError(f"Timed out waiting for the lease of thread {key}") from None
+
+        try:
+            await self._acquire(key, owner, start)
+            leases_held.inc(backend=backend)
+            heartbeat = asyncio.create_task(self._heartbeat(key, owner), name=f"lease-{key}")
+            try:
+                yield
+            finally:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+                leases_held.dec(backend=backend)
+                try:
+                    await self.backend.release(key, owner)
+                except Exception as e:
+                    # The lease will expire on its own after the TTL
+                    logger.error(f"Failed to release the lease of thread {key}: {e}")
+        finally:
+            local_lock.release()
+
+    async def _acquire(self, key: str, owner: str, start: float) -> None:
+        backend = self.backend.name
+        delay = self.poll_interval
+        contended = False
+        while not await self.backend.acquire(key, owner, self.ttl):
+            if not contended:
+                contended = True
+                lease_contended.inc(backend=backend)
+            if time.perf_counter() - start + delay > self.acquire_timeout:
+                lease_timeouts.inc(backend=backend)
+                raise LeaseTimeoutError(f"Timed out waiting for the lease of thread {key}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll_interval)
+        lease_wait.observe(time.perf_counter() - start, backend=backend)
+
+    async def _heartbeat(self, key: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                renewed = await self.backend.renew(key, owner, self.ttl)
+            except Exception as e:
+                logger.warning(f"Failed to renew the lease of thread {key}: {e}")
+                continue
+            if not renewed:
+                lease_lost.inc(backend=self.backend.name)
+                logger.error(f"Lost the lease of thread {key}; another worker may run it concurrently")
+                return
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_lease_backend() -> LeaseBackend:
+    """Build the backend selected by THREAD_LEASE_BACKEND."""
+    if settings.THREAD_LEASE_BACKEND == "sqlite":
+        return SqliteLeaseBackend(settings.THREAD_LEASE_DB_PATH)
+    return LocalLeaseBackend()
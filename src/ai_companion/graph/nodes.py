@@ -1,39 +1,55 @@
-import os
 from pyexpat.errors import messages
-from uuid import uuid4
 import logging
 
 from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
 from langchain_core.runnables import RunnableConfig
 
+from ai_companion.core.instrumentation import timed_node
 from ai_companion.graph.state import AICompanionState
 from ai_companion.graph.utils.chains import (
+    get_character_prompt_inputs,
     get_character_response_chain,
-    get_router_chain,
+    get_system_template,
 )
+from ai_companion.graph.utils.context_builder import KNOWLEDGE_CHUNK_SEPARATOR, ContextBuilder, get_token_budget
+from ai_companion.graph.utils.deadline import get_deadline, run_optional, run_response
+from ai_companion.graph.utils.retrieval import get_turn_retrieval
+from ai_companion.graph.utils.routing import TieredRouter
+from ai_companion.graph.utils.speculation import get_speculation
+from ai_companion.graph.utils.summarization import fold_into_summary, messages_to_evict
+from ai_companion.modules.memory.long_term.vector_store import MemoryScope
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from ai_companion.graph.utils.helpers import (
-    get_chat_model,
     get_text_to_image_module,
     get_text_to_speech_module,
 )
-from ai_companion.modules.memory.long_term.memory_manager import get_memory_manager
+from ai_companion.modules.blobs import get_blob_store
+from ai_companion.modules.memory.long_term.memory_manager import MemoryManager, get_memory_manager
 from ai_companion.modules.schedules.context_generation import ScheduleContextGenerator
 from ai_companion.settings import settings
-from ai_companion.modules.memory.long_term.vector_store import VectorStore
 
-vector_store = VectorStore()
+router = TieredRouter(
+    cache_size=settings.ROUTER_CACHE_SIZE,
+    shadow_sample_rate=settings.ROUTER_SHADOW_SAMPLE_RATE,
+)
 
-async def router_node(state: AICompanionState):
-    chain = get_router_chain()
-    response = await chain.ainvoke({"messages": state["messages"][-settings.ROUTER_MESSAGES_TO_ANALYZE :]})
-    return {"workflow": response.response_type}
+@timed_node
+async def router_node(state: AICompanionState, config: RunnableConfig):
+    workflow = await router.route(state["messages"], state.get("input_modality") or "text")
+    speculation = get_speculation(config)
+    if speculation is not None:
+        speculation.route(workflow)
+    return {"workflow": workflow}
 
 
-def context_injection_node(state: AICompanionState):
+@timed_node
+def context_injection_node(state: AICompanionState, config: RunnableConfig):
+    deadline = get_deadline(config)
+    if deadline is not None and deadline.exhausted("context_injection"):
+        return {}
     schedule_context = ScheduleContextGenerator.get_current_activity()
     if schedule_context != state.get("current_activity", ""):
         apply_activity = True
@@ -41,150 +57,209 @@ def context_injection_node(state: AICompanionState):
         apply_activity = False
     return {"apply_activity": apply_activity, "current_activity": schedule_context}
 
-def knowledge_retrieval_node(state: AICompanionState) -> dict:
+@timed_node
+async def knowledge_retrieval_node(state: AICompanionState, config: RunnableConfig) -> dict:
     user_message = state["messages"][-1].content
     logger.info(f"Retrieving knowledge for: {user_message}")
-    try:
-        relevant_chunks = vector_store.search_knowledge(user_message, k=3)
-    except Exception as e:
-        logger.error(f"Error searching knowledge: {e}")
-        relevant_chunks = []
-    # Limit chunk length to avoid prompt overflow
-    relevant_chunks = [chunk[:500] for chunk in relevant_chunks]
+    # Shares one encode pass and search round trip with memory_injection_node
+    retrieval = await run_optional("knowledge_retrieval", get_turn_retrieval(config).get(state), None, config)
+    relevant_chunks = retrieval.knowledge if retrieval is not None else []
+    # Chunks are kept whole here; the conversation node fits them into its token budget
     logger.info(f"Retrieved {len(relevant_chunks)} chunks (first 200 chars): {str(relevant_chunks)[:200]}...")
-    knowledge_context = "\n".join(relevant_chunks)
+    knowledge_context = KNOWLEDGE_CHUNK_SEPARATOR.join(relevant_chunks)
     logger.info(f"Knowledge context length: {len(knowledge_context)}")
+    speculation = get_speculation(config)
+    if speculation is not None:
+        speculation.publish("knowledge_context", knowledge_context)
     return {"knowledge_context": knowledge_context}
 
 
+@timed_node
+def context_join_node(state: AICompanionState) -> dict:
+    """Barrier where the parallel context branches meet before the response node."""
+    return {}
+
+
+@timed_node
+async def speculative_conversation_node(state: AICompanionState, config: RunnableConfig) -> dict:
+    """Generate the conversation reply alongside routing; a no-op unless speculative mode is on."""
+    speculation = get_speculation(config)
+    if speculation is not None:
+        await speculation.run(lambda inputs: generate_conversation_reply({**state, **inputs}, config))
+    return {}
+
+
+@timed_node
 async def conversation_node(state: AICompanionState, config: RunnableConfig):
+    speculation = get_speculation(config)
+    response = speculation.take() if speculation is not None else None
+    if response is None:
+        response = await generate_conversation_reply(state, config)
+
+    return {"messages": AIMessage(content=response)}
+
+
+async def generate_conversation_reply(state: AICompanionState, config: RunnableConfig) -> str:
     current_activity = ScheduleContextGenerator.get_current_activity()
     memory_context = state.get("memory_context", "")
     knowledge_context = state.get("knowledge_context", "")
     user_group = state.get("user_group", "ffl")
     
-    chain = get_character_response_chain(
-        summary=state.get("summary", ""),
-        knowledge_context=knowledge_context,
+    chain = get_character_response_chain(user_group=user_group, admin_commands_obj=admin_commands)
+
+    # Fit history, memories, knowledge, summary and activity into the model's token budget
+    context = ContextBuilder(
+        budget=get_token_budget(settings.TEXT_MODEL_NAME),
+        response_reserve=settings.CONTEXT_RESPONSE_RESERVE,
+        recent_messages=settings.CONTEXT_RECENT_MESSAGES,
+    ).build(
+        state["messages"],
+        system_prompt=get_system_template(chain),
         memory_context=memory_context,
+        knowledge_context=knowledge_context,
+        summary=state.get("summary", ""),
         current_activity=current_activity,
-        user_group=user_group,
-        fps_calendar="",  # TODO: Load FPS calendar
-        admin_commands_obj=admin_commands
     )
-    
-    response = await chain.ainvoke(
-        {
-            "messages": state["messages"],
-        },
+
+    # The reply is not optional: it gets whatever is left of the turn deadline
+    response = await run_response(
+        chain.ainvoke(
+            {
+                "messages": context.messages,
+                **get_character_prompt_inputs(
+                    summary=context.summary,
+                    knowledge_context=context.knowledge_context,
+                    memory_context=context.memory_context,
+                    current_activity=context.current_activity,
+                    fps_calendar="",  # TODO: Load FPS calendar
+                ),
+            },
+            config,
+        ),
         config,
     )
-    
-    return {"messages": AIMessage(content=response)}
+    return response
 
 
+@timed_node
 async def image_node(state: AICompanionState, config: RunnableConfig):
     current_activity = ScheduleContextGenerator.get_current_activity()
     memory_context = state.get("memory_context", "")
     
-    chain = get_character_response_chain(
-        summary=state.get("summary", ""),
-        knowledge_context="",
-        memory_context=memory_context,
-        current_activity=current_activity
-    )
+    chain = get_character_response_chain(admin_commands_obj=admin_commands)
     text_to_image_module = get_text_to_image_module()
 
     scenario = await text_to_image_module.create_scenario(state["messages"][-5:])
-    os.makedirs("generated_images", exist_ok=True)
-    img_path = f"generated_images/image_{str(uuid4())}.png"
-    await text_to_image_module.generate_image(scenario.image_prompt, img_path)
+    image = await text_to_image_module.generate_image(scenario.image_prompt)
+    image_ref = await get_blob_store().aput(image)
 
     # Inject the image prompt information as an AI message
     scenario_message = HumanMessage(content=f"<image attached by Ava generated from prompt: {scenario.image_prompt}>")
     updated_messages = state["messages"] + [scenario_message]
 
-    response = await chain.ainvoke(
-        {
-            "messages": updated_messages,
-            "current_activity": current_activity,
-            "memory_context": memory_context,
-        },
+    response = await run_response(
+        chain.ainvoke(
+            {
+                "messages": updated_messages,
+                **get_character_prompt_inputs(
+                    summary=state.get("summary", ""),
+                    memory_context=memory_context,
+                    current_activity=current_activity,
+                ),
+            },
+            config,
+        ),
         config,
     )
 
-    return {"messages": AIMessage(content=response), "image_path": img_path}
+    return {"messages": AIMessage(content=response), "image_ref": image_ref, "image_path": None}
 
 
+@timed_node
 async def audio_node(state: AICompanionState, config: RunnableConfig):
     current_activity = ScheduleContextGenerator.get_current_activity()
     memory_context = state.get("memory_context", "")
     
-    chain = get_character_response_chain(
-        summary=state.get("summary", ""),
-        knowledge_context="",
-        memory_context=memory_context,
-        current_activity=current_activity
-    )
+    chain = get_character_response_chain(admin_commands_obj=admin_commands)
     text_to_speech_module = get_text_to_speech_module()
 
-    response = await chain.ainvoke(
-        {
-            "messages": state["messages"],
-            "current_activity": current_activity,
-            "memory_context": memory_context,
-        },
+    response = await run_response(
+        chain.ainvoke(
+            {
+                "messages": state["messages"],
+                **get_character_prompt_inputs(
+                    summary=state.get("summary", ""),
+                    memory_context=memory_context,
+                    current_activity=current_activity,
+                ),
+            },
+            config,
+        ),
         config,
     )
     output_audio = await text_to_speech_module.synthesize(response)
+    audio_ref = await get_blob_store().aput(output_audio)
 
-    return {"messages": response, "audio_buffer": output_audio}
+    # Clear the raw bytes older checkpoints of this thread may still carry
+    return {"messages": response, "audio_ref": audio_ref, "audio_buffer": None}
 
 
+@timed_node
 async def summarize_conversation_node(state: AICompanionState):
-    model = get_chat_model()
-    summary = state.get("summary", "")
-
-    if summary:
-        summary_message = (
-            f"This is summary of the conversation to date between Ava and the user: {summary}\n\n"
-            "Extend the summary by taking into account the new messages above:"
-        )
-    else:
-        summary_message = (
-            "Create a summary of the conversation above between Ava and the user. "
-            "The summary must be a short description of the conversation so far, "
-            "but that captures all the relevant information shared between Ava and the user:"
-        )
+    """Fold the messages about to be evicted into the summary (inline mode)."""
+    evicted = messages_to_evict(state["messages"])
+    if not evicted:
+        return {}
 
-    messages = state["messages"] + [HumanMessage(content=summary_message)]
-    response = await model.ainvoke(messages)
+    summary = await fold_into_summary(state.get("summary", ""), evicted, mode="inline")
+    return {"summary": summary, "messages": [RemoveMessage(id=m.id) for m in evicted]}
 
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][: -settings.TOTAL_MESSAGES_AFTER_SUMMARY]]
-    return {"summary": response.content, "messages": delete_messages}
 
+@timed_node
+async def memory_extraction_node(state: AICompanionState, config: RunnableConfig):
+    """Extract and store important information from the last message.
 
-async def memory_extraction_node(state: AICompanionState):
-    """Extract and store important information from the last message."""
+    In deferred mode the message is only recorded on the turn config; the interface
+    hands it to the background extraction pipeline once the reply is delivered.
+    """
     if not state["messages"]:
         return {}
 
+    deferred_memories = config.get("configurable", {}).get("deferred_memories")
+    if settings.MEMORY_EXTRACTION_MODE == "deferred" and deferred_memories is not None:
+        deferred_memories.append(state["messages"][-1])
+        return {}
+
     memory_manager = get_memory_manager()
-    await memory_manager.extract_and_store_memories(state["messages"][-1])
+    done = await run_optional(
+        "memory_extraction",
+        memory_manager.extract_and_store_memories(
+            state["messages"][-1],
+            MemoryScope(user_phone=state.get("user_phone"), user_group=state.get("user_group")),
+        ),
+        False,
+        config,
+    )
+    # Out of time inline: hand the message to the background pipeline instead of dropping it
+    if done is False and deferred_memories is not None:
+        deferred_memories.append(state["messages"][-1])
     return {}
 
 
-def memory_injection_node(state: AICompanionState):
+@timed_node
+async def memory_injection_node(state: AICompanionState, config: RunnableConfig):
     """Retrieve and inject relevant memories into the character card."""
-    memory_manager = get_memory_manager()
-
-    # Get relevant memories based on recent conversation
-    recent_context = " ".join([m.content for m in state["messages"][-3:]])
-    memories = memory_manager.get_relevant_memories(recent_context)
+    retrieval = await run_optional("memory_injection", get_turn_retrieval(config).get(state), None, config)
+    memories = retrieval.memories if retrieval is not None else []
+    for memory in memories:
+        logger.debug(f"Memory: '{memory.text}' (score: {memory.score:.2f})")
 
-    # Format memories for the character card
-    memory_context = memory_manager.format_memories_for_prompt(memories)
+    # Format memories for the character card; no MemoryManager (and its store and LLM) is needed for that
+    memory_context = MemoryManager.format_memories_for_prompt([memory.text for memory in memories])
 
+    speculation = get_speculation(config)
+    if speculation is not None:
+        speculation.publish("memory_context", memory_context)
     return {"memory_context": memory_context}
 
 
@@ -200,6 +275,7 @@ admin_commands.load_custom_prompts()
 admin_commands.load_system_config()
 
 
+@timed_node
 async def user_identification_node(state: AICompanionState) -> dict:
     """Identify user and check if this is their first interaction."""
     user_phone = state.get("user_phone")
@@ -234,6 +310,7 @@ async def user_identification_node(state: AICompanionState) -> dict:
     }
 
 
+@timed_node
 async def group_verification_node(state: AICompanionState) -> dict:
     """Handle user group verification for new/unverified users."""
     user_phone = state.get("user_phone")
@@ -304,6 +381,7 @@ async def group_verification_node(state: AICompanionState) -> dict:
     return {}
 
 
+@timed_node
 async def admin_command_node(state: AICompanionState) -> dict:
     """Process admin commands."""
     user_group = state.get("user_group")
@@ -317,7 +395,7 @@ async def admin_command_node(state: AICompanionState) -> dict:
     # Check if this is a command
     if last_message.strip().startswith("/"):
         command, params = admin_commands.parse_command(last_message)
-        response = admin_commands.execute_command(command, params)
+        response = await admin_commands.aexecute_command(command, params)
         
         return {"messages": [AIMessage(content=response)]}
     
@@ -0,0 +1,209 @@
+"""
+Application-scoped graph runtime.
+Compiles the workflow graph once and keeps a single SQLite checkpointer connection
+open for the lifetime of the process, shared by the WhatsApp and Chainlit interfaces.
+"""
+import asyncio
+import logging
+from functools import lru_cache
+from typing import AsyncContextManager, Dict, Optional
+
+import aiosqlite
+from langchain_core.messages import RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph.state import CompiledStateGraph
+
+from ai_companion.core.instrumentation import timed_dependency
+from ai_companion.graph import graph_builder
+from ai_companion.graph.leases import ThreadLeaseManager, create_lease_backend
+from ai_companion.graph.utils.deadline import create_deadline
+from ai_companion.graph.utils.retrieval import TurnRetrieval
+from ai_companion.graph.utils.speculation import Speculation
+from ai_companion.graph.utils.summarization import fold_into_summary, messages_to_evict
+from ai_companion.modules.memory.long_term.extraction_pipeline import get_memory_extraction_pipeline
+from ai_companion.modules.memory.long_term.vector_store import get_vector_store
+from ai_companion.modules.memory.short_term.compaction import get_checkpoint_compactor
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Applied to the checkpointer connection before the tables are created
+SQLITE_PRAGMAS = [
+    # Only takes effect on new databases; compaction converts existing ones
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+]
+
+
+class InstrumentedSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver that reports checkpoint reads and writes as sqlite dependency calls."""
+
+    async def aget_tuple(self, config: RunnableConfig):
+        with timed_dependency("sqlite", "get_checkpoint"):
+            return await super().aget_tuple(config)
+
+    async def aput(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        with timed_dependency("sqlite", "put_checkpoint"):
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes, task_id: str) -> None:
+        with timed_dependency("sqlite", "put_writes"):
+            return await super().aput_writes(config, writes, task_id)
+
+
+class GraphRuntime:
+    """Holds the compiled graph and its long-lived checkpointer."""
+
+    def __init__(self, db_path: str, leases: Optional[ThreadLeaseManager] = None):
+        self.db_path = db_path
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._graph: Optional[CompiledStateGraph] = None
+        self._lock = asyncio.Lock()
+        self.leases = leases or ThreadLeaseManager(create_lease_backend())
+        self._summary_tasks: Dict[str, asyncio.Task] = {}
+        self._summary_rerun: set[str] = set()
+
+    async def start(self) -> CompiledStateGraph:
+        """Open the checkpointer connection and compile the graph if not done yet."""
+        async with self._lock:
+            if self._graph is None:
+                self._conn = await aiosqlite.connect(self.db_path)
+                for pragma in SQLITE_PRAGMAS:
+                    await self._conn.execute(pragma)
+
+                checkpointer = InstrumentedSqliteSaver(self._conn)
+                await checkpointer.setup()
+                self._graph = graph_builder.compile(checkpointer=checkpointer)
+                get_checkpoint_compactor().start(settings.CHECKPOINT_COMPACTION_INTERVAL)
+                await self._warm_vector_store()
+                logger.info(f"Graph runtime started with checkpointer at {self.db_path}")
+        return self._graph
+
+    async def _warm_vector_store(self) -> None:
+        """Load the embedding model and resolve collections and payload indexes before the first turn.
+
+        Runs in a thread since both block. When Qdrant is unreachable the app still
+        starts and the store is built on first use instead.
+        """
+        try:
+            await asyncio.to_thread(get_vector_store)
+        except Exception as e:
+            logger.error(f"Vector store unavailable at startup: {e}")
+
+    async def get_graph(self) -> CompiledStateGraph:
+        """Get the compiled graph, starting the runtime lazily on first use."""
+        if self._graph is not None:
+            return self._graph
+        return await self.start()
+
+    def thread_lock(self, thread_id: str | int) -> AsyncContextManager[None]:
+        """Lease serializing checkpoint writes of a thread.
+
+        Turns and background summarization both hold it while they write the
+        thread's state, so neither overwrites the other's checkpoint. With a shared
+        lease backend this also holds across worker processes.
+        """
+        return self.leases.lease(thread_id)
+
+    def turn_config(self, thread_id: str | int) -> RunnableConfig:
+        """Build the config for one turn.
+
+        `deferred_memories` collects messages whose memory extraction is postponed
+        until the reply has been delivered, `deferred_summary` moves summarization
+        out of the graph (see `after_delivery`), `speculation` coordinates the
+        speculative conversation reply, `retrieval` shares the turn's memory and
+        knowledge lookup between nodes and `deadline` is the turn's time budget,
+        which starts counting here.
+        """
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "deferred_memories": [],
+                "deferred_summary": settings.SUMMARY_MODE == "deferred",
+                "speculation": Speculation() if settings.SPECULATIVE_CONVERSATION else None,
+                "retrieval": TurnRetrieval(),
+                "deadline": create_deadline(),
+            }
+        }
+
+    async def after_delivery(self, config: RunnableConfig, user_phone: str, user_group: Optional[str] = None) -> None:
+        """Hand off the background work recorded during a turn once its reply is out."""
+        deferred_memories = config["configurable"].get("deferred_memories")
+        if deferred_memories:
+            await get_memory_extraction_pipeline().submit(user_phone, deferred_memories, user_group)
+        if config["configurable"].get("deferred_summary"):
+            self.schedule_summary(config["configurable"]["thread_id"])
+
+    def schedule_summary(self, thread_id: str | int) -> None:
+        """Summarize a thread in the background.
+
+        Runs are coalesced per thread: while one is in flight, further requests
+        only mark the thread for a single follow-up run.
+        """
+        key = str(thread_id)
+        if key in self._summary_tasks:
+            self._summary_rerun.add(key)
+            return
+        task = asyncio.create_task(self._run_summaries(thread_id), name=f"summary-{key}")
+        self._summary_tasks[key] = task
+        task.add_done_callback(lambda _: self._summary_tasks.pop(key, None))
+
+    async def _run_summaries(self, thread_id: str | int) -> None:
+        key = str(thread_id)
+        while True:
+            self._summary_rerun.discard(key)
+            try:
+                await self._summarize(thread_id)
+            except Exception as e:
+                logger.error(f"Background summarization of thread {key} failed: {e}")
+            if key not in self._summary_rerun:
+                return
+
+    async def _summarize(self, thread_id: str | int) -> None:
+        """Fold the messages past the summary trigger into the thread's summary."""
+        graph = await self.get_graph()
+        config = {"configurable": {"thread_id": thread_id}}
+        state = (await graph.aget_state(config)).values
+        evicted = messages_to_evict(state.get("messages", []))
+        if not evicted:
+            return
+
+        # The LLM call runs unlocked; turns may append messages meanwhile
+        summary = await fold_into_summary(state.get("summary", ""), evicted, mode="deferred")
+
+        async with self.thread_lock(thread_id):
+            current_ids = {m.id for m in (await graph.aget_state(config)).values.get("messages", [])}
+            await graph.aupdate_state(
+                config,
+                {"summary": summary, "messages": [RemoveMessage(id=m.id) for m in evicted if m.id in current_ids]},
+                as_node="summarize_conversation_node",
+            )
+        logger.info(f"Summarized {len(evicted)} messages of thread {thread_id}")
+
+    async def close(self) -> None:
+        """Wait for background summaries and close the checkpointer connection."""
+        if self._summary_tasks:
+            await asyncio.gather(*list(self._summary_tasks.values()), return_exceptions=True)
+        await get_checkpoint_compactor().stop()
+        await self.leases.close()
+        async with self._lock:
+            if self._conn is not None:
+                await self._conn.close()
+            self._conn = None
+            self._graph = None
+
+
+@lru_cache
+def get_graph_runtime() -> GraphRuntime:
+    """Get or create the process-wide GraphRuntime instance."""
+    leases = ThreadLeaseManager(
+        create_lease_backend(),
+        ttl=settings.THREAD_LEASE_TTL,
+        acquire_timeout=settings.THREAD_LEASE_ACQUIRE_TIMEOUT,
+    )
+    return GraphRuntime(settings.SHORT_TERM_MEMORY_DB_PATH, leases=leases)
@@ -11,7 +11,10 @@ class AICompanionState(MessagesState):
         last_message (AnyMessage): The most recent message in the conversation, can be any valid
             LangChain message type (HumanMessage, AIMessage, etc.)
         workflow (str): The current workflow the AI Companion is in. Can be "conversation", "image", or "audio".
-        audio_buffer (bytes): The audio buffer to be used for speech-to-text conversion.
+        audio_ref (str): Blob store reference of the synthesized audio reply.
+        image_ref (str): Blob store reference of the generated image.
+        audio_buffer (bytes): Raw audio of the reply; only set by checkpoints written before audio_ref.
+        image_path (str): File path of the generated image; only set by checkpoints written before image_ref.
         current_activity (str): The current activity of Ava based on the schedule.
         memory_context (str): The context of the memories to be injected into the character card.
         user_phone (str): The phone number of the user interacting with the agent.
@@ -20,10 +23,13 @@ class AICompanionState(MessagesState):
         user_verified (bool): Whether the user has been verified.
         awaiting_verification (bool): Whether the agent is waiting for user verification response.
         knowledge_context (str): Context retrieved from knowledge base.
+        input_modality (str): How the last user message arrived ("text", "image" or "audio").
     """
 
     summary: str
     workflow: str
+    audio_ref: str
+    image_ref: str
     audio_buffer: bytes
     image_path: str
     current_activity: str
@@ -37,3 +43,4 @@ class AICompanionState(MessagesState):
     knowledge_context: str
     mito_context: Optional[dict]
     fps_calendar: Optional[str]
+    input_modality: str
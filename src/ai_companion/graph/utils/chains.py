@@ -1,3 +1,6 @@
+import logging
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from pydantic import BaseModel, Field
 
@@ -12,6 +15,14 @@ from ai_companion.core.prompts import (
     UNVERIFIED_USER_PROMPT,
 )
 from ai_companion.graph.utils.helpers import AsteriskRemovalParser, get_chat_model
+from ai_companion.graph.utils.prompt_cache import PromptCache
+from ai_companion.modules.llm import get_llm_registry
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Parsed character chains per user group, invalidated by prompt version
+character_chain_cache = PromptCache()
 
 
 class RouterResponse(BaseModel):
@@ -20,6 +31,7 @@ class RouterResponse(BaseModel):
     )
 
 
+@lru_cache
 def get_router_chain():
     model = get_chat_model(temperature=0.3).with_structured_output(RouterResponse)
 
@@ -27,7 +39,7 @@ def get_router_chain():
         [("system", ROUTER_PROMPT), MessagesPlaceholder(variable_name="messages")]
     )
 
-    return prompt | model
+    return prompt | get_llm_registry().throttle(model, settings.TEXT_MODEL_NAME)
 
 
 def get_prompt_for_group(user_group: str) -> str:
@@ -43,42 +55,76 @@ def get_prompt_for_group(user_group: str) -> str:
     return group_prompts.get(user_group, CHARACTER_CARD_PROMPT)
 
 
+def _build_character_chain(base_prompt: str):
+    """Parse the group prompt into a reusable template and chain.
+
+    Raises ValueError when the prompt does not parse or uses a variable outside
+    CHARACTER_PROMPT_VARIABLES.
+    """
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", base_prompt + "{conversation_summary}"),
+            MessagesPlaceholder(variable_name="messages"),
+        ]
+    )
+    # A variable the turn does not supply would only fail with a KeyError when invoked
+    unknown = set(prompt.input_variables) - CHARACTER_PROMPT_VARIABLES
+    if unknown:
+        raise ValueError(f"Unknown prompt variables: {', '.join(sorted(unknown))}")
+
+    model = get_chat_model()
+    return prompt | get_llm_registry().throttle(model, settings.TEXT_MODEL_NAME) | AsteriskRemovalParser()
+
+
 def get_character_response_chain(
-    summary: str = "", 
-    knowledge_context: str = "", 
-    memory_context: str = "", 
-    current_activity: str = "",
     user_group: str = "ffl",  # Default to FFL (original behavior)
-    fps_calendar: str = "",
     admin_commands_obj = None
 ):
-    model = get_chat_model()
-    
-    # Get the appropriate prompt for the user's group
-    base_prompt = get_prompt_for_group(user_group)
-    
-    # Check if admin has custom prompt for this group
-    if admin_commands_obj:
-        custom_prompt = admin_commands_obj.get_custom_prompt(user_group)
+    """Get the cached character chain for a group.
+
+    The chain is rebuilt only when the admin changes the group's custom prompt,
+    which bumps its prompt version. Per-turn context is passed at invocation time,
+    see `get_character_prompt_inputs`.
+    """
+    version = admin_commands_obj.get_prompt_version(user_group) if admin_commands_obj else 0
+
+    def build():
+        # Check if admin has custom prompt for this group
+        custom_prompt = admin_commands_obj.get_custom_prompt(user_group) if version else None
         if custom_prompt:
-            base_prompt = custom_prompt
-    
-    # Format the prompt with context
-    system_message = base_prompt.format(
-        memory_context=memory_context,
-        current_activity=current_activity,
-        knowledge_context=knowledge_context,
-        fps_calendar=fps_calendar if user_group == "fps" else "",
-    )
+            try:
+                return _build_character_chain(custom_prompt)
+            except ValueError as e:
+                logger.error(f"Invalid custom prompt for group '{user_group}', using default: {e}")
+        return _build_character_chain(get_prompt_for_group(user_group))
 
-    if summary:
-        system_message += f"\n\nSummary of conversation earlier between Ava and the user: {summary}"
+    return character_chain_cache.get(user_group, version, build)
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_message),
-            MessagesPlaceholder(variable_name="messages"),
-        ]
+
+def get_system_template(chain) -> str:
+    """Raw system prompt template of a character chain, used to measure its token cost."""
+    return chain.first.messages[0].prompt.template
+
+
+def get_character_prompt_inputs(
+    summary: str = "",
+    knowledge_context: str = "",
+    memory_context: str = "",
+    current_activity: str = "",
+    fps_calendar: str = "",
+) -> dict:
+    """Build the per-turn variables for the character prompt template."""
+    conversation_summary = (
+        f"\n\nSummary of conversation earlier between Ava and the user: {summary}" if summary else ""
     )
+    return {
+        "memory_context": memory_context,
+        "current_activity": current_activity,
+        "knowledge_context": knowledge_context,
+        "fps_calendar": fps_calendar,
+        "conversation_summary": conversation_summary,
+    }
+
 
-    return prompt | model | AsteriskRemovalParser()
+# Variables a character prompt may use: the per-turn inputs and the message history
+CHARACTER_PROMPT_VARIABLES = frozenset(get_character_prompt_inputs()) | {"messages"}
@@ -0,0 +1,181 @@
+"""
+Token-budgeted context assembly for the character prompt.
+Every component is measured in tokens and admitted by priority and recency until the
+per-model budget is spent; lower-priority content is trimmed or dropped.
+"""
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Separates knowledge chunks inside knowledge_context so they can be budgeted one by one
+KNOWLEDGE_CHUNK_SEPARATOR = "\n\n---\n\n"
+
+# Per-message overhead for role and formatting tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Trimmed blocks shorter than this are dropped instead
+MIN_TRIMMED_TOKENS = 32
+
+
+@lru_cache
+def _get_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        logger.warning("tiktoken unavailable, estimating tokens from character count")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the cl100k encoding, or estimate them at ~4 characters per token."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return encoding.decode(tokens[:max_tokens]) if len(tokens) > max_tokens else text
+
+
+def get_token_budget(model_name: str) -> int:
+    """Prompt token budget for a model, falling back to CONTEXT_TOKEN_BUDGET."""
+    return settings.CONTEXT_TOKEN_BUDGETS.get(model_name, settings.CONTEXT_TOKEN_BUDGET)
+
+
+@dataclass
+class ConversationContext:
+    """Context admitted into the prompt plus its token breakdown."""
+
+    messages: List[BaseMessage]
+    memory_context: str = ""
+    knowledge_context: str = ""
+    summary: str = ""
+    current_activity: str = ""
+    tokens: Dict[str, int] = field(default_factory=dict)
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+
+class ContextBuilder:
+    """Fills a token budget with conversation context in priority order.
+
+    Priority, highest first: the latest message, the most recent messages, memories,
+    knowledge chunks, the conversation summary, older messages, and Ava's activity.
+    Messages are admitted newest first and never cut; text blocks are trimmed to fit.
+    """
+
+    def __init__(self, budget: int, response_reserve: int = 512, recent_messages: int = 4):
+        self.budget = budget
+        self.response_reserve = response_reserve
+        self.recent_messages = recent_messages
+        self._remaining = 0
+
+    def _take(self, tokens: int) -> bool:
+        if tokens > self._remaining:
+            return False
+        self._remaining -= tokens
+        return True
+
+    def _fit_items(self, items: List[str], trim_last: bool) -> tuple[List[str], int, int]:
+        """Admit items in order; returns (kept, tokens used, number dropped)."""
+        kept, used = [], 0
+        for i, item in enumerate(items):
+            tokens = count_tokens(item)
+            if self._take(tokens):
+                kept.append(item)
+                used += tokens
+                continue
+            if trim_last and self._remaining >= MIN_TRIMMED_TOKENS:
+                trimmed = truncate_to_tokens(item, self._remaining)
+                tokens = count_tokens(trimmed)
+                self._remaining -= tokens
+                kept.append(trimmed)
+                used += tokens
+            return kept, used, len(items) - len(kept)
+        return kept, used, 0
+
+    def _fit_messages(self, messages: List[BaseMessage]) -> tuple[List[BaseMessage], int]:
+        """Admit messages newest first, stopping at the first one that does not fit."""
+        kept, used = [], 0
+        for message in reversed(messages):
+            tokens = count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+            if not self._take(tokens):
+                break
+            kept.append(message)
+            used += tokens
+        kept.reverse()
+        return kept, used
+
+    def build(
+        self,
+        messages: List[BaseMessage],
+        system_prompt: str = "",
+        memory_context: str = "",
+        knowledge_context: str = "",
+        summary: str = "",
+        current_activity: Optional[str] = "",
+    ) -> ConversationContext:
+        tokens: Dict[str, int] = {}
+        dropped: Dict[str, int] = {}
+
+        tokens["system"] = count_tokens(system_prompt)
+        self._remaining = max(self.budget - self.response_reserve - tokens["system"], 0)
+
+        # The latest message is always sent, even when it alone exceeds the budget
+        latest = messages[-1:]
+        tokens["latest_message"] = sum(count_tokens(m.content) + MESSAGE_OVERHEAD_TOKENS for m in latest)
+        self._remaining = max(self._remaining - tokens["latest_message"], 0)
+
+        history = messages[:-1]
+        split = max(len(history) - (self.recent_messages - 1), 0)
+        recent, tokens["recent_messages"] = self._fit_messages(history[split:])
+
+        memories, tokens["memory"], dropped["memory"] = self._fit_items(
+            [line for line in memory_context.split("\n") if line.strip()], trim_last=False
+        )
+        chunks, tokens["knowledge"], dropped["knowledge"] = self._fit_items(
+            [c for c in knowledge_context.split(KNOWLEDGE_CHUNK_SEPARATOR) if c.strip()], trim_last=True
+        )
+        summary_kept, tokens["summary"], dropped["summary"] = self._fit_items([summary] if summary else [], True)
+
+        # Older messages only count if every more recent one made it in
+        older: List[BaseMessage] = []
+        tokens["older_messages"] = 0
+        if len(recent) == len(history[split:]):
+            older, tokens["older_messages"] = self._fit_messages(history[:split])
+        dropped["messages"] = len(history) - len(recent) - len(older)
+
+        activity_kept, tokens["activity"], dropped["activity"] = self._fit_items(
+            [current_activity] if current_activity else [], trim_last=True
+        )
+
+        context = ConversationContext(
+            messages=older + recent + latest,
+            memory_context="\n".join(memories),
+            knowledge_context=KNOWLEDGE_CHUNK_SEPARATOR.join(chunks),
+            summary=summary_kept[0] if summary_kept else "",
+            current_activity=activity_kept[0] if activity_kept else "",
+            tokens=tokens,
+            dropped={name: count for name, count in dropped.items() if count},
+        )
+        logger.info(
+            f"Context tokens: {sum(tokens.values())}/{self.budget} {tokens}"
+            + (f" dropped: {context.dropped}" if context.dropped else "")
+        )
+        return context
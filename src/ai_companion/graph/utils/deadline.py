@@ -0,0 +1,121 @@
+"""
+Per-turn deadline budget.
+Each turn carries a deadline in its config. Optional context steps only get the
+time left after the response reserve and fall back to empty results when it runs
+out; the response LLM call gets whatever is left at the end.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Optional, TypeVar
+
+from langchain_core.runnables import RunnableConfig
+
+from ai_companion.core.metrics import metrics
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+steps_skipped = metrics.counter(
+    "graph_step_skipped_total",
+    "Optional steps skipped (budget) or cut short (timeout) to meet the turn deadline",
+    ["step", "reason"],
+)
+response_budget = metrics.histogram(
+    "turn_response_budget_seconds",
+    "Time left on the turn deadline when the response LLM call starts",
+    buckets=(0, 1, 2.5, 5, 7.5, 10, 15, 20, 30, 60),
+)
+response_timeouts = metrics.counter(
+    "turn_response_timeout_total",
+    "Response LLM calls that missed the turn deadline",
+)
+
+
+class Deadline:
+    """Time budget of one turn, measured from its creation.
+
+    `response_reserve` seconds are kept for the response node; optional steps may
+    only use the time before that.
+    """
+
+    def __init__(self, budget: float, response_reserve: float):
+        self.budget = budget
+        self.response_reserve = response_reserve
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def optional_budget(self) -> float:
+        """Time optional steps may still use."""
+        return self.remaining() - self.response_reserve
+
+    def response_timeout(self) -> float:
+        """Timeout of the response call: what is left, but never less than the reserve."""
+        remaining = self.remaining()
+        response_budget.observe(max(remaining, 0.0))
+        return max(remaining, self.response_reserve)
+
+    def exhausted(self, step: str) -> bool:
+        """True, and recorded as a skip, when no time is left for the optional `step`."""
+        if self.optional_budget() > 0:
+            return False
+        steps_skipped.inc(step=step, reason="budget")
+        logger.warning(f"Skipping {step}: turn deadline budget exhausted")
+        return True
+
+
+def get_deadline(config: Optional[RunnableConfig]) -> Optional[Deadline]:
+    """The turn's Deadline, if the turn has one."""
+    return (config or {}).get("configurable", {}).get("deadline")
+
+
+def create_deadline() -> Optional[Deadline]:
+    """A Deadline from TURN_DEADLINE, or None when deadlines are disabled."""
+    if settings.TURN_DEADLINE <= 0:
+        return None
+    return Deadline(settings.TURN_DEADLINE, settings.TURN_RESPONSE_RESERVE)
+
+
+async def run_optional(step: str, awaitable: Awaitable[T], default: T, config: Optional[RunnableConfig]) -> T:
+    """Await an optional step within the turn's remaining budget.
+
+    Returns `default` without running the step when the budget is already spent,
+    or when the step does not finish in time.
+    """
+    deadline = get_deadline(config)
+    if deadline is None:
+        return await awaitable
+
+    if deadline.exhausted(step):
+        # Close the coroutine so it is not reported as never awaited
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        return default
+
+    try:
+        return await asyncio.wait_for(awaitable, timeout=deadline.optional_budget())
+    except asyncio.TimeoutError:
+        steps_skipped.inc(step=step, reason="timeout")
+        logger.warning(f"Cut {step} short to meet the turn deadline")
+        return default
+
+
+async def run_response(awaitable: Awaitable[T], config: Optional[RunnableConfig]) -> T:
+    """Await the response call with whatever time the turn has left.
+
+    Raises asyncio.TimeoutError when it does not finish in time; the interface
+    then sends TURN_TIMEOUT_REPLY instead.
+    """
+    deadline = get_deadline(config)
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=deadline.response_timeout())
+    except asyncio.TimeoutError:
+        response_timeouts.inc()
+        logger.error("Response call missed the turn deadline")
+        raise
@@ -1,26 +1,26 @@
 import re
+from functools import lru_cache
+from typing import Optional
 
 from langchain_core.output_parsers import StrOutputParser
-from langchain_groq import ChatGroq
 
+from ai_companion.modules.blobs import get_blob_store
 from ai_companion.modules.image.image_to_text import ImageToText
 from ai_companion.modules.image.text_to_image import TextToImage
+from ai_companion.modules.llm import get_llm_registry
 from ai_companion.modules.speech import TextToSpeech
 from ai_companion.settings import settings
 
 
-def get_chat_model(temperature: float = 0.7):
-    return ChatGroq(
-        api_key=settings.GROQ_API_KEY,
-        model_name=settings.TEXT_MODEL_NAME,
-        temperature=temperature,
-    )
+def get_chat_model(temperature: float = 0.7, model_name: str = settings.TEXT_MODEL_NAME):
+    return get_llm_registry().get_chat_model(model_name, temperature=temperature)
 
 
 def get_text_to_speech_module():
     return TextToSpeech()
 
 
+@lru_cache
 def get_text_to_image_module():
     return TextToImage()
 
@@ -29,6 +29,26 @@ def get_image_to_text_module():
     return ImageToText()
 
 
+async def load_response_media(state: dict) -> Optional[bytes]:
+    """Resolve the audio or image of an audio/image workflow reply from the blob store.
+
+    Falls back to the raw audio_buffer and image_path fields written before replies
+    were moved to blob references.
+    """
+    workflow = state.get("workflow")
+    if workflow == "audio":
+        if state.get("audio_ref"):
+            return await get_blob_store().aget(state["audio_ref"])
+        return state.get("audio_buffer")
+    if workflow == "image":
+        if state.get("image_ref"):
+            return await get_blob_store().aget(state["image_ref"])
+        if state.get("image_path"):
+            with open(state["image_path"], "rb") as f:
+                return f.read()
+    return None
+
+
 def remove_asterisk_content(text: str) -> str:
     """Remove content between asterisks from the text."""
     return re.sub(r"\*.*?\*", "", text).strip()
@@ -0,0 +1,40 @@
+"""
+Cache of per-group character prompt chains.
+Templates are parsed once per group and prompt version and reused across turns,
+so only the per-turn context variables are formatted on each call.
+"""
+import threading
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class PromptCache:
+    """Holds one built entry per group, keyed by the group's prompt version.
+
+    Asking for a newer version rebuilds the entry and drops the stale one, so a
+    version bump is all that is needed to invalidate a group.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Hashable, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, group: str, version: Hashable, build: Callable[[], T]) -> T:
+        with self._lock:
+            entry = self._entries.get(group)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+
+        value = build()
+        with self._lock:
+            self._entries[group] = (version, value)
+        return value
+
+    def invalidate(self, group: str | None = None) -> None:
+        """Drop the cached entry of a group, or of every group."""
+        with self._lock:
+            if group is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(group, None)
@@ -0,0 +1,64 @@
+"""
+Per-turn retrieval memo.
+The memory and knowledge nodes run in parallel; whichever starts first runs the
+turn's combined lookup and the other awaits the same result.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from ai_companion.modules.memory.long_term.extraction_pipeline import get_memory_extraction_pipeline
+from ai_companion.modules.memory.long_term.vector_store import (
+    MemoryScope,
+    RetrievalResult,
+    get_retrieval_service,
+)
+from ai_companion.settings import settings
+
+# Knowledge chunks retrieved per turn
+KNOWLEDGE_TOP_K = 3
+
+
+class TurnRetrieval:
+    """Runs the retrieval of one turn at most once and shares its result."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self, state: dict) -> RetrievalResult:
+        if self._task is None:
+            self._task = asyncio.create_task(self._retrieve(state))
+        # A caller cut short by the turn deadline must not cancel the lookup for the other
+        return await asyncio.shield(self._task)
+
+    async def _retrieve(self, state: dict) -> RetrievalResult:
+        # Make sure memories from the user's previous messages are stored before reading
+        await get_memory_extraction_pipeline().wait_for(
+            state.get("user_phone"), timeout=settings.MEMORY_EXTRACTION_WAIT_TIMEOUT
+        )
+        messages = state["messages"]
+        return await get_retrieval_service().retrieve(
+            memory_query=" ".join(m.content for m in messages[-3:]),
+            knowledge_query=messages[-1].content,
+            memory_k=settings.MEMORY_TOP_K,
+            knowledge_k=KNOWLEDGE_TOP_K,
+            scope=memory_scope(state),
+            recency_weight=settings.MEMORY_RECENCY_WEIGHT,
+            half_life_days=settings.MEMORY_RECENCY_HALF_LIFE_DAYS,
+        )
+
+
+def memory_scope(state: dict) -> MemoryScope:
+    """The memories a turn may read: the user's own, no older than MEMORY_MAX_AGE_DAYS."""
+    since = None
+    if settings.MEMORY_MAX_AGE_DAYS:
+        since = datetime.now(timezone.utc) - timedelta(days=settings.MEMORY_MAX_AGE_DAYS)
+    return MemoryScope(user_phone=state.get("user_phone"), since=since)
+
+
+def get_turn_retrieval(config: Optional[RunnableConfig]) -> TurnRetrieval:
+    """The turn's shared TurnRetrieval, or a private one when the config has none."""
+    retrieval = (config or {}).get("configurable", {}).get("retrieval")
+    return retrieval if retrieval is not None else TurnRetrieval()
@@ -0,0 +1,180 @@
+"""
+Tiered workflow routing.
+A cheap deterministic classifier settles the clear cases, a small decision cache
+remembers recent LLM answers, and only the remaining messages reach the LLM router.
+"""
+import asyncio
+import logging
+import random
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.messages import BaseMessage
+
+from ai_companion.core.metrics import metrics
+from ai_companion.graph.utils.chains import get_router_chain
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+router_decisions = metrics.counter(
+    "router_decisions_total",
+    "Routing decisions by tier (rules, cache, llm) and chosen workflow",
+    ["tier", "workflow"],
+)
+router_shadow_checks = metrics.counter(
+    "router_shadow_checks_total",
+    "Rule decisions re-checked by the LLM router, by agreement",
+    ["result"],
+)
+
+# Explicit requests, matched on lowercase text without accents (Portuguese and English)
+IMAGE_REQUEST_PATTERNS = [
+    re.compile(
+        r"\b(manda|mande|envia|envie|mostra|mostre|gera|gere|cria|crie|faz|faca|desenha|desenhe|tira|tire)\b"
+        r".{0,30}\b(foto|fotografia|imagem|selfie|desenho|figura|retrato)"
+    ),
+    re.compile(r"\b(quero|queria|gostaria de|posso|deixa eu) ver\b.{0,30}\b(foto|imagem|selfie)"),
+    re.compile(r"\b(send|show|give|share|generate|create|make|draw|take)\b.{0,30}\b(photo|picture|pic|image|selfie|drawing)"),
+    re.compile(r"\bcan i see\b.{0,30}\b(photo|picture|pic|image|selfie)"),
+    re.compile(r"\bwhat do you look like\b|\bcomo voce e fisicamente\b"),
+]
+
+AUDIO_REQUEST_PATTERNS = [
+    re.compile(
+        r"\b(manda|mande|envia|envie|grava|grave|fala|fale|responde|responda)\b"
+        r".{0,30}\b(audio|mensagem de voz|nota de voz|voz)\b"
+    ),
+    re.compile(r"\b(quero|queria|gostaria de) (te )?(ouvir|escutar)\b"),
+    re.compile(r"\b(em|por|num|no) audio\b"),
+    re.compile(r"\b(send|record|reply with|respond with|give)\b.{0,30}\b(audio|voice note|voice message|voice)\b"),
+    re.compile(r"\b(want|like|love|need) to hear\b|\bhear your voice\b|\bin (an )?audio\b"),
+]
+
+# Words that hint at a media request without being one on their own
+MEDIA_HINTS = re.compile(
+    r"\b(foto|fotos|fotografia|imagem|imagens|selfie|desenh\w*|retrato|figura|audio|audios|voz|ouvir|escutar|grav\w*"
+    r"|photo|photos|picture|pictures|pic|pics|image|images|draw\w*|voice|hear|listen|record\w*)\b"
+)
+
+# Short replies that may be accepting an offer made in the previous AI message
+SHORT_REPLY_MAX_WORDS = 6
+
+
+def normalize(text: str) -> str:
+    """Lowercase the text and strip accents so the rules match both "áudio" and "audio"."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).strip()
+
+
+def classify_workflow(text: str, modality: str = "text", previous_ai_text: str = "") -> Optional[str]:
+    """Classify the last user message without calling the LLM.
+
+    Args:
+        text: The last user message
+        modality: How the message arrived ("text", "image" or "audio")
+        previous_ai_text: The AI message right before it, if any
+
+    Returns:
+        "conversation", "image" or "audio", or None when the rules are unsure
+    """
+    normalized = normalize(text)
+    wants_image = any(pattern.search(normalized) for pattern in IMAGE_REQUEST_PATTERNS)
+    wants_audio = any(pattern.search(normalized) for pattern in AUDIO_REQUEST_PATTERNS)
+
+    if wants_image and wants_audio:
+        return None
+    if wants_image:
+        return "image"
+    if wants_audio:
+        return "audio"
+
+    # "Yes, send it" after Ava offered a photo or a voice note needs the conversation context
+    if len(normalized.split()) <= SHORT_REPLY_MAX_WORDS and MEDIA_HINTS.search(normalize(previous_ai_text)):
+        return None
+
+    if MEDIA_HINTS.search(normalized):
+        # A shared photo usually comes with a caption about it, not a request for one
+        return "conversation" if modality == "image" else None
+
+    return "conversation"
+
+
+class RouterDecisionCache:
+    """LRU cache of LLM routing decisions keyed by normalized message and modality."""
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+
+    def get(self, text: str, modality: str) -> Optional[str]:
+        key = (normalize(text), modality)
+        workflow = self._entries.get(key)
+        if workflow is not None:
+            self._entries.move_to_end(key)
+        return workflow
+
+    def put(self, text: str, modality: str, workflow: str) -> None:
+        key = (normalize(text), modality)
+        self._entries[key] = workflow
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class TieredRouter:
+    """Routes a turn through the rules, then the decision cache, then the LLM router."""
+
+    def __init__(self, cache_size: int = 2048, shadow_sample_rate: float = 0.0):
+        self.cache = RouterDecisionCache(cache_size)
+        self.shadow_sample_rate = shadow_sample_rate
+        self._shadow_tasks: set[asyncio.Task] = set()
+
+    async def route(self, messages: list[BaseMessage], modality: str = "text") -> str:
+        """Pick the workflow for the last message of the conversation."""
+        text = messages[-1].content
+        previous_ai_text = next((m.content for m in reversed(messages[:-1]) if m.type == "ai"), "")
+        recent_messages = messages[-settings.ROUTER_MESSAGES_TO_ANALYZE :]
+
+        workflow = classify_workflow(text, modality, previous_ai_text)
+        if workflow is not None:
+            router_decisions.inc(tier="rules", workflow=workflow)
+            if random.random() < self.shadow_sample_rate:
+                self._start_shadow_check(recent_messages, workflow)
+            return workflow
+
+        # Cached answers are only valid when the previous AI message adds no media context
+        cacheable = not MEDIA_HINTS.search(normalize(previous_ai_text))
+        if cacheable:
+            workflow = self.cache.get(text, modality)
+            if workflow is not None:
+                router_decisions.inc(tier="cache", workflow=workflow)
+                return workflow
+
+        workflow = await self._ask_llm(recent_messages)
+        router_decisions.inc(tier="llm", workflow=workflow)
+        if cacheable:
+            self.cache.put(text, modality, workflow)
+        return workflow
+
+    async def _ask_llm(self, messages: list[BaseMessage]) -> str:
+        chain = get_router_chain()
+        response = await chain.ainvoke({"messages": messages})
+        return response.response_type
+
+    def _start_shadow_check(self, messages: list[BaseMessage], workflow: str) -> None:
+        """Compare a rule decision against the LLM router in the background to track accuracy."""
+
+        async def check():
+            try:
+                llm_workflow = await self._ask_llm(messages)
+            except Exception as e:
+                logger.debug(f"Router shadow check failed: {e}")
+                return
+            router_shadow_checks.inc(result="agree" if llm_workflow == workflow else "disagree")
+
+        task = asyncio.create_task(check())
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
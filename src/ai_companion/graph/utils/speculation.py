@@ -0,0 +1,111 @@
+"""
+Speculative conversation replies.
+Most turns end in the conversation node, so in speculative mode the reply is
+generated while the router is still deciding and discarded if it picks image or audio.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from ai_companion.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+speculation_results = metrics.counter(
+    "speculative_reply_total",
+    "Speculative conversation replies by outcome (hit, miss, skipped, error)",
+    ["result"],
+)
+speculation_saved = metrics.histogram(
+    "speculative_reply_saved_seconds",
+    "Reply latency saved by overlapping the conversation call with routing",
+)
+speculation_wasted = metrics.histogram(
+    "speculative_reply_wasted_seconds",
+    "LLM time spent on speculative replies that were discarded",
+)
+
+# Context the reply needs from the parallel context branches
+REQUIRED_INPUTS = ("memory_context", "knowledge_context")
+
+
+class Speculation:
+    """Per-turn coordination between the context branches, the router and the speculative reply.
+
+    Context branches publish their outputs, the speculative node starts the reply as
+    soon as they are all in, and the router settles whether the reply is kept.
+    """
+
+    def __init__(self):
+        self.inputs: Dict[str, str] = {}
+        self.workflow: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.routed_at: Optional[float] = None
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    def publish(self, key: str, value: str) -> None:
+        """Record a context input; safe to call from sync nodes running in worker threads."""
+        try:
+            running_here = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            running_here = False
+        if running_here:
+            self._set(key, value)
+        else:
+            self._loop.call_soon_threadsafe(self._set, key, value)
+
+    def _set(self, key: str, value: str) -> None:
+        self.inputs[key] = value
+        if all(name in self.inputs for name in REQUIRED_INPUTS):
+            self._ready.set()
+
+    def route(self, workflow: str) -> None:
+        """Record the router decision, cancelling the speculative reply if it is not needed."""
+        self.workflow = workflow
+        self.routed_at = time.perf_counter()
+        if workflow != "conversation" and self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def run(self, generate: Callable[[Dict[str, str]], Awaitable[str]]) -> None:
+        """Generate the reply once the context is in, unless the router already ruled it out."""
+        await self._ready.wait()
+        if self.workflow not in (None, "conversation"):
+            speculation_results.inc(result="skipped")
+            return
+
+        self.started_at = time.perf_counter()
+        self.task = asyncio.create_task(generate(dict(self.inputs)))
+        # asyncio.wait does not raise when the router cancels the task
+        await asyncio.wait([self.task])
+        self.finished_at = time.perf_counter()
+
+        if self.task.cancelled() or self.workflow not in (None, "conversation"):
+            speculation_results.inc(result="miss")
+            speculation_wasted.observe(self.finished_at - self.started_at)
+        elif self.task.exception() is not None:
+            speculation_results.inc(result="error")
+            logger.warning(f"Speculative reply failed: {self.task.exception()}")
+
+    def take(self) -> Optional[str]:
+        """The speculative reply if it completed, or None to generate it normally."""
+        if self.task is None or not self.task.done() or self.task.cancelled() or self.task.exception() is not None:
+            return None
+
+        # Without speculation the reply would have started once routing and context were both done
+        duration = self.finished_at - self.started_at
+        routed_at = self.routed_at or self.started_at
+        saved = max(routed_at, self.started_at) + duration - max(self.finished_at, routed_at)
+        speculation_results.inc(result="hit")
+        speculation_saved.observe(max(saved, 0.0))
+        return self.task.result()
+
+
+def get_speculation(config: Optional[RunnableConfig]) -> Optional[Speculation]:
+    """The turn's Speculation, when speculative mode is on."""
+    return (config or {}).get("configurable", {}).get("speculation")
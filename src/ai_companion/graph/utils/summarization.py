@@ -0,0 +1,61 @@
+"""
+Incremental conversation summarization.
+Only the messages about to be evicted from the checkpoint are folded into the
+existing summary, using the small text model.
+"""
+from typing import List, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from ai_companion.core.metrics import metrics
+from ai_companion.graph.utils.helpers import get_chat_model
+from ai_companion.modules.llm import get_llm_registry
+from ai_companion.settings import settings
+
+summary_runs = metrics.counter("conversation_summary_runs_total", "Conversation summarization runs", ["mode", "status"])
+summary_duration = metrics.histogram("conversation_summary_seconds", "Time to fold messages into the summary", ["mode"])
+
+SPEAKERS = {"human": "User", "ai": "Ava"}
+
+
+def messages_to_evict(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Messages dropped from the checkpoint once the summary trigger is passed."""
+    if len(messages) <= settings.TOTAL_MESSAGES_SUMMARY_TRIGGER:
+        return []
+    return list(messages[: -settings.TOTAL_MESSAGES_AFTER_SUMMARY])
+
+
+def format_transcript(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(f"{SPEAKERS.get(m.type, m.type)}: {m.content}" for m in messages if m.content)
+
+
+async def fold_into_summary(summary: str, messages: Sequence[BaseMessage], mode: str = "inline") -> str:
+    """Extend the summary with the given messages and return the new summary."""
+    transcript = format_transcript(messages)
+    if summary:
+        prompt = (
+            f"This is a summary of the conversation to date between Ava and the user: {summary}\n\n"
+            f"These are the next messages of the conversation:\n{transcript}\n\n"
+            "Extend the summary by taking these messages into account. Keep it short, "
+            "but keep all the relevant information shared between Ava and the user:"
+        )
+    else:
+        prompt = (
+            f"This is a conversation between Ava and the user:\n{transcript}\n\n"
+            "Create a summary of the conversation. The summary must be a short description "
+            "of the conversation so far, but that captures all the relevant information "
+            "shared between Ava and the user:"
+        )
+
+    model_name = settings.SMALL_TEXT_MODEL_NAME
+    status = "ok"
+    try:
+        with summary_duration.time(mode=mode):
+            async with get_llm_registry().slot(model_name):
+                response = await get_chat_model(model_name=model_name).ainvoke([HumanMessage(content=prompt)])
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        summary_runs.inc(mode=mode, status=status)
+    return response.content
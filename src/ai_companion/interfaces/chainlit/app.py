@@ -1,10 +1,12 @@
+import asyncio
 from io import BytesIO
 
 import chainlit as cl
 from langchain_core.messages import AIMessageChunk, HumanMessage
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 
-from ai_companion.graph import graph_builder
+from ai_companion.core.instrumentation import track_turn
+from ai_companion.graph.runtime import get_graph_runtime
+from ai_companion.graph.utils.helpers import load_response_media
 from ai_companion.modules.image import ImageToText
 from ai_companion.modules.speech import SpeechToText, TextToSpeech
 from ai_companion.settings import settings
@@ -20,6 +22,8 @@ async def on_chat_start():
     """Initialize the chat session"""
     # thread_id = cl.user_session.get("id")
     cl.user_session.set("thread_id", 1)
+    # Compile the graph and warm the vector store before the first message
+    await get_graph_runtime().start()
 
 
 @cl.on_message
@@ -29,6 +33,7 @@ async def on_message(message: cl.Message):
 
     # Process any attached images
     content = message.content
+    input_modality = "text"
     if message.elements:
         for elem in message.elements:
             if isinstance(elem, cl.Image):
@@ -36,6 +41,8 @@ async def on_message(message: cl.Message):
                 with open(elem.path, "rb") as f:
                     image_bytes = f.read()
 
+                input_modality = "image"
+
                 # Analyze image and add to message content
                 try:
                     # Use global ImageToText instance
@@ -53,22 +60,34 @@ async def on_message(message: cl.Message):
     # Use a simulated phone number for Chainlit testing (thread_id based)
     user_phone = f"+5511test{thread_id}"
 
-    async with cl.Step(type="run"):
-        async with AsyncSqliteSaver.from_conn_string(settings.SHORT_TERM_MEMORY_DB_PATH) as short_term_memory:
-            graph = graph_builder.compile(checkpointer=short_term_memory)
-            async for chunk in graph.astream(
-                {"messages": [HumanMessage(content=content)], "user_phone": user_phone},
-                {"configurable": {"thread_id": thread_id}},
-                stream_mode="messages",
-            ):
-                if chunk[1]["langgraph_node"] == "conversation_node" and isinstance(chunk[0], AIMessageChunk):
-                    await msg.stream_token(chunk[0].content)
-
-            output_state = await graph.aget_state(config={"configurable": {"thread_id": thread_id}})
-
-    if output_state.values.get("workflow") == "audio":
-        response = output_state.values["messages"][-1].content
-        audio_buffer = output_state.values["audio_buffer"]
+    runtime = get_graph_runtime()
+    graph = await runtime.get_graph()
+    output_state = {}
+    timed_out = False
+    with track_turn() as turn:
+        async with cl.Step(type="run"), runtime.thread_lock(thread_id):
+            config = runtime.turn_config(thread_id)
+            try:
+                async for mode, chunk in graph.astream(
+                    {"messages": [HumanMessage(content=content)], "user_phone": user_phone, "input_modality": input_modality},
+                    config,
+                    stream_mode=["messages", "values"],
+                ):
+                    if mode == "values":
+                        output_state = chunk
+                    elif chunk[1]["langgraph_node"] == "conversation_node" and isinstance(chunk[0], AIMessageChunk):
+                        await msg.stream_token(chunk[0].content)
+            except asyncio.TimeoutError:
+                timed_out = True
+        turn.label(output_state)
+
+    if timed_out:
+        # The reply missed the turn deadline; replace whatever was streamed so far
+        msg.content = settings.TURN_TIMEOUT_REPLY
+        await msg.send()
+    elif output_state.get("workflow") == "audio":
+        response = output_state["messages"][-1].content
+        audio_buffer = await load_response_media(output_state)
         output_audio_el = cl.Audio(
             name="Audio",
             auto_play=True,
@@ -76,13 +95,18 @@ async def on_message(message: cl.Message):
             content=audio_buffer,
         )
         await cl.Message(content=response, elements=[output_audio_el]).send()
-    elif output_state.values.get("workflow") == "image":
-        response = output_state.values["messages"][-1].content
-        image = cl.Image(path=output_state.values["image_path"], display="inline")
+    elif output_state.get("workflow") == "image":
+        response = output_state["messages"][-1].content
+        image = cl.Image(content=await load_response_media(output_state), mime="image/png", display="inline")
         await cl.Message(content=response, elements=[image]).send()
     else:
+        # A speculative reply is generated before conversation_node, so nothing was streamed
+        if not msg.content and output_state.get("messages"):
+            msg.content = output_state["messages"][-1].content
         await msg.send()
 
+    await runtime.after_delivery(config, user_phone, output_state.get("user_group"))
+
 
 @cl.on_audio_chunk
 async def on_audio_chunk(chunk: cl.AudioChunk):
@@ -111,13 +135,27 @@ async def on_audio_end(elements):
     transcription = await speech_to_text.transcribe(audio_data)
 
     thread_id = cl.user_session.get("thread_id")
+    user_phone = f"+5511test{thread_id}"
 
-    async with AsyncSqliteSaver.from_conn_string(settings.SHORT_TERM_MEMORY_DB_PATH) as short_term_memory:
-        graph = graph_builder.compile(checkpointer=short_term_memory)
-        output_state = await graph.ainvoke(
-            {"messages": [HumanMessage(content=transcription)]},
-            {"configurable": {"thread_id": thread_id}},
-        )
+    runtime = get_graph_runtime()
+    graph = await runtime.get_graph()
+    with track_turn() as turn:
+        async with runtime.thread_lock(thread_id):
+            config = runtime.turn_config(thread_id)
+            try:
+                output_state = await graph.ainvoke(
+                    {"messages": [HumanMessage(content=transcription)], "user_phone": user_phone, "input_modality": "audio"},
+                    config,
+                )
+            except asyncio.TimeoutError:
+                output_state = None
+        turn.label(output_state)
+
+    if output_state is None:
+        # The reply missed the turn deadline; tell the user rather than stay silent
+        await cl.Message(content=settings.TURN_TIMEOUT_REPLY).send()
+        await runtime.after_delivery(config, user_phone)
+        return
 
     # Use global TextToSpeech instance
     audio_buffer = await text_to_speech.synthesize(output_state["messages"][-1].content)
@@ -129,3 +167,5 @@ async def on_audio_end(elements):
         content=audio_buffer,
     )
     await cl.Message(content=output_state["messages"][-1].content, elements=[output_audio_el]).send()
+
+    await runtime.after_delivery(config, user_phone, output_state.get("user_group"))
@@ -1,6 +1,52 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
 
-from ai_companion.interfaces.whatsapp.whatsapp_response import whatsapp_router
+from fastapi import FastAPI, Request, Response
 
-app = FastAPI()
+from ai_companion.core.metrics import PROMETHEUS_CONTENT_TYPE, metrics, render_prometheus
+from ai_companion.graph.runtime import get_graph_runtime
+from ai_companion.interfaces.whatsapp.whatsapp_response import (
+    message_queue,
+    whatsapp_client,
+    whatsapp_router,
+)
+from ai_companion.modules.memory.long_term.extraction_pipeline import get_memory_extraction_pipeline
+from ai_companion.settings import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await get_graph_runtime().start()
+    whatsapp_client.start()
+    message_queue.start()
+    yield
+    await message_queue.stop(timeout=settings.WHATSAPP_SHUTDOWN_TIMEOUT)
+    await whatsapp_client.close()
+    await get_memory_extraction_pipeline().stop(timeout=settings.WHATSAPP_SHUTDOWN_TIMEOUT)
+    await get_graph_runtime().close()
+
+
+http_latency = metrics.histogram("http_request_seconds", "HTTP request latency", ["method", "route", "status"])
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(whatsapp_router)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    http_latency.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(content=render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,85 @@
+"""
+WhatsApp Graph API client.
+Holds a single pooled HTTP/2 connection to graph.facebook.com for the whole process.
+"""
+import logging
+import os
+from io import BytesIO
+from typing import Optional
+
+import httpx
+
+from ai_companion.core.instrumentation import timed_dependency
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+GRAPH_API_URL = "https://graph.facebook.com/v21.0"
+
+
+class WhatsAppClient:
+    """Long-lived client for the WhatsApp Cloud API with keep-alive connection pooling."""
+
+    def __init__(self, token: Optional[str] = None, phone_number_id: Optional[str] = None):
+        self.token = token or os.getenv("WHATSAPP_TOKEN")
+        self.phone_number_id = phone_number_id or os.getenv("WHATSAPP_PHONE_NUMBER_ID")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get or create the pooled HTTP client."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=GRAPH_API_URL,
+                headers={"Authorization": f"Bearer {self.token}"},
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=settings.WHATSAPP_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.WHATSAPP_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.WHATSAPP_HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    settings.WHATSAPP_HTTP_TIMEOUT,
+                    connect=settings.WHATSAPP_HTTP_CONNECT_TIMEOUT,
+                ),
+            )
+        return self._client
+
+    def start(self) -> None:
+        """Create the connection pool ahead of the first request."""
+        _ = self.client
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def download_media(self, media_id: str) -> bytes:
+        """Resolve a media id to its URL and download it over the same pooled connection."""
+        with timed_dependency("whatsapp", "download_media"):
+            metadata_response = await self.client.get(f"/{media_id}")
+            metadata_response.raise_for_status()
+            download_url = metadata_response.json().get("url")
+
+            media_response = await self.client.get(download_url)
+            media_response.raise_for_status()
+        return media_response.content
+
+    async def upload_media(self, media_content: BytesIO, mime_type: str) -> str:
+        """Upload media to WhatsApp servers and return its media id."""
+        files = {"file": ("response.mp3", media_content, mime_type)}
+        data = {"messaging_product": "whatsapp", "type": mime_type}
+
+        with timed_dependency("whatsapp", "upload_media"):
+            response = await self.client.post(f"/{self.phone_number_id}/media", files=files, data=data)
+        result = response.json()
+
+        if "id" not in result:
+            raise Exception("Failed to upload media")
+        return result["id"]
+
+    async def send_message(self, json_data: dict) -> httpx.Response:
+        """Send a message payload to the messages endpoint."""
+        with timed_dependency("whatsapp", "send_message"):
+            return await self.client.post(f"/{self.phone_number_id}/messages", json=json_data)
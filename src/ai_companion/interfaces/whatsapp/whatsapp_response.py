@@ -1,16 +1,19 @@
+import asyncio
 import logging
 import os
 from io import BytesIO
 from typing import Dict
-import asyncio
 import time
 
-import httpx
 from fastapi import APIRouter, Request, Response
 from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 
-from ai_companion.graph import graph_builder
+from ai_companion.core.instrumentation import TurnTimings, track_turn
+from ai_companion.graph.runtime import get_graph_runtime
+from ai_companion.graph.utils.helpers import load_response_media
+from ai_companion.interfaces.whatsapp.whatsapp_client import WhatsAppClient
+from ai_companion.interfaces.whatsapp.work_queue import ThreadWorkQueue
+from ai_companion.modules.blobs import BlobNotFoundError
 from ai_companion.modules.image import ImageToText
 from ai_companion.modules.speech import SpeechToText, TextToSpeech
 from ai_companion.settings import settings
@@ -25,9 +28,10 @@ image_to_text = ImageToText()
 # Router for WhatsApp respo
 whatsapp_router = APIRouter()
 
-# WhatsApp API credentials
-WHATSAPP_TOKEN = os.getenv("WHATSAPP_TOKEN")
-WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
+# Shared Graph API client, opened and closed by the app lifespan
+whatsapp_client = WhatsAppClient()
+
+SUPPORTED_MESSAGE_TYPES = {"text", "audio", "image"}
 
 # Simple in-memory dedupe: map message_id -> expiry_epoch
 _recent_msg_ids: dict[str, float] = {}
@@ -52,7 +56,11 @@ def seen_message_id(message_id: str) -> bool:
 
 @whatsapp_router.api_route("/whatsapp_response", methods=["GET", "POST"])
 async def whatsapp_handler(request: Request) -> Response:
-    """Handles incoming messages and status updates from the WhatsApp Cloud API."""
+    """Handles incoming messages and status updates from the WhatsApp Cloud API.
+
+    Messages are only validated, deduplicated and enqueued here so Meta gets its
+    acknowledgement immediately; the graph runs later in `process_message`.
+    """
 
     if request.method == "GET":
         params = request.query_params
@@ -63,123 +71,133 @@ async def whatsapp_handler(request: Request) -> Response:
     try:
         data = await request.json()
         change_value = data["entry"][0]["changes"][0]["value"]
-        if "messages" in change_value:
-            message = change_value["messages"][0]
-            from_number = message["from"]
-            session_id = from_number
-
-             # --- BEGIN: dedupe / echo-protection ---
-            # Try common keys for message id then ignore duplicates
-            message_id = message.get("id") or message.get("message_id")
-            if seen_message_id(message_id):
-                logger.info("Duplicate/echo message ignored: %s", message_id)
-                # Acknowledge with 200 so the sender (WhatsApp) does not retry
-                return Response(status_code=200)
-            # --- END: dedupe / echo-protection ---
-
-            # Get user message and handle different message types
-            content = ""
-            if message["type"] == "audio":
-                content = await process_audio_message(message)
-            elif message["type"] == "image":
-                # Get image caption if any
-                content = message.get("image", {}).get("caption", "")
-                # Download and analyze image
-                image_bytes = await download_media(message["image"]["id"])
-                try:
-                    description = await image_to_text.analyze_image(
-                        image_bytes,
-                        "Please describe what you see in this image in the context of our conversation.",
-                    )
-                    content += f"\n[Image Analysis: {description}]"
-                except Exception as e:
-                    logger.warning(f"Failed to analyze image: {e}")
-            else:
-                content = message["text"]["body"]
-
-            # Process message through the graph agent
-            async with AsyncSqliteSaver.from_conn_string(settings.SHORT_TERM_MEMORY_DB_PATH) as short_term_memory:
-                graph = graph_builder.compile(checkpointer=short_term_memory)
-                await graph.ainvoke(
-                    {
-                        "messages": [HumanMessage(content=content)],
-                        "user_phone": from_number,  # Pass phone number to state
-                    },
-                    {"configurable": {"thread_id": session_id}},
-                )
-
-                # Get the workflow type and response from the state
-                output_state = await graph.aget_state(config={"configurable": {"thread_id": session_id}})
-
-            workflow = output_state.values.get("workflow", "conversation")
-            response_message = output_state.values["messages"][-1].content
-
-            # Handle different response types based on workflow
-            if workflow == "audio":
-                audio_buffer = output_state.values["audio_buffer"]
-                success = await send_response(from_number, response_message, "audio", audio_buffer)
-            elif workflow == "image":
-                image_path = output_state.values["image_path"]
-                with open(image_path, "rb") as f:
-                    image_data = f.read()
-                success = await send_response(from_number, response_message, "image", image_data)
-            else:
-                success = await send_response(from_number, response_message, "text")
-
-            if not success:
-                return Response(content="Failed to send message", status_code=500)
-
-            return Response(content="Message processed", status_code=200)
-
-        elif "statuses" in change_value:
-            return Response(content="Status update received", status_code=200)
-
-        else:
-            return Response(content="Unknown event type", status_code=400)
-
     except Exception as e:
-        logger.error(f"Error processing message: {e}", exc_info=True)
-        return Response(content="Internal server error", status_code=500)
+        logger.warning(f"Invalid webhook payload: {e}")
+        return Response(content="Invalid payload", status_code=400)
+
+    if "messages" in change_value:
+        message = change_value["messages"][0]
+        if "from" not in message or message.get("type") not in SUPPORTED_MESSAGE_TYPES:
+            logger.info("Unsupported message ignored: %s", message.get("type"))
+            return Response(content="Unsupported message type", status_code=200)
+
+        # --- BEGIN: dedupe / echo-protection ---
+        # Try common keys for message id then ignore duplicates
+        message_id = message.get("id") or message.get("message_id")
+        if seen_message_id(message_id):
+            logger.info("Duplicate/echo message ignored: %s", message_id)
+            # Acknowledge with 200 so the sender (WhatsApp) does not retry
+            return Response(status_code=200)
+        # --- END: dedupe / echo-protection ---
+
+        if not message_queue.submit(message["from"], message):
+            # Forget the id so Meta's redelivery is accepted once we have room again
+            _recent_msg_ids.pop(message_id, None)
+            logger.warning("Work queue full, rejecting message %s", message_id)
+            return Response(content="Server busy", status_code=503)
+
+        return Response(content="Message queued", status_code=200)
+
+    elif "statuses" in change_value:
+        return Response(content="Status update received", status_code=200)
+
+    else:
+        return Response(content="Unknown event type", status_code=400)
+
+
+async def process_message(session_id: str, message: Dict) -> None:
+    """Run a queued message through the graph and deliver the response."""
+    with track_turn() as turn:
+        await handle_message(session_id, message, turn)
+
+
+async def handle_message(session_id: str, message: Dict, turn: TurnTimings) -> None:
+    from_number = message["from"]
+
+    # Get user message and handle different message types
+    content = ""
+    if message["type"] == "audio":
+        content = await process_audio_message(message)
+    elif message["type"] == "image":
+        # Get image caption if any
+        content = message.get("image", {}).get("caption", "")
+        # Download and analyze image
+        image_bytes = await download_media(message["image"]["id"])
+        try:
+            description = await image_to_text.analyze_image(
+                image_bytes,
+                "Please describe what you see in this image in the context of our conversation.",
+            )
+            content += f"\n[Image Analysis: {description}]"
+        except Exception as e:
+            logger.warning(f"Failed to analyze image: {e}")
+    else:
+        content = message["text"]["body"]
+
+    # Process message through the graph agent
+    runtime = get_graph_runtime()
+    graph = await runtime.get_graph()
+    async with runtime.thread_lock(session_id):
+        # Built under the lease so waiting for the thread's previous turn does not eat the deadline
+        config = runtime.turn_config(session_id)
+        try:
+            output_state = await graph.ainvoke(
+                {
+                    "messages": [HumanMessage(content=content)],
+                    "user_phone": from_number,  # Pass phone number to state
+                    "input_modality": message["type"],
+                },
+                config,
+            )
+        except asyncio.TimeoutError:
+            output_state = None
+    turn.label(output_state)
+
+    if output_state is None:
+        # The reply missed the turn deadline; tell the user rather than stay silent
+        if not await send_response(from_number, settings.TURN_TIMEOUT_REPLY, "text"):
+            logger.error(f"Failed to send response to {from_number}")
+        await runtime.after_delivery(config, from_number)
+        return
+
+    workflow = output_state.get("workflow", "conversation")
+    response_message = output_state["messages"][-1].content
+
+    # Handle different response types based on workflow
+    media = None
+    if workflow in ("audio", "image"):
+        try:
+            media = await load_response_media(output_state)
+        except (BlobNotFoundError, OSError) as e:
+            logger.error(f"Reply {workflow} is unavailable, sending text only: {e}")
 
+    if media:
+        success = await send_response(from_number, response_message, workflow, media)
+    else:
+        success = await send_response(from_number, response_message, "text")
 
-async def download_media(media_id: str) -> bytes:
-    """Download media from WhatsApp."""
-    media_metadata_url = f"https://graph.facebook.com/v21.0/{media_id}"
-    headers = {"Authorization": f"Bearer {WHATSAPP_TOKEN}"}
+    if not success:
+        logger.error(f"Failed to send response to {from_number}")
+
+    await runtime.after_delivery(config, from_number, output_state.get("user_group"))
 
-    async with httpx.AsyncClient() as client:
-        metadata_response = await client.get(media_metadata_url, headers=headers)
-        metadata_response.raise_for_status()
-        metadata = metadata_response.json()
-        download_url = metadata.get("url")
 
-        media_response = await client.get(download_url, headers=headers)
-        media_response.raise_for_status()
-        return media_response.content
+# Background workers draining webhook events, started and stopped by the app lifespan
+message_queue = ThreadWorkQueue(
+    process_message,
+    concurrency=settings.WHATSAPP_WORKER_CONCURRENCY,
+    max_pending=settings.WHATSAPP_QUEUE_MAX_SIZE,
+)
+
+
+async def download_media(media_id: str) -> bytes:
+    """Download media from WhatsApp."""
+    return await whatsapp_client.download_media(media_id)
 
 
 async def process_audio_message(message: Dict) -> str:
     """Download and transcribe audio message."""
-    audio_id = message["audio"]["id"]
-    media_metadata_url = f"https://graph.facebook.com/v21.0/{audio_id}"
-    headers = {"Authorization": f"Bearer {WHATSAPP_TOKEN}"}
-
-    async with httpx.AsyncClient() as client:
-        metadata_response = await client.get(media_metadata_url, headers=headers)
-        metadata_response.raise_for_status()
-        metadata = metadata_response.json()
-        download_url = metadata.get("url")
-
-    # Download the audio file
-    async with httpx.AsyncClient() as client:
-        audio_response = await client.get(download_url, headers=headers)
-        audio_response.raise_for_status()
-
-    # Prepare for transcription
-    audio_buffer = BytesIO(audio_response.content)
-    audio_buffer.seek(0)
-    audio_data = audio_buffer.read()
-
+    audio_data = await whatsapp_client.download_media(message["audio"]["id"])
     return await speech_to_text.transcribe(audio_data)
 
 
@@ -190,11 +208,6 @@ async def send_response(
     media_content: bytes = None,
 ) -> bool:
     """Send response to user via WhatsApp API."""
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
     if message_type in ["audio", "image"]:
         try:
             mime_type = "audio/mpeg" if message_type == "audio" else "image/png"
@@ -222,16 +235,9 @@ async def send_response(
             "text": {"body": response_text},
         }
 
-    print(headers)
-    print(json_data)
+    logger.debug(f"Sending WhatsApp message: {json_data}")
+    response = await whatsapp_client.send_message(json_data)
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"https://graph.facebook.com/v21.0/{WHATSAPP_PHONE_NUMBER_ID}/messages",
-            headers=headers,
-            json=json_data,
-        )
-    
     logger.info(f"WhatsApp API response: {response.status_code} - {response.text}")
 
     return response.status_code == 200
@@ -239,19 +245,4 @@ async def send_response(
 
 async def upload_media(media_content: BytesIO, mime_type: str) -> str:
     """Upload media to WhatsApp servers."""
-    headers = {"Authorization": f"Bearer {WHATSAPP_TOKEN}"}
-    files = {"file": ("response.mp3", media_content, mime_type)}
-    data = {"messaging_product": "whatsapp", "type": mime_type}
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"https://graph.facebook.com/v21.0/{WHATSAPP_PHONE_NUMBER_ID}/media",
-            headers=headers,
-            files=files,
-            data=data,
-        )
-        result = response.json()
-
-    if "id" not in result:
-        raise Exception("Failed to upload media")
-    return result["id"]
+    return await whatsapp_client.upload_media(media_content, mime_type)
@@ -0,0 +1,104 @@
+"""
+Per-thread work queue for webhook events.
+Events for the same thread are processed strictly in arrival order, while
+different threads are drained in parallel by a bounded pool of workers.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, Any], Awaitable[None]]
+
+
+class ThreadWorkQueue:
+    """Bounded asyncio work queue with per-thread ordering.
+
+    Each thread owns a FIFO of pending events. A thread id is scheduled on the
+    ready queue only while it has pending events and no worker is processing it,
+    so at most one event per thread is in flight at any time.
+    """
+
+    def __init__(self, handler: Handler, concurrency: int = 8, max_pending: int = 1000):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self._pending: Dict[str, deque] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._size = 0
+        self._closing = False
+
+    @property
+    def size(self) -> int:
+        """Number of events waiting or in flight."""
+        return self._size
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers) and not self._closing
+
+    def start(self) -> None:
+        """Spawn the worker pool on the running event loop."""
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._closing = False
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"whatsapp-worker-{i}") for i in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} WhatsApp workers")
+
+    def submit(self, thread_id: str, item: Any) -> bool:
+        """Enqueue an event for a thread. Returns False if the queue is full or closing."""
+        if not self.running or self._size >= self.max_pending:
+            return False
+
+        queue = self._pending.get(thread_id)
+        if queue is None:
+            self._pending[thread_id] = deque([item])
+            self._ready.put_nowait(thread_id)
+        else:
+            queue.append(item)
+        self._size += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            thread_id = await self._ready.get()
+            queue = self._pending[thread_id]
+            try:
+                await self.handler(thread_id, queue[0])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing event for thread {thread_id}: {e}", exc_info=True)
+            finally:
+                queue.popleft()
+                self._size -= 1
+                # Keep the thread id reserved while it still has events so ordering holds
+                if queue:
+                    self._ready.put_nowait(thread_id)
+                else:
+                    del self._pending[thread_id]
+                self._ready.task_done()
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop accepting events, drain in-flight work and cancel the workers."""
+        if not self._workers:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutdown timeout reached with {self._size} WhatsApp events still pending")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("WhatsApp workers stopped")
@@ -7,6 +7,7 @@ import logging
 from typing import Dict, Optional
 from datetime import datetime
 from ai_companion.settings import settings
+from ai_companion.modules.memory.short_term.compaction import get_checkpoint_compactor
 from ai_companion.modules.user_management import UserManager
 
 logger = logging.getLogger(__name__)
@@ -18,6 +19,7 @@ class AdminCommands:
     def __init__(self, user_manager: UserManager):
         self.user_manager = user_manager
         self.custom_prompts = {}
+        self.prompt_versions: Dict[str, int] = {}
         self.system_config = {}
         
     def parse_command(self, message: str) -> tuple[str, Optional[dict]]:
@@ -53,12 +55,25 @@ class AdminCommands:
                 key, value = parts
                 return ("config", {"key": key.strip(), "value": value.strip()})
         
+        if message.lower().startswith("/compact"):
+            return ("compact", None)
+
         if message.lower().startswith("/getconfig"):
             key = message.replace("/getconfig", "").strip()
             return ("getconfig", {"key": key})
         
         return ("unknown", None)
     
+    async def aexecute_command(self, command: str, params: Optional[dict]) -> str:
+        """Execute an admin command, including the ones that need to await I/O."""
+        if command == "compact":
+            try:
+                return await self._compact()
+            except Exception as e:
+                logger.error(f"Error executing admin command '{command}': {e}")
+                return f"❌ Erro ao executar comando: {str(e)}"
+        return self.execute_command(command, params)
+
     def execute_command(self, command: str, params: Optional[dict]) -> str:
         """Execute an admin command and return the response."""
         try:
@@ -105,6 +120,18 @@ class AdminCommands:
         
         return response
     
+    async def _compact(self) -> str:
+        """Compact the short-term memory checkpoint database."""
+        report = await get_checkpoint_compactor().compact(trigger="admin")
+
+        response = "🧹 **Compactação da memória de curto prazo**\n\n"
+        response += f"🗂️ Checkpoints removidos: {report.checkpoints_deleted}\n"
+        response += f"✏️ Writes removidos: {report.writes_deleted}\n"
+        response += f"💾 Espaço recuperado: {report.reclaimed_bytes / 1024 / 1024:.1f} MB "
+        response += f"({report.bytes_before / 1024 / 1024:.1f} MB → {report.bytes_after / 1024 / 1024:.1f} MB)\n"
+        response += f"⏱️ Duração: {report.duration:.1f}s"
+        return response
+
     def _list_users(self) -> str:
         """List all users with details."""
         # This would query the database for all users
@@ -123,6 +150,7 @@ class AdminCommands:
             "updated_at": datetime.now().isoformat(),
             "updated_by": "admin"
         }
+        self._bump_prompt_version(group)
         
         # Save to file
         try:
@@ -182,12 +210,23 @@ class AdminCommands:
 • `/config CHAVE=VALOR` - Definir configuração
 • `/getconfig CHAVE` - Ver configuração
 
+**Manutenção:**
+• `/compact` - Compactar o histórico de checkpoints da memória de curto prazo
+
 **Outros:**
 • `/help` - Ver esta mensagem de ajuda
 
 **Grupos disponíveis:**
 admin, monitori, fps, avila, ffl"""
 
+    def _bump_prompt_version(self, group: str) -> None:
+        """Mark the group's prompt as changed so cached prompt templates are rebuilt."""
+        self.prompt_versions[group] = self.prompt_versions.get(group, 0) + 1
+
+    def get_prompt_version(self, group: str) -> int:
+        """Get the version of the group's custom prompt (0 when none is set)."""
+        return self.prompt_versions.get(group, 0)
+
     def get_custom_prompt(self, group: str) -> Optional[str]:
         """Get custom prompt for a group if it exists."""
         if group in self.custom_prompts:
@@ -199,6 +238,8 @@ admin, monitori, fps, avila, ffl"""
         try:
             with open("/app/data/custom_prompts.json", "r") as f:
                 self.custom_prompts = json.load(f)
+                for group in self.custom_prompts:
+                    self._bump_prompt_version(group)
                 logger.info(f"Loaded {len(self.custom_prompts)} custom prompts")
         except FileNotFoundError:
             logger.info("No custom prompts file found, starting fresh")
@@ -0,0 +1,3 @@
+from .blob_store import BlobNotFoundError, BlobStore, get_blob_store
+
+__all__ = ["BlobNotFoundError", "BlobStore", "get_blob_store"]
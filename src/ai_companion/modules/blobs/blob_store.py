@@ -0,0 +1,134 @@
+"""
+Content-addressed store for binary payloads.
+Synthesized audio and generated images are written to local files named by the
+SHA-256 of their content, and graph state only carries that reference. The store
+is bounded by total size and evicts the least recently used blobs first.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Dict
+
+from ai_companion.core.metrics import metrics
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+blob_requests = metrics.counter("blob_store_requests_total", "Blob store reads and writes", ["operation", "result"])
+blob_evictions = metrics.counter("blob_store_evictions_total", "Blobs evicted to stay under the size limit")
+blob_store_size = metrics.gauge("blob_store_bytes", "Total size of the blobs on disk")
+
+REF_PREFIX = "sha256:"
+
+
+class BlobNotFoundError(KeyError):
+    """Raised when a blob reference is unknown or was evicted."""
+
+
+class BlobStore:
+    """Size-bounded, content-addressed blob files under `root`.
+
+    Identical payloads share one file. Reads refresh a blob's modification time,
+    which is the recency eviction goes by.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._sizes: Dict[str, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _scan(self) -> None:
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if len(name) == 64:
+                    self._sizes[name] = os.path.getsize(os.path.join(dirpath, name))
+        self._total = sum(self._sizes.values())
+        blob_store_size.set(self._total)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    @staticmethod
+    def _digest(ref: str) -> str:
+        digest = ref[len(REF_PREFIX):] if ref.startswith(REF_PREFIX) else ""
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise BlobNotFoundError(ref)
+        return digest
+
+    def put(self, data: bytes) -> str:
+        """Store `data` and return its reference."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            if digest in self._sizes and os.path.exists(path):
+                os.utime(path)
+                blob_requests.inc(operation="put", result="dedup")
+                return REF_PREFIX + digest
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self._sizes[digest] = len(data)
+            self._total += len(data)
+            self._evict(keep=digest)
+            blob_store_size.set(self._total)
+        blob_requests.inc(operation="put", result="stored")
+        return REF_PREFIX + digest
+
+    def get(self, ref: str) -> bytes:
+        """Read the blob behind `ref`; raises BlobNotFoundError if it is gone."""
+        path = self._path(self._digest(ref))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            blob_requests.inc(operation="get", result="miss")
+            raise BlobNotFoundError(ref) from None
+        blob_requests.inc(operation="get", result="hit")
+        return data
+
+    def _evict(self, keep: str) -> None:
+        if self._total <= self.max_bytes:
+            return
+
+        def mtime(digest: str) -> float:
+            try:
+                return os.path.getmtime(self._path(digest))
+            except FileNotFoundError:
+                return 0.0
+
+        for digest in sorted((d for d in self._sizes if d != keep), key=mtime):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+            self._total -= self._sizes.pop(digest)
+            blob_evictions.inc()
+            logger.debug(f"Evicted blob {digest}")
+
+    async def aput(self, data: bytes) -> str:
+        return await asyncio.to_thread(self.put, data)
+
+    async def aget(self, ref: str) -> bytes:
+        return await asyncio.to_thread(self.get, ref)
+
+
+@lru_cache
+def get_blob_store() -> BlobStore:
+    """Get or create the process-wide BlobStore instance."""
+    return BlobStore(settings.BLOB_STORE_PATH, max_bytes=settings.BLOB_STORE_MAX_BYTES)
@@ -4,6 +4,7 @@ import os
 from typing import Optional, Union
 
 from ai_companion.core.exceptions import ImageToTextError
+from ai_companion.core.instrumentation import timed_dependency
 from ai_companion.settings import settings
 from groq import Groq
 
@@ -81,11 +82,12 @@ class ImageToText:
             ]
 
             # Make the API call
-            response = self.client.chat.completions.create(
-                model=settings.ITT_MODEL_NAME,
-                messages=messages,
-                max_tokens=1000,
-            )
+            with timed_dependency("groq", "vision"):
+                response = self.client.chat.completions.create(
+                    model=settings.ITT_MODEL_NAME,
+                    messages=messages,
+                    max_tokens=1000,
+                )
 
             if not response.choices:
                 raise ImageToTextError("No response received from the vision model")
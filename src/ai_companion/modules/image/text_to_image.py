@@ -4,10 +4,11 @@ import os
 from typing import Optional
 
 from ai_companion.core.exceptions import TextToImageError
+from ai_companion.core.instrumentation import timed_dependency
 from ai_companion.core.prompts import IMAGE_ENHANCEMENT_PROMPT, IMAGE_SCENARIO_PROMPT
+from ai_companion.modules.llm import get_llm_registry
 from ai_companion.settings import settings
 from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
 from pydantic import BaseModel, Field
 from together import Together
 
@@ -60,15 +61,16 @@ class TextToImage:
         try:
             self.logger.info(f"Generating image for prompt: '{prompt}'")
 
-            response = self.together_client.images.generate(
-                prompt=prompt,
-                model=settings.TTI_MODEL_NAME,
-                width=1024,
-                height=768,
-                steps=4,
-                n=1,
-                response_format="b64_json",
-            )
+            with timed_dependency("together", "generate_image"):
+                response = self.together_client.images.generate(
+                    prompt=prompt,
+                    model=settings.TTI_MODEL_NAME,
+                    width=1024,
+                    height=768,
+                    steps=4,
+                    n=1,
+                    response_format="b64_json",
+                )
 
             image_data = base64.b64decode(response.data[0].b64_json)
 
@@ -90,14 +92,10 @@ class TextToImage:
 
             self.logger.info("Creating scenario from chat history")
 
-            llm = ChatGroq(
-                model=settings.TEXT_MODEL_NAME,
-                api_key=settings.GROQ_API_KEY,
-                temperature=0.4,
-                max_retries=2,
-            )
+            registry = get_llm_registry()
+            llm = registry.get_chat_model(settings.TEXT_MODEL_NAME, temperature=0.4, max_retries=2)
 
-            structured_llm = llm.with_structured_output(ScenarioPrompt)
+            structured_llm = registry.throttle(llm.with_structured_output(ScenarioPrompt), settings.TEXT_MODEL_NAME)
 
             chain = (
                 PromptTemplate(
@@ -107,7 +105,7 @@ class TextToImage:
                 | structured_llm
             )
 
-            scenario = chain.invoke({"chat_history": formatted_history})
+            scenario = await chain.ainvoke({"chat_history": formatted_history})
             self.logger.info(f"Created scenario: {scenario}")
 
             return scenario
@@ -120,14 +118,10 @@ class TextToImage:
         try:
             self.logger.info(f"Enhancing prompt: '{prompt}'")
 
-            llm = ChatGroq(
-                model=settings.TEXT_MODEL_NAME,
-                api_key=settings.GROQ_API_KEY,
-                temperature=0.25,
-                max_retries=2,
-            )
+            registry = get_llm_registry()
+            llm = registry.get_chat_model(settings.TEXT_MODEL_NAME, temperature=0.25, max_retries=2)
 
-            structured_llm = llm.with_structured_output(EnhancedPrompt)
+            structured_llm = registry.throttle(llm.with_structured_output(EnhancedPrompt), settings.TEXT_MODEL_NAME)
 
             chain = (
                 PromptTemplate(
@@ -137,7 +131,7 @@ class TextToImage:
                 | structured_llm
             )
 
-            enhanced_prompt = chain.invoke({"prompt": prompt}).content
+            enhanced_prompt = (await chain.ainvoke({"prompt": prompt})).content
             self.logger.info(f"Enhanced prompt: '{enhanced_prompt}'")
 
             return enhanced_prompt
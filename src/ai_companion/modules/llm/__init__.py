@@ -0,0 +1,3 @@
+from .registry import LLMRegistry, get_llm_registry
+
+__all__ = ["LLMRegistry", "get_llm_registry"]
@@ -0,0 +1,151 @@
+"""
+Process-wide registry of LLM clients.
+Model clients are cached by model name and parameters, share one HTTP connection
+pool, and calls are gated by a per-model semaphore to smooth out bursts.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_groq import ChatGroq
+
+from ai_companion.core.instrumentation import timed_dependency
+from ai_companion.core.metrics import metrics
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+llm_in_flight = metrics.gauge("llm_requests_in_flight", "LLM requests currently running", ["model"])
+llm_queued = metrics.gauge("llm_requests_queued", "LLM requests waiting for a concurrency slot", ["model"])
+llm_queue_wait = metrics.histogram("llm_queue_wait_seconds", "Time spent waiting for a concurrency slot", ["model"])
+llm_latency = metrics.histogram("llm_request_seconds", "LLM request latency", ["model", "status"])
+
+
+class LLMRegistry:
+    """Hands out cached chat model clients and enforces per-model concurrency limits."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        max_connections: int = 100,
+    ):
+        self.max_concurrency = max_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.max_connections = max_connections
+        self._models: Dict[tuple, ChatGroq] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+
+    @property
+    def http_client(self) -> httpx.Client:
+        """Shared connection pool for sync invocations."""
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self._limits(), timeout=settings.LLM_REQUEST_TIMEOUT)
+        return self._http_client
+
+    @property
+    def http_async_client(self) -> httpx.AsyncClient:
+        """Shared connection pool for async invocations."""
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(limits=self._limits(), timeout=settings.LLM_REQUEST_TIMEOUT)
+        return self._http_async_client
+
+    def get_chat_model(self, model_name: str, temperature: float = 0.7, **params) -> ChatGroq:
+        """Get a cached ChatGroq client for the model and parameters."""
+        key = (model_name, temperature, tuple(sorted(params.items())))
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = ChatGroq(
+                    api_key=settings.GROQ_API_KEY,
+                    model_name=model_name,
+                    temperature=temperature,
+                    http_client=self.http_client,
+                    http_async_client=self.http_async_client,
+                    **params,
+                )
+                self._models[key] = model
+            return model
+
+    def _semaphore(self, model_name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(model_name)
+        if semaphore is None:
+            limit = self.model_concurrency.get(model_name, self.max_concurrency)
+            semaphore = self._semaphores.setdefault(model_name, asyncio.Semaphore(limit))
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, model_name: str) -> AsyncIterator[None]:
+        """Hold one of the model's concurrency slots for the duration of a call."""
+        semaphore = self._semaphore(model_name)
+        queued_at = time.perf_counter()
+        llm_queued.inc(model=model_name)
+        try:
+            await semaphore.acquire()
+        finally:
+            llm_queued.dec(model=model_name)
+
+        started_at = time.perf_counter()
+        llm_queue_wait.observe(started_at - queued_at, model=model_name)
+        llm_in_flight.inc(model=model_name)
+        status = "ok"
+        try:
+            with timed_dependency("groq", model_name):
+                yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            semaphore.release()
+            llm_in_flight.dec(model=model_name)
+            llm_latency.observe(time.perf_counter() - started_at, model=model_name, status=status)
+
+    def throttle(self, runnable: Runnable, model_name: str) -> Runnable:
+        """Wrap a runnable calling the model so async invocations take a concurrency slot."""
+
+        async def _ainvoke(input, config: RunnableConfig):
+            async with self.slot(model_name):
+                return await runnable.ainvoke(input, config)
+
+        def _invoke(input, config: RunnableConfig):
+            return runnable.invoke(input, config)
+
+        return RunnableLambda(_invoke, afunc=_ainvoke, name=f"throttled_{model_name}")
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-model in-flight, queued and latency stats."""
+        models = {name for name, *_ in self._models} | set(self._semaphores)
+        stats = {}
+        for name in sorted(models):
+            requests = llm_latency.count(model=name, status="ok") + llm_latency.count(model=name, status="error")
+            total_latency = llm_latency.sum(model=name, status="ok") + llm_latency.sum(model=name, status="error")
+            stats[name] = {
+                "in_flight": int(llm_in_flight.value(model=name)),
+                "queued": int(llm_queued.value(model=name)),
+                "requests": requests,
+                "errors": llm_latency.count(model=name, status="error"),
+                "avg_latency": total_latency / requests if requests else 0.0,
+            }
+        return stats
+
+
+@lru_cache
+def get_llm_registry() -> LLMRegistry:
+    """Get or create the process-wide LLMRegistry instance."""
+    return LLMRegistry(
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        model_concurrency=settings.LLM_MODEL_CONCURRENCY,
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+    )
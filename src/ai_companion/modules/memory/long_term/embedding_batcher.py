@@ -0,0 +1,142 @@
+"""
+Micro-batching of embedding requests.
+Concurrent turns each need a handful of embeddings. Encoding them one call at a
+time wastes the batched throughput of the transformer, so requests from every
+coroutine are collected for a short window and encoded in one forward pass.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from ai_companion.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+batch_size = metrics.histogram(
+    "embedding_batch_size",
+    "Texts encoded per forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+batch_requests = metrics.histogram(
+    "embedding_batch_requests",
+    "Encode requests served per forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+queue_wait = metrics.histogram(
+    "embedding_queue_wait_seconds",
+    "Time an encode request waited before its forward pass started",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+encode_duration = metrics.histogram("embedding_encode_seconds", "Duration of one batched forward pass")
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent encode requests into batched forward passes.
+
+    A batch is sent once it holds `max_batch_size` texts or `batch_window` seconds
+    after its first request, whichever comes first. Requests are never split, so
+    one larger than `max_batch_size` is encoded on its own.
+    """
+
+    def __init__(
+        self,
+        encoder: Encoder,
+        executor: Optional[Executor] = None,
+        max_batch_size: int = 32,
+        batch_window: float = 0.005,
+    ):
+        self.encoder = encoder
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._held: Optional[_Request] = None
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._loop is not loop or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._held = None
+            self._worker = loop.create_task(self._run(), name="embedding-batcher")
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """Embeddings of `texts`, encoded together with other pending requests."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Request(list(texts), future, time.perf_counter()))
+        return await future
+
+    async def _next_batch(self) -> List[_Request]:
+        """Wait for a request, then collect more for up to batch_window seconds."""
+        loop = asyncio.get_running_loop()
+        first = self._held if self._held is not None else await self._queue.get()
+        self._held = None
+        batch, size = [first], len(first.texts)
+        deadline = loop.time() + self.batch_window
+        while size < self.max_batch_size:
+            remaining = deadline - loop.time()
+            try:
+                request = self._queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(
+                    self._queue.get(), timeout=remaining
+                )
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                # Keep it for the next batch rather than exceed the batch size
+                self._held = request
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # Callers that gave up (e.g. on the turn deadline) need no embeddings
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for request in batch:
+                queue_wait.observe(started - request.enqueued_at)
+            # Texts repeated across requests are encoded once
+            unique = list(dict.fromkeys(text for request in batch for text in request.texts))
+            batch_size.observe(len(unique))
+            batch_requests.observe(len(batch))
+
+            try:
+                with encode_duration.time():
+                    vectors = await loop.run_in_executor(self.executor, self.encoder, unique)
+            except Exception as e:
+                logger.error(f"Batched embedding of {len(unique)} texts failed: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            index = {text: i for i, text in enumerate(unique)}
+            vectors = np.asarray(vectors)
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(vectors[[index[text] for text in request.texts]])
@@ -0,0 +1,215 @@
+"""
+Embedding cache.
+Embeddings are keyed by model name and a hash of the text. Recent ones are kept in
+an in-memory LRU; an optional SQLite tier keeps them across restarts and shares
+them between worker processes.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_companion.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+cache_lookups = metrics.counter(
+    "embedding_cache_lookups_total", "Embedding lookups by the tier that answered them", ["result"]
+)
+cache_hit_ratio = metrics.gauge("embedding_cache_hit_ratio", "Share of embedding lookups answered from a cache tier")
+cache_entries = metrics.gauge("embedding_cache_entries", "Embeddings held in memory")
+cache_memory = metrics.gauge("embedding_cache_memory_bytes", "Memory used by cached embedding vectors")
+
+Encoder = Callable[[List[str]], np.ndarray]
+AsyncEncoder = Callable[[List[str]], Awaitable[np.ndarray]]
+
+
+class EmbeddingCache:
+    """LRU cache of text embeddings with an optional SQLite tier.
+
+    Thread-safe; lookups and inserts for a batch of texts hit the disk tier with
+    one query each.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 10000,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 200000,
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._hits = 0
+        self._lookups = 0
+        self._inserts_since_prune = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._disk = self._open_disk(disk_path)
+
+    @staticmethod
+    def _open_disk(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        return conn
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def encode(self, texts: Sequence[str], encoder: Encoder) -> np.ndarray:
+        """Embeddings of `texts`, calling `encoder` once for the ones not cached."""
+        keys = [self.key(text) for text in texts]
+        found, memory_hits = self._memory_get(keys)
+        missing, disk_hits = self._lookup_disk(keys, found)
+        if missing:
+            self._add_computed(keys, texts, missing, encoder(self._texts_of(keys, texts, missing)), found)
+        self._record(len(keys), memory_hits, disk_hits)
+        return np.stack([found[key] for key in keys])
+
+    async def aencode(self, texts: Sequence[str], encoder: AsyncEncoder) -> np.ndarray:
+        """Async `encode`; the disk tier is read and written on a worker thread."""
+        keys = [self.key(text) for text in texts]
+        found, memory_hits = self._memory_get(keys)
+        if self._disk is None:
+            missing, disk_hits = self._lookup_disk(keys, found)
+        else:
+            missing, disk_hits = await asyncio.to_thread(self._lookup_disk, keys, found)
+        if missing:
+            encoded = await encoder(self._texts_of(keys, texts, missing))
+            if self._disk is None:
+                self._add_computed(keys, texts, missing, encoded, found)
+            else:
+                await asyncio.to_thread(self._add_computed, keys, texts, missing, encoded, found)
+        self._record(len(keys), memory_hits, disk_hits)
+        return np.stack([found[key] for key in keys])
+
+    def _memory_get(self, keys: List[str]) -> Tuple[Dict[str, np.ndarray], int]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+        return found, sum(key in found for key in keys)
+
+    def _lookup_disk(self, keys: List[str], found: Dict[str, np.ndarray]) -> Tuple[List[str], int]:
+        """Fill `found` from the disk tier; returns the keys still missing and the disk hits."""
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        disk_hits = 0
+        if missing and self._disk is not None:
+            from_disk = self._disk_get(missing)
+            found.update(from_disk)
+            disk_hits = sum(key in from_disk for key in keys)
+            self._remember(from_disk)
+        return [key for key in missing if key not in found], disk_hits
+
+    @staticmethod
+    def _texts_of(keys: List[str], texts: Sequence[str], missing: List[str]) -> List[str]:
+        texts_by_key = dict(zip(keys, texts))
+        return [texts_by_key[key] for key in missing]
+
+    def _add_computed(
+        self,
+        keys: List[str],
+        texts: Sequence[str],
+        missing: List[str],
+        encoded: np.ndarray,
+        found: Dict[str, np.ndarray],
+    ) -> None:
+        computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, encoded)}
+        found.update(computed)
+        self._remember(computed)
+        if self._disk is not None:
+            self._disk_put(computed)
+
+    def _remember(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                vector.setflags(write=False)
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._memory_bytes -= previous.nbytes
+                self._entries[key] = vector
+                self._memory_bytes += vector.nbytes
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= evicted.nbytes
+            cache_entries.set(len(self._entries))
+            cache_memory.set(self._memory_bytes)
+
+    def _record(self, lookups: int, memory_hits: int, disk_hits: int) -> None:
+        cache_lookups.inc(memory_hits, result="memory")
+        cache_lookups.inc(disk_hits, result="disk")
+        cache_lookups.inc(lookups - memory_hits - disk_hits, result="miss")
+        with self._lock:
+            self._lookups += lookups
+            self._hits += memory_hits + disk_hits
+            cache_hit_ratio.set(self._hits / self._lookups if self._lookups else 0.0)
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        placeholders = ",".join("?" * len(keys))
+        try:
+            with self._disk_lock:
+                rows = self._disk.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys
+                ).fetchall()
+            return {key: np.frombuffer(blob, dtype=np.float32).copy() for key, blob in rows}
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache read failed: {e}")
+            return {}
+
+    def _disk_put(self, vectors: Dict[str, np.ndarray]) -> None:
+        try:
+            with self._disk_lock:
+                self._disk.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in vectors.items()],
+                )
+                self._inserts_since_prune += len(vectors)
+                if self._inserts_since_prune >= 1000:
+                    self._inserts_since_prune = 0
+                    self._disk_prune()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache write failed: {e}")
+
+    def _disk_prune(self) -> None:
+        # Oldest rows go first; rowids grow with insertion order
+        self._disk.execute(
+            """
+            DELETE FROM embeddings WHERE rowid <= (
+                SELECT MAX(rowid) FROM embeddings
+            ) - ?
+            """,
+            (self.disk_max_entries,),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "lookups": self._lookups,
+                "hit_ratio": self._hits / self._lookups if self._lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._disk_lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
@@ -0,0 +1,281 @@
+"""
+Embedding sidecar.
+One process loads the embedding model and serves encode requests to every worker
+over a Unix socket, so workers neither import torch nor hold their own copy of the
+model. Workers pick the in-process model or the sidecar with EMBEDDING_BACKEND.
+
+Run the sidecar with:
+    python -m ai_companion.modules.memory.long_term.embedding_sidecar
+
+Wire format: every message is a 4-byte big-endian length followed by its body.
+Requests are JSON `{"texts": [...]}`. Responses start with a status byte; on
+success it is followed by the row and column counts (two big-endian uint32) and
+the float32 vectors, on error by the UTF-8 message.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from ai_companion.core.instrumentation import timed_dependency
+from ai_companion.modules.memory.long_term.embedding_batcher import EmbeddingBatcher
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# int8-quantized ONNX export shipped in the model repository; runs on any x86-64 CPU with AVX2
+DEFAULT_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+_LENGTH = struct.Struct("!I")
+_SHAPE = struct.Struct("!II")
+_OK, _ERROR = b"\x00", b"\x01"
+# Larger frames are refused rather than buffered
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class EmbeddingSidecarError(RuntimeError):
+    """Raised when the embedding sidecar cannot be reached or fails a request."""
+
+
+def load_embedding_model(
+    model_name: str = EMBEDDING_MODEL,
+    backend: str = "torch",
+    onnx_file: str = DEFAULT_ONNX_FILE,
+):
+    """Load the SentenceTransformer model once.
+
+    The "torch" backend runs the fp32 model, on the GPU when there is one; "onnx"
+    runs `onnx_file` from the model repository with ONNX Runtime on the CPU.
+    """
+    # Imported here so workers using the sidecar never load torch
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        try:
+            import optimum.onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise ImportError("The onnx embedding backend needs the onnx extra: uv sync --extra onnx") from e
+        logger.info(f"Loading embedding model {model_name} ({onnx_file}) with ONNX Runtime")
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs={"file_name": onnx_file})
+
+    import torch
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Loading embedding model {model_name} on {device}")
+    return SentenceTransformer(model_name, device=device)
+
+
+def embedding_model_id(model_name: str = EMBEDDING_MODEL) -> str:
+    """Identifies the vectors EMBEDDING_MODEL_BACKEND produces, e.g. for cache keys."""
+    if settings.EMBEDDING_MODEL_BACKEND == "onnx":
+        return f"{model_name}@{settings.EMBEDDING_ONNX_FILE}"
+    return model_name
+
+
+def create_embedding_model(model_name: str = EMBEDDING_MODEL):
+    """The encoder selected by EMBEDDING_BACKEND; both expose SentenceTransformer's `encode`."""
+    if settings.EMBEDDING_BACKEND == "sidecar":
+        return SidecarEncoder(settings.EMBEDDING_SOCKET_PATH, timeout=settings.EMBEDDING_SIDECAR_TIMEOUT)
+    return load_embedding_model(model_name, settings.EMBEDDING_MODEL_BACKEND, settings.EMBEDDING_ONNX_FILE)
+
+
+def _encode_response(vectors: np.ndarray) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    rows, dims = vectors.shape
+    return _OK + _SHAPE.pack(rows, dims) + vectors.tobytes()
+
+
+def _decode_response(body: bytes) -> np.ndarray:
+    if body[:1] != _OK:
+        raise EmbeddingSidecarError(f"Embedding sidecar error: {body[1:].decode(errors='replace')}")
+    rows, dims = _SHAPE.unpack_from(body, 1)
+    return np.frombuffer(body, dtype="<f4", offset=1 + _SHAPE.size).reshape(rows, dims).astype(np.float32)
+
+
+class SidecarEncoder:
+    """Client of the embedding sidecar with SentenceTransformer's `encode` signature.
+
+    Thread-safe: each thread keeps its own connection. Connecting waits up to
+    `timeout` seconds for the sidecar to come up; a dropped connection is
+    re-opened once per request.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sockets: List[socket.socket] = []
+        self._sockets_lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + self.timeout
+        delay = 0.05
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                sock.close()
+                if time.monotonic() + delay > deadline:
+                    raise EmbeddingSidecarError(f"Embedding sidecar not reachable at {self.socket_path}") from e
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+                continue
+            with self._sockets_lock:
+                self._sockets.append(sock)
+            return sock
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = self._local.sock = self._connect()
+        return sock
+
+    def _drop_connection(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            with self._sockets_lock:
+                if sock in self._sockets:
+                    self._sockets.remove(sock)
+            sock.close()
+
+    def _request(self, texts: List[str]) -> bytes:
+        payload = json.dumps({"texts": texts}).encode()
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                sock.sendall(_LENGTH.pack(len(payload)) + payload)
+                (length,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+                return _recv_exactly(sock, length)
+            except ConnectionError as e:
+                # The sidecar restarted since this connection was opened
+                self._drop_connection()
+                if attempt:
+                    raise EmbeddingSidecarError(f"Embedding sidecar connection failed: {e}") from e
+            except OSError as e:
+                self._drop_connection()
+                raise EmbeddingSidecarError(f"Embedding sidecar request failed: {e}") from e
+
+    def encode(self, sentences: Union[str, Sequence[str]], **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        with timed_dependency("embedding_sidecar", "encode"):
+            vectors = _decode_response(self._request(texts))
+        return vectors[0] if single else vectors
+
+    def close(self) -> None:
+        with self._sockets_lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            sock.close()
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionResetError("Embedding sidecar closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+class EmbeddingSidecarServer:
+    """Serves encode requests from every worker with one model and one batcher.
+
+    Requests from all connections are batched together, so concurrent workers
+    share forward passes as well as the model.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        model_name: str = EMBEDDING_MODEL,
+        max_batch_size: int = 32,
+        batch_window: float = 0.005,
+    ):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self._batcher: Optional[EmbeddingBatcher] = None
+
+    async def serve_forever(self) -> None:
+        model = await asyncio.to_thread(
+            load_embedding_model, self.model_name, settings.EMBEDDING_MODEL_BACKEND, settings.EMBEDDING_ONNX_FILE
+        )
+        # One forward pass at a time; the batcher fills it while the previous one runs
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._batcher = EmbeddingBatcher(
+            model.encode,
+            executor=executor,
+            max_batch_size=self.max_batch_size,
+            batch_window=self.batch_window,
+        )
+
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        # A socket file left by a previous run would make the bind fail
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        logger.info(f"Embedding sidecar serving {self.model_name} on {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            executor.shutdown(wait=False)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    if length > MAX_FRAME_BYTES:
+                        logger.warning(f"Refusing a {length}-byte embedding request")
+                        return
+                    body = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    return
+
+                try:
+                    texts = json.loads(body)["texts"]
+                    response = _encode_response(await self._batcher.encode(texts))
+                except Exception as e:
+                    logger.error(f"Embedding request failed: {e}")
+                    response = _ERROR + str(e).encode()
+                writer.write(_LENGTH.pack(len(response)) + response)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    server = EmbeddingSidecarServer(
+        settings.EMBEDDING_SOCKET_PATH,
+        max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+        batch_window=settings.EMBEDDING_BATCH_WINDOW,
+    )
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Background long-term memory extraction.
+Messages are handed over after the reply has been delivered and are analyzed and
+stored in batches, off the response critical path.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from ai_companion.core.metrics import metrics
+from ai_companion.modules.memory.long_term.memory_manager import get_memory_manager
+from ai_companion.modules.memory.long_term.vector_store import MemoryScope
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+extraction_jobs = metrics.counter(
+    "memory_extraction_jobs_total",
+    "Messages handled by the memory extraction pipeline",
+    ["status"],
+)
+extraction_retries = metrics.counter("memory_extraction_retries_total", "Retried per-user extraction calls")
+extraction_batch_size = metrics.histogram(
+    "memory_extraction_batch_size",
+    "Messages per extraction batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+extraction_duration = metrics.histogram("memory_extraction_batch_seconds", "Time to process an extraction batch")
+extraction_queue_depth = metrics.gauge("memory_extraction_queue_depth", "Messages waiting for extraction")
+extraction_wait = metrics.histogram(
+    "memory_extraction_wait_seconds",
+    "Time a turn waited for the user's pending extractions before reading memories",
+)
+
+
+@dataclass
+class ExtractionJob:
+    """A message waiting for memory extraction."""
+
+    user_phone: str
+    message: BaseMessage
+    user_group: Optional[str] = None
+
+
+class MemoryExtractionPipeline:
+    """Bounded queue of extraction jobs drained in batches by a background worker.
+
+    Pending jobs are counted per user so a turn can wait for that user's earlier
+    messages to be stored before reading memories.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 500,
+        batch_size: int = 8,
+        batch_window: float = 0.5,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+    ):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: Dict[str, int] = {}
+        self._idle: Dict[str, asyncio.Event] = {}
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = asyncio.create_task(self._run(), name="memory-extraction")
+
+    async def submit(self, user_phone: str, messages: List[BaseMessage], user_group: Optional[str] = None) -> None:
+        """Queue messages for extraction; their memories are stored under the user.
+
+        When the queue is full the messages are processed inline instead of being dropped.
+        """
+        self.start()
+        jobs = [ExtractionJob(user_phone, message, user_group) for message in messages]
+        overflow = []
+        for job in jobs:
+            self._mark_pending(job.user_phone)
+            try:
+                self._queue.put_nowait(job)
+                extraction_jobs.inc(status="submitted")
+            except asyncio.QueueFull:
+                overflow.append(job)
+        extraction_queue_depth.set(self._queue.qsize())
+
+        if overflow:
+            logger.warning(f"Memory extraction queue full, processing {len(overflow)} messages inline")
+            extraction_jobs.inc(len(overflow), status="overflow")
+            await self._process(overflow)
+
+    async def wait_for(self, user_phone: Optional[str], timeout: float) -> bool:
+        """Wait until every queued extraction for the user has finished.
+
+        Returns False if the timeout expired first.
+        """
+        event = self._idle.get(user_phone)
+        if event is None or event.is_set():
+            return True
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out waiting for memory extraction of {user_phone}")
+            return False
+        finally:
+            extraction_wait.observe(loop.time() - start)
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Drain queued jobs and stop the worker."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping memory extraction with {self._queue.qsize()} messages pending")
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    def _mark_pending(self, user_phone: str) -> None:
+        self._pending[user_phone] = self._pending.get(user_phone, 0) + 1
+        self._idle.setdefault(user_phone, asyncio.Event()).clear()
+
+    def _mark_done(self, user_phone: str) -> None:
+        remaining = self._pending.get(user_phone, 1) - 1
+        if remaining > 0:
+            self._pending[user_phone] = remaining
+            return
+        self._pending.pop(user_phone, None)
+        event = self._idle.pop(user_phone, None)
+        if event is not None:
+            event.set()
+
+    async def _next_batch(self) -> List[ExtractionJob]:
+        """Wait for a job, then collect more for up to batch_window seconds."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                extraction_queue_depth.set(self._queue.qsize())
+
+    async def _process(self, batch: List[ExtractionJob]) -> None:
+        extraction_batch_size.observe(len(batch))
+        memory_manager = get_memory_manager()
+        # Memories are stored per owner, so a mixed batch is split by user
+        by_owner: Dict[Tuple[str, Optional[str]], List[BaseMessage]] = {}
+        for job in batch:
+            by_owner.setdefault((job.user_phone, job.user_group), []).append(job.message)
+        try:
+            pending = by_owner
+            for attempt in range(self.max_retries + 1):
+                owners = list(pending)
+                with extraction_duration.time():
+                    results = await asyncio.gather(
+                        *(
+                            # LLM errors must reach the retry below rather than drop the messages
+                            memory_manager.extract_and_store_batch(
+                                pending[owner],
+                                MemoryScope(user_phone=owner[0], user_group=owner[1]),
+                                raise_on_error=True,
+                            )
+                            for owner in owners
+                        ),
+                        return_exceptions=True,
+                    )
+                # Only the owners whose extraction failed are retried
+                failed: Dict[Tuple[str, Optional[str]], Exception] = {}
+                for owner, result in zip(owners, results):
+                    if isinstance(result, Exception):
+                        failed[owner] = result
+                    else:
+                        extraction_jobs.inc(len(pending[owner]), status="processed")
+                if not failed:
+                    return
+                if attempt == self.max_retries:
+                    for owner, e in failed.items():
+                        logger.error(f"Memory extraction for {owner[0]} failed after {attempt + 1} attempts: {e}")
+                        extraction_jobs.inc(len(pending[owner]), status="failed")
+                    return
+                extraction_retries.inc(len(failed))
+                for owner, e in failed.items():
+                    logger.warning(f"Memory extraction attempt {attempt + 1} for {owner[0]} failed, retrying: {e}")
+                pending = {owner: pending[owner] for owner in failed}
+                await asyncio.sleep(self.retry_backoff * 2**attempt)
+        finally:
+            for job in batch:
+                self._mark_done(job.user_phone)
+
+
+@lru_cache
+def get_memory_extraction_pipeline() -> MemoryExtractionPipeline:
+    """Get or create the process-wide MemoryExtractionPipeline instance."""
+    return MemoryExtractionPipeline(
+        max_queue_size=settings.MEMORY_EXTRACTION_QUEUE_SIZE,
+        batch_size=settings.MEMORY_EXTRACTION_BATCH_SIZE,
+        batch_window=settings.MEMORY_EXTRACTION_BATCH_WINDOW,
+        max_retries=settings.MEMORY_EXTRACTION_MAX_RETRIES,
+    )
@@ -1,13 +1,15 @@
+import asyncio
 import logging
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import List, Optional
 
 from ai_companion.core.prompts import MEMORY_ANALYSIS_PROMPT
-from ai_companion.modules.memory.long_term.vector_store import get_vector_store
+from ai_companion.modules.llm import get_llm_registry
+from ai_companion.modules.memory.long_term.vector_store import Memory, MemoryScope, get_vector_store
 from ai_companion.settings import settings
 from langchain_core.messages import BaseMessage
-from langchain_groq import ChatGroq
 from pydantic import BaseModel, Field
 
 
@@ -27,26 +29,26 @@ class MemoryManager:
     def __init__(self):
         self.vector_store = get_vector_store()
         self.logger = logging.getLogger(__name__)
-        self.llm = ChatGroq(
-            model=settings.SMALL_TEXT_MODEL_NAME,
-            api_key=settings.GROQ_API_KEY,
-            temperature=0.1,
-            max_retries=2,
+        registry = get_llm_registry()
+        self.llm = registry.get_chat_model(settings.SMALL_TEXT_MODEL_NAME, temperature=0.1, max_retries=2)
+        self.llm_with_structure = registry.throttle(
+            self.llm.with_structured_output(MemoryAnalysis, method="json_mode", include_raw=False),
+            settings.SMALL_TEXT_MODEL_NAME,
         )
 
-    async def _analyze_memory(self, message: str) -> MemoryAnalysis:
-        """Analyze a message to determine importance and format if needed."""
+    async def _analyze_memory(self, message: str, raise_on_error: bool = False) -> MemoryAnalysis:
+        """Analyze a message to determine importance and format if needed.
+
+        LLM errors skip the message unless `raise_on_error` is set, for callers
+        that retry.
+        """
         prompt = MEMORY_ANALYSIS_PROMPT.format(message=message)
         
         try:
-            # Use structured output with proper tool binding
-            llm_with_structure = self.llm.with_structured_output(
-                MemoryAnalysis,
-                method="json_mode",
-                include_raw=False
-            )
-            return await llm_with_structure.ainvoke(prompt)
+            return await self.llm_with_structure.ainvoke(prompt)
         except Exception as e:
+            if raise_on_error:
+                raise
             self.logger.warning(f"Structured output failed, using fallback: {e}")
             # Fallback: treat all messages as potentially important
             return MemoryAnalysis(
@@ -54,46 +56,98 @@ class MemoryManager:
                 formatted_memory=None
             )
 
-    async def extract_and_store_memories(self, message: BaseMessage) -> None:
-        """Extract important information from a message and store in vector store."""
+    async def extract_and_store_memories(self, message: BaseMessage, scope: Optional[MemoryScope] = None) -> None:
+        """Extract important information from a message and store it under the owner in `scope`."""
         if message.type != "human":
             return
 
         # Analyze the message for importance and formatting
         analysis = await self._analyze_memory(message.content)
         if analysis.is_important and analysis.formatted_memory:
-            # Check if similar memory exists
-            similar = self.vector_store.find_similar_memory(analysis.formatted_memory)
-            if similar:
-                # Skip storage if we already have a similar memory
-                self.logger.info(f"Similar memory already exists: '{analysis.formatted_memory}'")
-                return
-
-            # Store new memory
-            self.logger.info(f"Storing new memory: '{analysis.formatted_memory}'")
-            self.vector_store.store_memory(
-                text=analysis.formatted_memory,
-                metadata={
-                    "id": str(uuid.uuid4()),
-                    "timestamp": datetime.now().isoformat(),
-                },
-            )
+            await self._store_new_memories([analysis.formatted_memory], scope or MemoryScope())
+
+    @staticmethod
+    def _owner_scope(scope: MemoryScope) -> MemoryScope:
+        # Duplicates are checked among the user's memories, whatever group they were stored under
+        return MemoryScope(user_phone=scope.user_phone)
+
+    @staticmethod
+    def _new_metadata(scope: MemoryScope) -> dict:
+        return {
+            "id": str(uuid.uuid4()),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **scope.tags(),
+        }
+
+    async def extract_and_store_batch(
+        self,
+        messages: List[BaseMessage],
+        scope: Optional[MemoryScope] = None,
+        raise_on_error: bool = False,
+    ) -> None:
+        """Extract memories from several messages of one owner and store the new ones in one upsert.
+
+        With `raise_on_error`, a failed analysis fails the whole call so it can be
+        retried, instead of skipping that message.
+        """
+        human_messages = [message for message in messages if message.type == "human"]
+        if not human_messages:
+            return
 
-    def get_relevant_memories(self, context: str) -> List[str]:
+        analyses = await asyncio.gather(*(self._analyze_memory(m.content, raise_on_error) for m in human_messages))
+        # Preserve order while dropping duplicates within the batch
+        candidates = list(
+            dict.fromkeys(a.formatted_memory for a in analyses if a.is_important and a.formatted_memory)
+        )
+        if candidates:
+            await self._store_new_memories(candidates, scope or MemoryScope())
+
+    async def _store_new_memories(self, candidates: List[str], scope: MemoryScope) -> None:
+        """Store the candidates that have no similar memory yet.
+
+        Candidates are encoded in one pass and checked with one batched search;
+        the embeddings are reused for the upsert.
+        """
+        embeddings = await self.vector_store.aembed(candidates)
+        similar = await self.vector_store.afind_similar_memories(
+            candidates, embeddings, scope=self._owner_scope(scope)
+        )
+
+        new_memories, new_embeddings = [], []
+        for text, embedding, existing in zip(candidates, embeddings, similar):
+            if existing:
+                self.logger.info(f"Similar memory already exists: '{text}'")
+                continue
+            new_memories.append(Memory(text=text, metadata=self._new_metadata(scope)))
+            new_embeddings.append(embedding)
+
+        if new_memories:
+            self.logger.info(f"Storing {len(new_memories)} new memories")
+            await self.vector_store.astore_memories(new_memories, embeddings=new_embeddings)
+
+    def get_relevant_memories(self, context: str, scope: Optional[MemoryScope] = None) -> List[str]:
         """Retrieve relevant memories based on the current context."""
-        memories = self.vector_store.search_memories(context, k=settings.MEMORY_TOP_K)
+        memories = self.vector_store.search_memories(
+            context,
+            k=settings.MEMORY_TOP_K,
+            scope=scope,
+            recency_weight=settings.MEMORY_RECENCY_WEIGHT,
+            half_life_days=settings.MEMORY_RECENCY_HALF_LIFE_DAYS,
+        )
         if memories:
             for memory in memories:
                 self.logger.debug(f"Memory: '{memory.text}' (score: {memory.score:.2f})")
         return [memory.text for memory in memories]
 
-    def format_memories_for_prompt(self, memories: List[str]) -> str:
+    @staticmethod
+    def format_memories_for_prompt(memories: List[str]) -> str:
         """Format retrieved memories as bullet points."""
         if not memories:
             return ""
         return "\n".join(f"- {memory}" for memory in memories)
 
 
+@lru_cache
 def get_memory_manager() -> MemoryManager:
-    """Get a MemoryManager instance."""
+    """Get or create the MemoryManager singleton instance."""
     return MemoryManager()
@@ -1,13 +1,54 @@
+import asyncio
+import logging
+import math
 import os
-from dataclasses import dataclass
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from functools import lru_cache
-from typing import List, Optional
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, TypeVar
 
+import numpy as np
+from ai_companion.core.instrumentation import timed_dependency
+from ai_companion.modules.memory.long_term.embedding_batcher import EmbeddingBatcher
+from ai_companion.modules.memory.long_term.embedding_cache import EmbeddingCache
+from ai_companion.modules.memory.long_term.embedding_sidecar import (
+    EMBEDDING_MODEL,
+    create_embedding_model,
+    embedding_model_id,
+)
 from ai_companion.settings import settings
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PointStruct, VectorParams
-from sentence_transformers import SentenceTransformer
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    DatetimeRange,
+    Distance,
+    FieldCondition,
+    Filter,
+    KeywordIndexParams,
+    KeywordIndexType,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    SearchRequest,
+    VectorParams,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+KNOWLEDGE_COLLECTION_NAME = "knowledge_base"
+
+# Payload indexes of the memory collection. user_phone is the tenant key, so Qdrant
+# keeps each user's points together and filtered searches only touch that user's data.
+MEMORY_PAYLOAD_INDEXES = {
+    "user_phone": KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True),
+    "user_group": PayloadSchemaType.KEYWORD,
+    "timestamp": PayloadSchemaType.DATETIME,
+}
 
 
 @dataclass
@@ -28,13 +69,64 @@ class Memory:
         return datetime.fromisoformat(ts) if ts else None
 
 
+@dataclass
+class MemoryScope:
+    """Which memories a search may return: one user's, optionally within a time range."""
+
+    user_phone: Optional[str] = None
+    user_group: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    def to_filter(self) -> Optional[Filter]:
+        conditions = []
+        if self.user_phone:
+            conditions.append(FieldCondition(key="user_phone", match=MatchValue(value=self.user_phone)))
+        if self.user_group:
+            conditions.append(FieldCondition(key="user_group", match=MatchValue(value=self.user_group)))
+        if self.since or self.until:
+            conditions.append(FieldCondition(key="timestamp", range=DatetimeRange(gte=self.since, lte=self.until)))
+        return Filter(must=conditions) if conditions else None
+
+    def tags(self) -> dict:
+        """Payload fields identifying the owner of a stored memory."""
+        return {key: value for key, value in (("user_phone", self.user_phone), ("user_group", self.user_group)) if value}
+
+
+@dataclass
+class CollectionInfo:
+    """Qdrant collection metadata cached by the VectorStore."""
+
+    name: str
+    vector_size: Optional[int]
+    distance: Optional[str]
+    indexed_fields: FrozenSet[str] = frozenset()
+
+
+def _is_not_found(error: Exception) -> bool:
+    """Whether a Qdrant client error means the collection does not exist."""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    # The local (in-process) client raises ValueError("Collection ... not found")
+    return isinstance(error, ValueError) and "not found" in str(error)
+
+
 class VectorStore:
-    """A class to handle vector storage operations using Qdrant."""
+    """A class to handle vector storage operations using Qdrant.
+
+    The `a`-prefixed methods are the async API used from the graph: Qdrant calls go
+    through AsyncQdrantClient and encoding runs on a dedicated executor, so neither
+    blocks the event loop. The sync methods are kept for scripts and startup.
+    """
 
     REQUIRED_ENV_VARS = ["QDRANT_URL", "QDRANT_API_KEY"]
-    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    EMBEDDING_MODEL = EMBEDDING_MODEL
     COLLECTION_NAME = "long_term_memory"
     SIMILARITY_THRESHOLD = 0.9  # Threshold for considering memories as similar
+    # Collections found missing are looked up again after this many seconds
+    MISSING_COLLECTION_RECHECK = 60.0
+    # Candidates fetched per requested result when re-ranking by recency
+    RECENCY_OVERSAMPLE = 3
 
     _instance: Optional["VectorStore"] = None
     _initialized: bool = False
@@ -47,16 +139,37 @@ class VectorStore:
     def __init__(self) -> None:
         if not self._initialized:
             self._validate_env_vars()
-            self.model = SentenceTransformer(self.EMBEDDING_MODEL)
+            # The in-process model, or a client of the shared embedding sidecar
+            self.model = create_embedding_model(self.EMBEDDING_MODEL)
+            self._collections: Dict[str, Tuple[Optional[CollectionInfo], float]] = {}
+            self._collections_lock = threading.Lock()
             self.client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
-            # Force GPU usage if available
-            import torch
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.model = SentenceTransformer(self.EMBEDDING_MODEL, device=device)
+            self.async_client = AsyncQdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+            # Encoding is CPU-bound; a small pool of its own keeps it from starving
+            # the default executor and from oversubscribing torch's own threads
+            self._encode_executor = ThreadPoolExecutor(
+                max_workers=settings.EMBEDDING_WORKERS, thread_name_prefix="embedding"
+            )
+            # Keyed by backend too: quantized vectors are close to, not equal to, fp32 ones
+            self.embedding_cache = EmbeddingCache(
+                embedding_model_id(self.EMBEDDING_MODEL),
+                max_entries=settings.EMBEDDING_CACHE_SIZE,
+                disk_path=settings.EMBEDDING_CACHE_PATH,
+            )
+            # Cache misses of concurrent turns are encoded together
+            self.embedding_batcher = EmbeddingBatcher(
+                self.model.encode,
+                executor=self._encode_executor,
+                max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+                batch_window=settings.EMBEDDING_BATCH_WINDOW,
+            )
             
         
+            # Resolve collection metadata once; searches and writes use the cached copy
             if not self._collection_exists():
                 self._create_collection()
+            self._ensure_payload_indexes()
+            self.collection_info(KNOWLEDGE_COLLECTION_NAME)
             self._initialized = True
 
     def _validate_env_vars(self) -> None:
@@ -65,52 +178,276 @@ class VectorStore:
         if missing_vars:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
+    def _describe_collection(self, name: str) -> Optional[CollectionInfo]:
+        """Fetch a collection's metadata from Qdrant; None if it does not exist."""
+        try:
+            with timed_dependency("qdrant", "get_collection"):
+                info = self.client.get_collection(name)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return self._to_collection_info(name, info)
+
+    async def _adescribe_collection(self, name: str) -> Optional[CollectionInfo]:
+        try:
+            with timed_dependency("qdrant", "get_collection"):
+                info = await self.async_client.get_collection(name)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return self._to_collection_info(name, info)
+
+    @staticmethod
+    def _to_collection_info(name: str, info) -> CollectionInfo:
+        vectors = info.config.params.vectors
+        # Named-vector collections describe each vector separately
+        size = getattr(vectors, "size", None)
+        distance = getattr(vectors, "distance", None)
+        return CollectionInfo(
+            name=name,
+            vector_size=size,
+            distance=getattr(distance, "value", distance),
+            indexed_fields=frozenset(info.payload_schema or {}),
+        )
+
+    def collection_info(self, name: str = COLLECTION_NAME, refresh: bool = False) -> Optional[CollectionInfo]:
+        """Cached metadata of a collection, or None if it does not exist.
+
+        Existing collections are looked up once; missing ones again after
+        MISSING_COLLECTION_RECHECK seconds, or right away with `refresh`.
+        """
+        if not refresh:
+            fresh, info = self._cached_collection_info(name)
+            if fresh:
+                return info
+
+        info = self._describe_collection(name)
+        with self._collections_lock:
+            self._collections[name] = (info, time.monotonic())
+        return info
+
+    async def acollection_info(self, name: str = COLLECTION_NAME, refresh: bool = False) -> Optional[CollectionInfo]:
+        """Async `collection_info`, sharing its cache."""
+        if not refresh:
+            fresh, info = self._cached_collection_info(name)
+            if fresh:
+                return info
+
+        info = await self._adescribe_collection(name)
+        with self._collections_lock:
+            self._collections[name] = (info, time.monotonic())
+        return info
+
+    def _cached_collection_info(self, name: str) -> Tuple[bool, Optional[CollectionInfo]]:
+        """(True, info) when the cached metadata of `name` can be used as is."""
+        with self._collections_lock:
+            cached = self._collections.get(name)
+        if cached is None:
+            return False, None
+        info, checked_at = cached
+        return info is not None or time.monotonic() - checked_at < self.MISSING_COLLECTION_RECHECK, info
+
     def _collection_exists(self) -> bool:
-        """Check if the memory collection exists."""
-        collections = self.client.get_collections().collections
-        return any(col.name == self.COLLECTION_NAME for col in collections)
+        """Check if the memory collection exists, from the cached metadata."""
+        return self.collection_info(self.COLLECTION_NAME) is not None
 
     def _create_collection(self) -> None:
         """Create a new collection for storing memories."""
         sample_embedding = self.model.encode("sample text")
-        self.client.create_collection(
-            collection_name=self.COLLECTION_NAME,
-            vectors_config=VectorParams(
-                size=len(sample_embedding),
-                distance=Distance.COSINE,
-            ),
-        )
+        try:
+            self.client.create_collection(
+                collection_name=self.COLLECTION_NAME,
+                vectors_config=VectorParams(
+                    size=len(sample_embedding),
+                    distance=Distance.COSINE,
+                ),
+            )
+        except Exception:
+            # Another worker may have created it since it was found missing
+            if self.collection_info(self.COLLECTION_NAME, refresh=True) is None:
+                raise
+            return
+        with self._collections_lock:
+            self._collections[self.COLLECTION_NAME] = (
+                CollectionInfo(self.COLLECTION_NAME, len(sample_embedding), Distance.COSINE.value),
+                time.monotonic(),
+            )
+        self._ensure_payload_indexes()
+
+    def _ensure_payload_indexes(self) -> None:
+        """Create the payload indexes of the memory collection that are missing."""
+        info = self.collection_info(self.COLLECTION_NAME)
+        if info is None:
+            return
+        missing = [name for name in MEMORY_PAYLOAD_INDEXES if name not in info.indexed_fields]
+        for name in missing:
+            logger.info(f"Creating payload index {self.COLLECTION_NAME}.{name}")
+            self.client.create_payload_index(
+                collection_name=self.COLLECTION_NAME,
+                field_name=name,
+                field_schema=MEMORY_PAYLOAD_INDEXES[name],
+            )
+        if missing:
+            with self._collections_lock:
+                self._collections[self.COLLECTION_NAME] = (
+                    CollectionInfo(info.name, info.vector_size, info.distance, info.indexed_fields | frozenset(missing)),
+                    time.monotonic(),
+                )
+
+    def _search(self, name: str, call: Callable[[], T], default: T) -> T:
+        """Run a read against a collection known to exist; `default` if it turns out to be gone."""
+        try:
+            return call()
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            logger.warning(f"Qdrant collection {name} not found, re-checking")
+            self.collection_info(name, refresh=True)
+            return default
+
+    def _write(self, call: Callable[[], T]) -> T:
+        """Run a write to the memory collection, recreating it once if it was deleted."""
+        if not self._collection_exists():
+            self._create_collection()
+        try:
+            return call()
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            logger.warning(f"Qdrant collection {self.COLLECTION_NAME} not found, recreating")
+            if self.collection_info(self.COLLECTION_NAME, refresh=True) is None:
+                self._create_collection()
+            return call()
 
-    def find_similar_memory(self, text: str) -> Optional[Memory]:
+    async def _asearch(self, name: str, call: Callable[[], Awaitable[T]], default: T) -> T:
+        """Async `_search`."""
+        try:
+            return await call()
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            logger.warning(f"Qdrant collection {name} not found, re-checking")
+            await self.acollection_info(name, refresh=True)
+            return default
+
+    async def _awrite(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Async `_write`. (Re)creating the collection is rare and stays on a worker thread."""
+        if await self.acollection_info(self.COLLECTION_NAME) is None:
+            await asyncio.to_thread(self._create_collection)
+        try:
+            return await call()
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            logger.warning(f"Qdrant collection {self.COLLECTION_NAME} not found, recreating")
+            if await self.acollection_info(self.COLLECTION_NAME, refresh=True) is None:
+                await asyncio.to_thread(self._create_collection)
+            return await call()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Encode several texts in a single forward pass, skipping the cached ones."""
+        return self.embedding_cache.encode(texts, self.model.encode)
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        """Async `embed`; cache misses are batched with other turns' on the encoding executor."""
+        return await self.embedding_cache.aencode(list(texts), self.embedding_batcher.encode)
+
+    def find_similar_memory(
+        self,
+        text: str,
+        embedding: Optional[np.ndarray] = None,
+        scope: Optional[MemoryScope] = None,
+    ) -> Optional[Memory]:
         """Find if a similar memory already exists.
 
         Args:
             text: The text to search for
+            embedding: Precomputed embedding of `text`, to skip encoding it again
+            scope: Only compare against these memories, typically the owner's
 
         Returns:
             Optional Memory if a similar one is found
         """
-        results = self.search_memories(text, k=1)
+        results = self.search_memories(text, k=1, embedding=embedding, scope=scope)
         if results and results[0].score >= self.SIMILARITY_THRESHOLD:
             return results[0]
         return None
 
-    def store_memory(self, text: str, metadata: dict) -> None:
+    def find_similar_memories(
+        self,
+        texts: Sequence[str],
+        embeddings: np.ndarray,
+        scope: Optional[MemoryScope] = None,
+    ) -> List[Optional[Memory]]:
+        """Look up the closest existing memory of several texts in one batched request."""
+        if not texts or not self._collection_exists():
+            return [None] * len(texts)
+
+        def search_batch():
+            with timed_dependency("qdrant", "search_memories"):
+                return self.client.search_batch(
+                    collection_name=self.COLLECTION_NAME, requests=self._similar_requests(embeddings, scope)
+                )
+
+        return self._most_similar(self._search(self.COLLECTION_NAME, search_batch, [[] for _ in texts]))
+
+    async def afind_similar_memories(
+        self,
+        texts: Sequence[str],
+        embeddings: np.ndarray,
+        scope: Optional[MemoryScope] = None,
+    ) -> List[Optional[Memory]]:
+        """Async `find_similar_memories`."""
+        if not texts or await self.acollection_info(self.COLLECTION_NAME) is None:
+            return [None] * len(texts)
+
+        async def search_batch():
+            with timed_dependency("qdrant", "search_memories"):
+                return await self.async_client.search_batch(
+                    collection_name=self.COLLECTION_NAME, requests=self._similar_requests(embeddings, scope)
+                )
+
+        return self._most_similar(await self._asearch(self.COLLECTION_NAME, search_batch, [[] for _ in texts]))
+
+    @staticmethod
+    def _similar_requests(embeddings: np.ndarray, scope: Optional[MemoryScope]) -> List[SearchRequest]:
+        query_filter = scope.to_filter() if scope else None
+        return [SearchRequest(vector=e.tolist(), filter=query_filter, limit=1, with_payload=True) for e in embeddings]
+
+    def _most_similar(self, batches) -> List[Optional[Memory]]:
+        similar = []
+        for hits in batches:
+            memories = self._to_memories(hits)
+            similar.append(memories[0] if memories and memories[0].score >= self.SIMILARITY_THRESHOLD else None)
+        return similar
+
+    def store_memory(
+        self,
+        text: str,
+        metadata: dict,
+        embedding: Optional[np.ndarray] = None,
+        check_similar: bool = True,
+    ) -> None:
         """Store a new memory in the vector store or update if similar exists.
 
         Args:
             text: The text content of the memory
             metadata: Additional information about the memory (timestamp, type, etc.)
+            embedding: Precomputed embedding of `text`, reused for the similarity check and the point
+            check_similar: Set to False when the caller already checked for a similar memory
         """
-        if not self._collection_exists():
-            self._create_collection()
+        if embedding is None:
+            embedding = self.embed([text])[0]
 
-        # Check if similar memory exists
-        similar_memory = self.find_similar_memory(text)
-        if similar_memory and similar_memory.id:
-            metadata["id"] = similar_memory.id  # Keep same ID for update
+        # Check if similar memory exists among the owner's memories
+        if check_similar:
+            scope = MemoryScope(user_phone=metadata.get("user_phone"))
+            similar_memory = self.find_similar_memory(text, embedding=embedding, scope=scope)
+            if similar_memory and similar_memory.id:
+                metadata["id"] = similar_memory.id  # Keep same ID for update
 
-        embedding = self.model.encode(text)
         point = PointStruct(
             id=metadata.get("id", hash(text)),
             vector=embedding.tolist(),
@@ -120,17 +457,88 @@ class VectorStore:
             },
         )
 
-        self.client.upsert(
-            collection_name=self.COLLECTION_NAME,
-            points=[point],
-        )
+        def upsert():
+            with timed_dependency("qdrant", "upsert"):
+                self.client.upsert(
+                    collection_name=self.COLLECTION_NAME,
+                    points=[point],
+                )
+
+        self._write(upsert)
+
+    def store_memories(self, memories: List[Memory], embeddings: Optional[np.ndarray] = None) -> None:
+        """Store several new memories with a single encode pass and upsert.
+
+        Args:
+            memories: Memories to store; each metadata must contain an "id"
+            embeddings: Precomputed embeddings of the memories' texts, in the same order
+        """
+        if not memories:
+            return
+
+        if embeddings is None:
+            embeddings = self.embed([memory.text for memory in memories])
+        points = self._to_points(memories, embeddings)
+
+        def upsert():
+            with timed_dependency("qdrant", "upsert"):
+                self.client.upsert(
+                    collection_name=self.COLLECTION_NAME,
+                    points=points,
+                )
+
+        self._write(upsert)
+
+    async def astore_memories(self, memories: List[Memory], embeddings: Optional[np.ndarray] = None) -> None:
+        """Async `store_memories`."""
+        if not memories:
+            return
+
+        if embeddings is None:
+            embeddings = await self.aembed([memory.text for memory in memories])
+        points = self._to_points(memories, embeddings)
+
+        async def upsert():
+            with timed_dependency("qdrant", "upsert"):
+                await self.async_client.upsert(
+                    collection_name=self.COLLECTION_NAME,
+                    points=points,
+                )
+
+        await self._awrite(upsert)
 
-    def search_memories(self, query: str, k: int = 5) -> List[Memory]:
+    @staticmethod
+    def _to_points(memories: List[Memory], embeddings: np.ndarray) -> List[PointStruct]:
+        return [
+            PointStruct(
+                id=memory.metadata["id"],
+                vector=embedding.tolist(),
+                payload={
+                    "text": memory.text,
+                    **memory.metadata,
+                },
+            )
+            for memory, embedding in zip(memories, embeddings)
+        ]
+
+    def search_memories(
+        self,
+        query: str,
+        k: int = 5,
+        embedding: Optional[np.ndarray] = None,
+        scope: Optional[MemoryScope] = None,
+        recency_weight: float = 0.0,
+        half_life_days: float = 30.0,
+    ) -> List[Memory]:
         """Search for similar memories in the vector store.
 
         Args:
             query: Text to search for
             k: Number of results to return
+            embedding: Precomputed embedding of `query`
+            scope: Restrict the search to one user's memories and/or a time range
+            recency_weight: Share of the score given to recency, from 0 (similarity only) to 1
+            half_life_days: Age at which a memory's recency score halves
 
         Returns:
             List of Memory objects
@@ -138,31 +546,206 @@ class VectorStore:
         if not self._collection_exists():
             return []
 
-        query_embedding = self.model.encode(query)
-        results = self.client.search(
-            collection_name=self.COLLECTION_NAME,
-            query_vector=query_embedding.tolist(),
-            limit=k,
-        )
+        query_embedding = self.embed([query])[0] if embedding is None else embedding
+        # Fetch extra candidates so recent memories just below the top k can move up
+        limit = k * self.RECENCY_OVERSAMPLE if recency_weight > 0 else k
+
+        def search():
+            with timed_dependency("qdrant", "search_memories"):
+                return self.client.search(
+                    collection_name=self.COLLECTION_NAME,
+                    query_vector=query_embedding.tolist(),
+                    query_filter=scope.to_filter() if scope else None,
+                    limit=limit,
+                )
+
+        memories = self._to_memories(self._search(self.COLLECTION_NAME, search, []))
+        if recency_weight > 0:
+            memories = self._rank_by_recency(memories, recency_weight, half_life_days)[:k]
+        return memories
+
+    async def asearch_memories(
+        self,
+        query: str,
+        k: int = 5,
+        embedding: Optional[np.ndarray] = None,
+        scope: Optional[MemoryScope] = None,
+        recency_weight: float = 0.0,
+        half_life_days: float = 30.0,
+    ) -> List[Memory]:
+        """Async `search_memories`."""
+        if await self.acollection_info(self.COLLECTION_NAME) is None:
+            return []
+
+        query_embedding = (await self.aembed([query]))[0] if embedding is None else embedding
+        limit = k * self.RECENCY_OVERSAMPLE if recency_weight > 0 else k
+
+        async def search():
+            with timed_dependency("qdrant", "search_memories"):
+                return await self.async_client.search(
+                    collection_name=self.COLLECTION_NAME,
+                    query_vector=query_embedding.tolist(),
+                    query_filter=scope.to_filter() if scope else None,
+                    limit=limit,
+                )
+
+        memories = self._to_memories(await self._asearch(self.COLLECTION_NAME, search, []))
+        if recency_weight > 0:
+            memories = self._rank_by_recency(memories, recency_weight, half_life_days)[:k]
+        return memories
+
+    @staticmethod
+    def _rank_by_recency(memories: List[Memory], weight: float, half_life_days: float) -> List[Memory]:
+        """Blend similarity with an exponential decay on age; undated memories get no recency credit."""
+        now = datetime.now(timezone.utc)
+
+        def blended(memory: Memory) -> float:
+            recency = 0.0
+            timestamp = memory.timestamp
+            if timestamp is not None:
+                if timestamp.tzinfo is None:
+                    timestamp = timestamp.replace(tzinfo=timezone.utc)
+                age_days = max((now - timestamp).total_seconds() / 86400, 0.0)
+                recency = math.pow(0.5, age_days / half_life_days)
+            return (1 - weight) * (memory.score or 0.0) + weight * recency
 
+        for memory in memories:
+            memory.score = blended(memory)
+        return sorted(memories, key=lambda memory: memory.score, reverse=True)
+
+    @staticmethod
+    def _to_memories(hits) -> List[Memory]:
         return [
             Memory(
                 text=hit.payload["text"],
                 metadata={k: v for k, v in hit.payload.items() if k != "text"},
                 score=hit.score,
             )
-            for hit in results
+            for hit in hits
         ]
-    def search_knowledge(self, query: str, k: int = 3) -> List[str]:
-        query_vector = self.model.encode(query).tolist()
-        results = self.client.search(
-            collection_name="knowledge_base",
-            query_vector=query_vector,
-            limit=k
+
+    def search_knowledge(self, query: str, k: int = 3, embedding: Optional[np.ndarray] = None) -> List[str]:
+        if self.collection_info(KNOWLEDGE_COLLECTION_NAME) is None:
+            return []
+
+        query_vector = (self.embed([query])[0] if embedding is None else embedding).tolist()
+
+        def search():
+            with timed_dependency("qdrant", "search_knowledge"):
+                return self.client.search(
+                    collection_name=KNOWLEDGE_COLLECTION_NAME,
+                    query_vector=query_vector,
+                    limit=k
+                )
+
+        return [hit.payload["text"] for hit in self._search(KNOWLEDGE_COLLECTION_NAME, search, [])]
+
+    async def asearch_knowledge(self, query: str, k: int = 3, embedding: Optional[np.ndarray] = None) -> List[str]:
+        """Async `search_knowledge`."""
+        if await self.acollection_info(KNOWLEDGE_COLLECTION_NAME) is None:
+            return []
+
+        query_vector = ((await self.aembed([query]))[0] if embedding is None else embedding).tolist()
+
+        async def search():
+            with timed_dependency("qdrant", "search_knowledge"):
+                return await self.async_client.search(
+                    collection_name=KNOWLEDGE_COLLECTION_NAME,
+                    query_vector=query_vector,
+                    limit=k
+                )
+
+        return [hit.payload["text"] for hit in await self._asearch(KNOWLEDGE_COLLECTION_NAME, search, [])]
+
+@dataclass
+class RetrievalResult:
+    """Memories and knowledge chunks retrieved for one turn."""
+
+    memories: List[Memory] = field(default_factory=list)
+    knowledge: List[str] = field(default_factory=list)
+
+
+class RetrievalService:
+    """Runs a turn's memory and knowledge lookups together.
+
+    Both queries are encoded in one forward pass and the two collections are
+    searched concurrently, so a turn pays for one encode and one search round trip.
+    """
+
+    def __init__(
+        self,
+        vector_store: Optional[VectorStore] = None,
+        store_factory: Optional[Callable[[], VectorStore]] = None,
+    ):
+        self.vector_store = vector_store
+        self._store_factory = store_factory or get_vector_store
+        self._store_lock = threading.Lock()
+
+    async def _get_vector_store(self) -> VectorStore:
+        """The vector store, built in a thread on first use if startup did not build it."""
+        if self.vector_store is None:
+            # Loading the model and resolving collections block; keep them off the event loop
+            await asyncio.to_thread(self._build_vector_store)
+        return self.vector_store
+
+    def _build_vector_store(self) -> None:
+        with self._store_lock:
+            if self.vector_store is None:
+                self.vector_store = self._store_factory()
+
+    async def retrieve(
+        self,
+        memory_query: str,
+        knowledge_query: str,
+        memory_k: int = 3,
+        knowledge_k: int = 3,
+        scope: Optional[MemoryScope] = None,
+        recency_weight: float = 0.0,
+        half_life_days: float = 30.0,
+    ) -> RetrievalResult:
+        queries = list(dict.fromkeys([memory_query, knowledge_query]))
+        try:
+            vector_store = await self._get_vector_store()
+        except Exception as e:
+            # Qdrant unreachable or the model failed to load; the next turn tries again
+            logger.error(f"Vector store unavailable: {e}")
+            return RetrievalResult()
+        try:
+            embeddings = dict(zip(queries, await vector_store.aembed(queries)))
+        except Exception as e:
+            # Without embeddings neither lookup can run; the turn goes on without context
+            logger.error(f"Error embedding retrieval queries: {e}")
+            return RetrievalResult()
+
+        memories, knowledge = await asyncio.gather(
+            vector_store.asearch_memories(
+                memory_query,
+                memory_k,
+                embeddings[memory_query],
+                scope,
+                recency_weight,
+                half_life_days,
+            ),
+            vector_store.asearch_knowledge(knowledge_query, knowledge_k, embeddings[knowledge_query]),
+            return_exceptions=True,
         )
-        return [hit.payload["text"] for hit in results]
+        # One failed lookup must not take down the other
+        if isinstance(memories, Exception):
+            logger.error(f"Error searching memories: {memories}")
+            memories = []
+        if isinstance(knowledge, Exception):
+            logger.error(f"Error searching knowledge: {knowledge}")
+            knowledge = []
+        return RetrievalResult(memories=memories, knowledge=knowledge)
+
 
 @lru_cache
 def get_vector_store() -> VectorStore:
     """Get or create the VectorStore singleton instance."""
     return VectorStore()
+
+
+@lru_cache
+def get_retrieval_service() -> RetrievalService:
+    """Get or create the RetrievalService singleton instance; its VectorStore is built on first use."""
+    return RetrievalService()
@@ -0,0 +1,194 @@
+"""
+Checkpoint retention and compaction for the short-term memory database.
+Keeps the latest checkpoints of every thread, drops the pending writes of superseded
+checkpoints and returns the freed pages to the filesystem with incremental vacuum.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import aiosqlite
+
+from ai_companion.core.metrics import metrics
+from ai_companion.settings import settings
+
+logger = logging.getLogger(__name__)
+
+compaction_runs = metrics.counter("checkpoint_compaction_runs_total", "Checkpoint compaction runs", ["trigger", "status"])
+compaction_deleted = metrics.counter("checkpoint_compaction_deleted_rows_total", "Rows removed by compaction", ["table"])
+compaction_reclaimed = metrics.counter("checkpoint_compaction_reclaimed_bytes_total", "Bytes returned to the filesystem")
+compaction_duration = metrics.histogram("checkpoint_compaction_seconds", "Checkpoint compaction duration")
+checkpoint_db_size = metrics.gauge("checkpoint_db_size_bytes", "Size of the checkpoint database and its WAL")
+
+# Checkpoints past the newest `keep_last` of their thread and namespace (checkpoint ids sort by time)
+SUPERSEDED_CHECKPOINTS = """
+    SELECT rowid FROM (
+        SELECT rowid, ROW_NUMBER() OVER (
+            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+        ) AS position
+        FROM checkpoints
+    )
+    WHERE position > ?
+    LIMIT ?
+"""
+
+# Writes whose checkpoint is gone or no longer the newest of its thread; they were applied already
+SUPERSEDED_WRITES = """
+    SELECT w.rowid FROM writes AS w
+    WHERE w.checkpoint_id < (
+        SELECT MAX(c.checkpoint_id) FROM checkpoints AS c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+    )
+    OR NOT EXISTS (
+        SELECT 1 FROM checkpoints AS c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+    )
+    LIMIT ?
+"""
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass
+class CompactionReport:
+    """Outcome of one compaction run."""
+
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    duration: float = 0.0
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return max(self.bytes_before - self.bytes_after, 0)
+
+    def summary(self) -> str:
+        return (
+            f"{self.checkpoints_deleted} checkpoints and {self.writes_deleted} writes removed, "
+            f"{self.reclaimed_bytes / 1024 / 1024:.1f} MB reclaimed "
+            f"({self.bytes_before / 1024 / 1024:.1f} MB -> {self.bytes_after / 1024 / 1024:.1f} MB) "
+            f"in {self.duration:.1f}s"
+        )
+
+
+class CheckpointCompactor:
+    """Prunes the SQLite checkpointer tables on a schedule or on demand.
+
+    Uses its own connection and deletes in small batches, each in its own
+    transaction, so turns writing checkpoints are never blocked for long.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        keep_last: int = 20,
+        batch_size: int = 500,
+        vacuum_pages: int = 1000,
+    ):
+        if keep_last < 1:
+            raise ValueError("keep_last must be at least 1 so the latest state of each thread is kept")
+        self.db_path = db_path
+        self.keep_last = keep_last
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _size(self) -> int:
+        return sum(os.path.getsize(path) for path in (self.db_path, f"{self.db_path}-wal") if os.path.exists(path))
+
+    async def compact(self, trigger: str = "manual") -> CompactionReport:
+        """Run one compaction pass; concurrent requests wait for the running one."""
+        async with self._lock:
+            report = CompactionReport(bytes_before=self._size())
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                async with aiosqlite.connect(self.db_path) as conn:
+                    await conn.execute("PRAGMA busy_timeout=5000")
+                    report.checkpoints_deleted = await self._delete_batches(
+                        conn, "checkpoints", SUPERSEDED_CHECKPOINTS, self.keep_last
+                    )
+                    report.writes_deleted = await self._delete_batches(conn, "writes", SUPERSEDED_WRITES)
+                    await self._vacuum(conn)
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                report.duration = time.perf_counter() - start
+                report.bytes_after = self._size()
+                compaction_runs.inc(trigger=trigger, status=status)
+                compaction_duration.observe(report.duration)
+                compaction_reclaimed.inc(report.reclaimed_bytes)
+                checkpoint_db_size.set(report.bytes_after)
+
+            logger.info(f"Checkpoint compaction ({trigger}): {report.summary()}")
+            return report
+
+    async def _delete_batches(self, conn: aiosqlite.Connection, table: str, select: str, *params) -> int:
+        deleted = 0
+        while True:
+            async with conn.execute(select, (*params, self.batch_size)) as cursor:
+                rowids = [row[0] for row in await cursor.fetchall()]
+            if not rowids:
+                return deleted
+            placeholders = ",".join("?" * len(rowids))
+            await conn.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", rowids)
+            await conn.commit()
+            deleted += len(rowids)
+            compaction_deleted.inc(len(rowids), table=table)
+            # Let turns waiting on the write lock in between batches
+            await asyncio.sleep(0)
+
+    async def _vacuum(self, conn: aiosqlite.Connection) -> None:
+        async with conn.execute("PRAGMA auto_vacuum") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode != AUTO_VACUUM_INCREMENTAL:
+            # Databases created before incremental vacuum was enabled need one full rewrite
+            logger.info("Switching checkpoint database to incremental auto-vacuum (one-time full VACUUM)")
+            await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await conn.execute("VACUUM")
+        else:
+            while True:
+                async with conn.execute("PRAGMA freelist_count") as cursor:
+                    free_pages = (await cursor.fetchone())[0]
+                if not free_pages:
+                    break
+                await conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})")
+                await conn.commit()
+                await asyncio.sleep(0)
+        await conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def start(self, interval: float) -> None:
+        """Compact every `interval` seconds in the background."""
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._run(interval), name="checkpoint-compaction")
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.compact(trigger="scheduled")
+            except Exception as e:
+                logger.error(f"Scheduled checkpoint compaction failed: {e}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+@lru_cache
+def get_checkpoint_compactor() -> CheckpointCompactor:
+    """Get or create the process-wide CheckpointCompactor instance."""
+    return CheckpointCompactor(
+        settings.SHORT_TERM_MEMORY_DB_PATH,
+        keep_last=settings.CHECKPOINT_KEEP_LAST,
+        batch_size=settings.CHECKPOINT_COMPACTION_BATCH_SIZE,
+    )
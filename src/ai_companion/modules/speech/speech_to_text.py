@@ -3,6 +3,7 @@ import tempfile
 from typing import Optional
 
 from ai_companion.core.exceptions import SpeechToTextError
+from ai_companion.core.instrumentation import timed_dependency
 from ai_companion.settings import settings
 from groq import Groq
 
@@ -55,7 +56,7 @@ class SpeechToText:
 
             try:
                 # Open the temporary file for the API request
-                with open(temp_file_path, "rb") as audio_file:
+                with open(temp_file_path, "rb") as audio_file, timed_dependency("groq", "transcription"):
                     transcription = self.client.audio.transcriptions.create(
                         file=audio_file,
                         model="whisper-large-v3-turbo",
@@ -2,6 +2,7 @@ import os
 from typing import Optional
 
 from ai_companion.core.exceptions import TextToSpeechError
+from ai_companion.core.instrumentation import timed_dependency
 from ai_companion.settings import settings
 from elevenlabs import ElevenLabs, Voice, VoiceSettings
 
@@ -50,17 +51,18 @@ class TextToSpeech:
             raise ValueError("Input text exceeds maximum length of 5000 characters")
 
         try:
-            audio_generator = self.client.generate(
-                text=text,
-                voice=Voice(
-                    voice_id=settings.ELEVENLABS_VOICE_ID,
-                    settings=VoiceSettings(stability=0.5, similarity_boost=0.5),
-                ),
-                model=settings.TTS_MODEL_NAME,
-            )
-
-            # Convert generator to bytes
-            audio_bytes = b"".join(audio_generator)
+            with timed_dependency("elevenlabs", "synthesize"):
+                audio_generator = self.client.generate(
+                    text=text,
+                    voice=Voice(
+                        voice_id=settings.ELEVENLABS_VOICE_ID,
+                        settings=VoiceSettings(stability=0.5, similarity_boost=0.5),
+                    ),
+                    model=settings.TTS_MODEL_NAME,
+                )
+
+                # Convert generator to bytes
+                audio_bytes = b"".join(audio_generator)
             if not audio_bytes:
                 raise TextToSpeechError("Generated audio is empty")
 
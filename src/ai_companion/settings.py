@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -21,14 +23,96 @@ class Settings(BaseSettings):
     TTI_MODEL_NAME: str = "black-forest-labs/FLUX.1-schnell-Free"
     ITT_MODEL_NAME: str = "llama-3.2-90b-vision-preview"
 
+    # Shared LLM client pool and per-model concurrency limits
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MODEL_CONCURRENCY: dict[str, int] = {}
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_REQUEST_TIMEOUT: float = 60.0
+
+    # Prompt token budget of the conversation node, with optional per-model overrides
+    CONTEXT_TOKEN_BUDGET: int = 6000
+    CONTEXT_TOKEN_BUDGETS: dict[str, int] = {}
+    CONTEXT_RESPONSE_RESERVE: int = 512
+    CONTEXT_RECENT_MESSAGES: int = 4
+
     MEMORY_TOP_K: int = 3
+    # Share of a memory's search score given to recency (0 disables) and the age, in
+    # days, at which that recency score halves; MEMORY_MAX_AGE_DAYS excludes older memories
+    MEMORY_RECENCY_WEIGHT: float = 0.0
+    MEMORY_RECENCY_HALF_LIFE_DAYS: float = 30.0
+    MEMORY_MAX_AGE_DAYS: int | None = None
+    # In-memory embedding LRU; set a path to also keep embeddings on disk, shared by workers
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_PATH: str | None = None
+    # "sidecar" asks the shared embedding process over EMBEDDING_SOCKET_PATH instead of
+    # loading the model in every worker (see modules/memory/long_term/embedding_sidecar.py)
+    EMBEDDING_BACKEND: Literal["local", "sidecar"] = "local"
+    EMBEDDING_SOCKET_PATH: str = "/run/embeddings/embeddings.sock"
+    EMBEDDING_SIDECAR_TIMEOUT: float = 30.0
+    # Model runtime of whichever process loads the model: fp32 "torch", or "onnx" to run
+    # EMBEDDING_ONNX_FILE (int8-quantized by default) with ONNX Runtime on the CPU, which
+    # needs the onnx extra. See benchmarks/embedding_backends.py for the trade-off
+    EMBEDDING_MODEL_BACKEND: Literal["torch", "onnx"] = "torch"
+    EMBEDDING_ONNX_FILE: str = "onnx/model_quint8_avx2.onnx"
+    # Threads encoding embeddings off the event loop
+    EMBEDDING_WORKERS: int = 2
+    # Encode requests of concurrent turns are batched: a batch is sent when it holds
+    # EMBEDDING_BATCH_SIZE texts or EMBEDDING_BATCH_WINDOW seconds after its first request
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_WINDOW: float = 0.005
     ROUTER_MESSAGES_TO_ANALYZE: int = 3
+    ROUTER_CACHE_SIZE: int = 2048
+    # Fraction of rule-based routing decisions re-checked by the LLM to measure accuracy
+    ROUTER_SHADOW_SAMPLE_RATE: float = 0.05
+    # Per-turn deadline in seconds (0 disables); optional context steps are skipped or cut
+    # short so that TURN_RESPONSE_RESERVE seconds are left for the response call
+    TURN_DEADLINE: float = 30.0
+    TURN_RESPONSE_RESERVE: float = 10.0
+    # Sent instead of the reply when the response call misses the turn deadline
+    TURN_TIMEOUT_REPLY: str = "Desculpe, estou demorando mais do que o normal para responder. Por favor, envie sua mensagem novamente em instantes."
+    # Generate the conversation reply while routing; discarded when the router picks image or audio
+    SPECULATIVE_CONVERSATION: bool = False
     TOTAL_MESSAGES_SUMMARY_TRIGGER: int = 20
     TOTAL_MESSAGES_AFTER_SUMMARY: int = 5
+    # "deferred" summarizes with the small model after the reply is delivered
+    SUMMARY_MODE: Literal["inline", "deferred"] = "deferred"
+
+    # Long-term memory extraction: "inline" runs it inside the graph, "deferred"
+    # hands the message to the background pipeline after the reply is sent
+    MEMORY_EXTRACTION_MODE: Literal["inline", "deferred"] = "deferred"
+    MEMORY_EXTRACTION_QUEUE_SIZE: int = 500
+    MEMORY_EXTRACTION_BATCH_SIZE: int = 8
+    MEMORY_EXTRACTION_BATCH_WINDOW: float = 0.5
+    MEMORY_EXTRACTION_MAX_RETRIES: int = 3
+    MEMORY_EXTRACTION_WAIT_TIMEOUT: float = 10.0
 
     SHORT_TERM_MEMORY_DB_PATH: str = "/app/data/memory.db"
+    # Checkpoints kept per thread by compaction; interval in seconds, 0 disables the schedule
+    CHECKPOINT_KEEP_LAST: int = 20
+    CHECKPOINT_COMPACTION_INTERVAL: float = 3600.0
+    CHECKPOINT_COMPACTION_BATCH_SIZE: int = 500
     USER_DB_PATH: str = "/app/data/users.db"
+    # Per-thread turn leases; "sqlite" serializes a user's turns across worker processes
+    THREAD_LEASE_BACKEND: Literal["local", "sqlite"] = "local"
+    THREAD_LEASE_DB_PATH: str = "/app/data/leases.db"
+    THREAD_LEASE_TTL: float = 120.0
+    THREAD_LEASE_ACQUIRE_TIMEOUT: float = 300.0
+    # Synthesized audio and generated images, referenced from graph state by content hash
+    BLOB_STORE_PATH: str = "/app/data/blobs"
+    BLOB_STORE_MAX_BYTES: int = 512 * 1024 * 1024
     
+    # WhatsApp webhook worker pool
+    WHATSAPP_WORKER_CONCURRENCY: int = 8
+    WHATSAPP_QUEUE_MAX_SIZE: int = 1000
+    WHATSAPP_SHUTDOWN_TIMEOUT: float = 30.0
+
+    # WhatsApp Graph API connection pool
+    WHATSAPP_HTTP_MAX_CONNECTIONS: int = 50
+    WHATSAPP_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    WHATSAPP_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    WHATSAPP_HTTP_TIMEOUT: float = 30.0
+    WHATSAPP_HTTP_CONNECT_TIMEOUT: float = 5.0
+
     # Admin configuration
     ADMIN_PHONE_NUMBER: str = "+5511991668852"
     
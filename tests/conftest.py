@@ -0,0 +1,16 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# Settings requires the provider credentials; tests never reach the providers
+for name in (
+    "GROQ_API_KEY",
+    "ELEVENLABS_API_KEY",
+    "ELEVENLABS_VOICE_ID",
+    "TOGETHER_API_KEY",
+    "QDRANT_API_KEY",
+    "WHATSAPP_TOKEN",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
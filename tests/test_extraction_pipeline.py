@@ -0,0 +1,118 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from ai_companion.modules.memory.long_term import extraction_pipeline, memory_manager
+from ai_companion.modules.memory.long_term.extraction_pipeline import (
+    ExtractionJob,
+    MemoryExtractionPipeline,
+    extraction_jobs,
+    extraction_retries,
+)
+from ai_companion.modules.memory.long_term.memory_manager import MemoryAnalysis, MemoryManager
+
+
+class FlakyMemoryManager:
+    """Fails the first extraction of the owners in `flaky`, then succeeds."""
+
+    def __init__(self, flaky):
+        self.flaky = set(flaky)
+        self.calls = []
+
+    async def extract_and_store_batch(self, messages, scope, raise_on_error=False):
+        self.calls.append(scope.user_phone)
+        if scope.user_phone in self.flaky:
+            self.flaky.discard(scope.user_phone)
+            raise RuntimeError("qdrant unavailable")
+
+
+def test_only_failed_owners_are_retried(monkeypatch):
+    manager = FlakyMemoryManager(flaky=["+2"])
+    monkeypatch.setattr(extraction_pipeline, "get_memory_manager", lambda: manager)
+    pipeline = MemoryExtractionPipeline(max_retries=1, retry_backoff=0)
+    batch = [
+        ExtractionJob("+1", HumanMessage(content="my dog is called Rex")),
+        ExtractionJob("+1", HumanMessage(content="I live in Recife")),
+        ExtractionJob("+2", HumanMessage(content="I am allergic to shrimp")),
+    ]
+    processed = extraction_jobs.value(status="processed")
+
+    asyncio.run(pipeline._process(batch))
+
+    assert sorted(manager.calls) == ["+1", "+2", "+2"]
+    assert extraction_jobs.value(status="processed") - processed == 3
+
+
+def test_failed_count_covers_only_the_failing_owner(monkeypatch):
+    manager = FlakyMemoryManager(flaky=["+2"])
+    monkeypatch.setattr(extraction_pipeline, "get_memory_manager", lambda: manager)
+    pipeline = MemoryExtractionPipeline(max_retries=0, retry_backoff=0)
+    batch = [
+        ExtractionJob("+1", HumanMessage(content="my dog is called Rex")),
+        ExtractionJob("+1", HumanMessage(content="I live in Recife")),
+        ExtractionJob("+2", HumanMessage(content="I am allergic to shrimp")),
+    ]
+    processed = extraction_jobs.value(status="processed")
+    failed = extraction_jobs.value(status="failed")
+
+    asyncio.run(pipeline._process(batch))
+
+    assert extraction_jobs.value(status="processed") - processed == 2
+    assert extraction_jobs.value(status="failed") - failed == 1
+
+
+class RateLimitedLLM:
+    """Structured-output LLM that answers with a 429 the first time."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def with_structured_output(self, *args, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("429 Too Many Requests")
+        return MemoryAnalysis(is_important=True, formatted_memory="User has a dog named Rex")
+
+
+class FakeRegistry:
+    def __init__(self, llm):
+        self.llm = llm
+
+    def get_chat_model(self, *args, **kwargs):
+        return self.llm
+
+    def throttle(self, runnable, model_name):
+        return runnable
+
+
+class RecordingVectorStore:
+    def __init__(self):
+        self.stored = []
+
+    async def aembed(self, texts):
+        return [[0.0] for _ in texts]
+
+    async def afind_similar_memories(self, texts, embeddings, scope=None):
+        return [None for _ in texts]
+
+    async def astore_memories(self, memories, embeddings=None):
+        self.stored.extend(memories)
+
+
+def test_llm_errors_are_retried_by_the_pipeline(monkeypatch):
+    llm, store = RateLimitedLLM(), RecordingVectorStore()
+    monkeypatch.setattr(memory_manager, "get_llm_registry", lambda: FakeRegistry(llm))
+    monkeypatch.setattr(memory_manager, "get_vector_store", lambda: store)
+    manager = MemoryManager()
+    monkeypatch.setattr(extraction_pipeline, "get_memory_manager", lambda: manager)
+    pipeline = MemoryExtractionPipeline(max_retries=1, retry_backoff=0)
+    retries = extraction_retries.value()
+
+    asyncio.run(pipeline._process([ExtractionJob("+1", HumanMessage(content="my dog is called Rex"))]))
+
+    assert llm.calls == 2
+    assert extraction_retries.value() - retries == 1
+    assert [memory.text for memory in store.stored] == ["User has a dog named Rex"]
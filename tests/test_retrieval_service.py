@@ -0,0 +1,38 @@
+import asyncio
+
+from ai_companion.modules.memory.long_term.vector_store import RetrievalResult, RetrievalService
+
+
+class FailingEmbeddingStore:
+    """Vector store whose encoder is down; searches must not be reached."""
+
+    async def aembed(self, texts):
+        raise RuntimeError("embedding sidecar unavailable")
+
+    async def asearch_memories(self, *args, **kwargs):
+        raise AssertionError("searched memories without embeddings")
+
+    async def asearch_knowledge(self, *args, **kwargs):
+        raise AssertionError("searched knowledge without embeddings")
+
+
+def test_retrieve_returns_empty_result_when_embedding_fails():
+    service = RetrievalService(FailingEmbeddingStore())
+
+    result = asyncio.run(service.retrieve("what is my dog called?", "what is my dog called?"))
+
+    assert isinstance(result, RetrievalResult)
+    assert result.memories == []
+    assert result.knowledge == []
+
+
+def test_retrieve_returns_empty_result_when_vector_store_cannot_be_built():
+    def unreachable_qdrant():
+        raise ConnectionRefusedError("qdrant unreachable")
+
+    service = RetrievalService(store_factory=unreachable_qdrant)
+
+    result = asyncio.run(service.retrieve("what is my dog called?", "what is my dog called?"))
+
+    assert result.memories == []
+    assert result.knowledge == []